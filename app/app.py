@@ -1,4 +1,5 @@
-from flask import Flask, render_template, send_from_directory
+import click
+from flask import Flask, current_app, render_template, send_from_directory
 from flask_jwt_extended import JWTManager
 from werkzeug.security import generate_password_hash
 import logging
@@ -7,6 +8,8 @@ from app.config import Config
 from app.models import db, User
 from app.routes.auth_route import auth_route
 from app.routes.converter import converter_route
+from app.routes.metrics import metrics_route
+from app.services.audit_log import init_audit_database
 
 def seed_initial_users():
     """
@@ -55,6 +58,21 @@ def seed_initial_users():
         db.session.rollback()
         logging.error(f"Error seeding users: {str(e)}")
 
+def init_database():
+    """
+    Create missing database tables and seed the initial users
+
+    Run once per database with ``flask --app run init-db``, rather than on
+    every process start, unless AUTO_INIT_DATABASE is set. Also sets up
+    the conversion log table of the audit database.
+    """
+    db.create_all()
+    seed_initial_users()
+    if current_app.config.get('AUDIT_LOG_ENABLED', False):
+        init_audit_database(
+            current_app.config.get('AUDIT_DATABASE_URI') or current_app.config['SQLALCHEMY_DATABASE_URI']
+        )
+
 def create_app(config_class=Config):
     app = Flask(__name__, 
                 static_folder='static', 
@@ -71,6 +89,7 @@ def create_app(config_class=Config):
     # Register blueprints
     app.register_blueprint(auth_route, url_prefix='/api/auth')
     app.register_blueprint(converter_route, url_prefix='/api/converter')
+    app.register_blueprint(metrics_route)
 
     # Root route to serve login page
     @app.route('/')
@@ -92,13 +111,16 @@ def create_app(config_class=Config):
     def serve_static(path):
         return send_from_directory('static', path)
 
-    # Create tables
+    # One-time database setup
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create the database tables and seed the initial users."""
+        init_database()
+        click.echo('Database initialized')
+
     with app.app_context():
-        # Create all tables
-        db.create_all()
-        
-        # Seed initial users
-        seed_initial_users()
+        if app.config['AUTO_INIT_DATABASE']:
+            init_database()
         
         # Ensure upload directory exists
         os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
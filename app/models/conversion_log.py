@@ -6,12 +6,20 @@ class ConversionLog(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.String(5), db.ForeignKey('users.user_id'), nullable=False)
+    job_id = db.Column(db.String(32), index=True)
     original_filename = db.Column(db.String(255), nullable=False)
-    converted_format = db.Column(db.String(20), nullable=False)
+    converted_format = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='completed')
+    duration_seconds = db.Column(db.Float)
+    bytes_in = db.Column(db.BigInteger)
+    bytes_out = db.Column(db.BigInteger)
+    total_rows = db.Column(db.Integer)
+    total_columns = db.Column(db.Integer)
+    error = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationship with User
     user = db.relationship('User', backref=db.backref('conversions', lazy=True))
     
     def __repr__(self):
-        return f'<ConversionLog {self.id}: {self.original_filename}>'
\ No newline at end of file
+        return f'<ConversionLog {self.id}: {self.original_filename}>'
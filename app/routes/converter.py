@@ -1,10 +1,150 @@
-from flask import Blueprint, request, jsonify, send_file, render_template, current_app
+from flask import Blueprint, request, jsonify, send_file, render_template, current_app, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.services.data_converter import DataConverterService
+from werkzeug.exceptions import HTTPException
+from app.services.data_converter import DataConverterService, LAYOUTS
+from app.services.record_writer import ConvertedData, OUTPUT_FORMATS
+from app.services.job_service import JobService
+from app.services.upload_service import UploadService, UploadOffsetError
+from app.services.download_service import DownloadService
+from app.services.batch_service import BatchService
+from app.services.auth_service import AuthService
+from app.services.compressed_input import strip_extension
+from itertools import chain
 import os
+import zlib
 
 converter_route = Blueprint('converter', __name__)
 converter_service = DataConverterService()
+job_service = JobService(converter_service)
+upload_service = UploadService(converter_service)
+download_service = DownloadService(converter_service, job_service)
+batch_service = BatchService(job_service)
+auth_service = AuthService()
+
+def _job_response(job):
+    response = {
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'records_processed': job['records_processed'],
+        'original_file': job['original_file']
+    }
+    if job['error']:
+        response['error'] = job['error']
+    if job['result']:
+        response['result'] = job['result']
+    return response
+
+def _upload_response(upload):
+    return {
+        'upload_id': upload['upload_id'],
+        'filename': upload['original_filename'],
+        'offset': upload['received_bytes'],
+        'size': upload['total_size'],
+        'chunk_size': current_app.config.get('UPLOAD_CHUNK_SIZE')
+    }
+
+def _request_values(name):
+    # Form fields and query args, plus JSON bodies such as upload sessions
+    values = request.form.getlist(name) + request.args.getlist(name)
+    body = request.get_json(silent=True) if request.is_json else None
+    if isinstance(body, dict) and body.get(name) is not None:
+        value = body[name]
+        values.extend(str(item) for item in (value if isinstance(value, list) else [value]))
+    return values
+
+def _requested_formats():
+    formats = []
+    for value in _request_values('formats'):
+        formats.extend(fmt.strip().lower() for fmt in value.split(',') if fmt.strip())
+    
+    unknown_formats = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+    if unknown_formats:
+        raise ValueError(f"Unsupported output format: {', '.join(unknown_formats)}")
+    return formats
+
+def _requested_layout():
+    layout = (next(iter(_request_values('layout')), None) or 'flat').strip().lower()
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unsupported layout: {layout}")
+    return layout
+
+def _requested_profile():
+    # Honoured only where CONVERSION_PROFILING_ENABLED is set
+    value = next(iter(_request_values('profile')), '')
+    return value.strip().lower() in ('1', 'true', 'yes')
+
+def _requested_merge():
+    value = next(iter(_request_values('merge')), '')
+    return value.strip().lower() in ('1', 'true', 'yes')
+
+def _requested_limit():
+    value = next(iter(_request_values('limit')), None)
+    if value is None:
+        return None
+    max_limit = current_app.config.get('PREVIEW_MAX_RECORDS', 1000)
+    if not value.isdigit() or not 0 < int(value) <= max_limit:
+        raise ValueError(f"limit must be between 1 and {max_limit}")
+    return int(value)
+
+def _requested_columns():
+    columns = []
+    for value in _request_values('columns'):
+        columns.extend(column.strip() for column in value.split(',') if column.strip())
+    if len(set(columns)) < len(columns):
+        raise ValueError("Duplicate column in columns")
+    return columns or None
+
+def _gzip_chunks(chunks, level):
+    # Each chunk is flushed whole, so the client can decode it as it arrives
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+def _send_artifact(file_path):
+    # Error responses of both download routes; HTTP errors such as 416 for
+    # an unsatisfiable range pass through
+    try:
+        return _artifact_response(file_path)
+    except FileNotFoundError:
+        return jsonify({'error': 'File not found'}), 404
+    except HTTPException:
+        raise
+    except Exception as e:
+        current_app.logger.error(f"Download error: {str(e)}")
+        return jsonify({'error': 'File download failed'}), 500
+
+def _artifact_response(file_path):
+    # Outputs that were not requested up front are written on first download
+    file_path = download_service.resolve(file_path, get_jwt_identity())
+    filename = os.path.basename(file_path)
+    mimetype = OUTPUT_FORMATS[ConvertedData.format_for(file_path)]['mimetype']
+    
+    encodings = download_service.encodings(file_path)
+    encoding = request.accept_encodings.best_match(encodings) if encodings else None
+    send_path = (download_service.variant(file_path, encoding) if encoding else None) or file_path
+    
+    offload = current_app.config.get('DOWNLOAD_OFFLOAD')
+    if offload == 'x-accel-redirect':
+        # nginx serves the precompressed file itself with gzip_static
+        send_path = file_path
+        response = current_app.response_class(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = download_service.internal_uri(file_path)
+    elif offload == 'x-sendfile':
+        response = current_app.response_class(mimetype=mimetype)
+        response.headers['X-Sendfile'] = send_path
+    else:
+        # Conditional: ETag and Last-Modified validators, 304s and byte ranges
+        response = send_file(send_path, mimetype=mimetype, conditional=True, etag=True)
+    
+    response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    if send_path != file_path:
+        response.headers['Content-Encoding'] = encoding
+    if encodings:
+        response.vary.add('Accept-Encoding')
+    response.cache_control.private = True
+    return response
 
 @converter_route.route('/convert', methods=['POST'])
 @jwt_required()
@@ -19,23 +159,337 @@ def convert_file():
         return jsonify({'error': 'No selected file'}), 400
     
     try:
-        # Convert file
-        conversion_result = converter_service.convert_file(file, current_user_id)
+        # Queue conversion, the client polls the job for the result
+        job = job_service.submit(file, current_user_id, _conversion_options())
         
         return jsonify({
-            'message': 'File converted successfully',
-            'result': conversion_result
-        }), 200
+            'message': 'File queued for conversion',
+            'job': _job_response(job)
+        }), 202
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+def _conversion_options():
+    options = {'formats': _requested_formats(), 'layout': _requested_layout()}
+    columns = _requested_columns()
+    if columns:
+        if options['layout'] != 'flat':
+            raise ValueError(f"Declared columns are not supported for the {options['layout']} layout")
+        options['columns'] = columns
+    if _requested_profile():
+        options['profile'] = True
+    return options
+
+@converter_route.route('/batch', methods=['POST'])
+@jwt_required()
+def convert_batch():
+    # Many files, or archives of them, converted concurrently as one batch
+    files = [file for file in request.files.getlist('files') + request.files.getlist('file') if file.filename]
+    if not files:
+        return jsonify({'error': 'No file part'}), 400
+    
+    try:
+        batch = batch_service.submit(files, get_jwt_identity(), _conversion_options(), _requested_merge())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'message': 'Files queued for conversion',
+        'batch': batch
+    }), 202
+
+@converter_route.route('/batches/<batch_id>', methods=['GET'])
+@jwt_required()
+def batch_status(batch_id):
+    batch = batch_service.get_batch(batch_id, get_jwt_identity())
+    if not batch:
+        return jsonify({'error': 'Batch not found'}), 404
+    
+    return jsonify(batch), 200
+
+@converter_route.route('/preview', methods=['POST'])
+@jwt_required()
+def preview_file():
+    # The file may be just its head, e.g. the first megabyte
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+    if not converter_service.file_handler.allowed_file(file.filename):
+        return jsonify({'error': f"File type not allowed: {file.filename}"}), 400
+    
+    try:
+        file_extension, compression = converter_service.file_handler.split_extension(file.filename)
+        preview = converter_service.preview(file.stream, file_extension, _requested_limit(), compression)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(preview), 200
+
+@converter_route.route('/convert/stream', methods=['POST'])
+@jwt_required()
+def stream_csv():
+    # CSV is sent as the file is parsed, nothing is written to disk
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+    if not converter_service.file_handler.allowed_file(file.filename):
+        return jsonify({'error': f"File type not allowed: {file.filename}"}), 400
+    
+    try:
+        file_extension, compression = converter_service.file_handler.split_extension(file.filename)
+        chunks = converter_service.stream_csv(file.stream, file_extension, compression, _requested_columns())
+        # The header and first rows are produced before answering, so input
+        # that fails early gets a 400; later failures cut the response off
+        first_chunk = next(chunks, b'')
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
+    
+    body = chain([first_chunk], chunks)
+    encoding = request.accept_encodings.best_match(['gzip'])
+    if encoding:
+        body = _gzip_chunks(body, current_app.config.get('CSV_GZIP_LEVEL', 6))
+    
+    response = current_app.response_class(stream_with_context(body), mimetype=OUTPUT_FORMATS['csv']['mimetype'])
+    filename = strip_extension(os.path.basename(file.filename)) + OUTPUT_FORMATS['csv']['suffix']
+    response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.private = True
+    return response
+
+@converter_route.route('/uploads', methods=['POST'])
+@jwt_required()
+def create_upload():
+    body = request.get_json(silent=True) if request.is_json else None
+    body = body if isinstance(body, dict) else {}
+    filename = body.get('filename') or request.form.get('filename') or request.args.get('filename')
+    size = body.get('size', request.form.get('size') or request.args.get('size'))
+    
+    try:
+        if isinstance(size, str):
+            if not size.isdigit():
+                raise ValueError('Upload size must be a non-negative integer')
+            size = int(size)
+        upload = upload_service.create(get_jwt_identity(), filename, size, _conversion_options())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(_upload_response(upload)), 201
+
+@converter_route.route('/uploads/<upload_id>', methods=['GET'])
+@jwt_required()
+def upload_status(upload_id):
+    upload = upload_service.get(upload_id, get_jwt_identity())
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    return jsonify(_upload_response(upload)), 200
+
+@converter_route.route('/uploads/<upload_id>/preview', methods=['GET'])
+@jwt_required()
+def preview_upload(upload_id):
+    try:
+        preview = upload_service.preview(upload_id, get_jwt_identity(), _requested_limit())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if preview is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify(preview), 200
+
+@converter_route.route('/uploads/<upload_id>', methods=['PUT'])
+@jwt_required()
+def upload_chunk(upload_id):
+    offset = request.headers.get('Upload-Offset', request.args.get('offset', ''))
+    if not offset.isdigit():
+        return jsonify({'error': 'Chunk offset required (Upload-Offset header or offset parameter)'}), 400
+    
+    try:
+        upload = upload_service.write_chunk(
+            upload_id, get_jwt_identity(), int(offset), request.stream, request.content_length
+        )
+    except UploadOffsetError as e:
+        # The client resumes from the offset the server has
+        return jsonify({'error': str(e), 'offset': e.offset}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify(_upload_response(upload)), 200
+
+@converter_route.route('/uploads/<upload_id>', methods=['DELETE'])
+@jwt_required()
+def abort_upload(upload_id):
+    if not upload_service.abort(upload_id, get_jwt_identity()):
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    return jsonify({'message': 'Upload cancelled'}), 200
+
+@converter_route.route('/uploads/<upload_id>/finalize', methods=['POST'])
+@jwt_required()
+def finalize_upload(upload_id):
+    current_user_id = get_jwt_identity()
+    upload = upload_service.get(upload_id, current_user_id)
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    try:
+        file_info = upload_service.finalize(upload_id, current_user_id)
+        if not file_info:
+            return jsonify({'error': 'Upload not found'}), 404
+        job = job_service.submit_saved_file(file_info, current_user_id, upload['options'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'message': 'File queued for conversion',
+        'job': _job_response(job)
+    }), 202
+
+@converter_route.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def job_status(job_id):
+    job = job_service.get_job(job_id, get_jwt_identity())
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(_job_response(job)), 200
+
+@converter_route.route('/jobs/<job_id>/result', methods=['GET'])
+@jwt_required()
+def job_result(job_id):
+    job = job_service.get_job(job_id, get_jwt_identity())
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if job['status'] == 'failed':
+        return jsonify({'error': job['error']}), 400
+    if job['status'] != 'completed':
+        return jsonify(_job_response(job)), 202
+    
+    return jsonify({
+        'message': 'File converted successfully',
+        'result': job['result']
+    }), 200
+
+def _admin_error():
+    # Error response unless the current user is an admin
+    try:
+        user = auth_service.get_user_by_username(get_jwt_identity())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    
+    if not user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+    return None
+
+@converter_route.route('/cache/stats', methods=['GET'])
+@jwt_required()
+def cache_stats():
+    error = _admin_error()
+    if error:
+        return error
+    
+    if not converter_service.cache:
+        return jsonify({'error': 'Conversion cache is disabled'}), 404
+    
+    return jsonify(converter_service.cache.stats()), 200
+
+def _schema_registry_error():
+    # Error response unless the current user is an admin and the schema
+    # registry is enabled
+    error = _admin_error()
+    if error:
+        return error
+    if not converter_service.schemas:
+        return jsonify({'error': 'Schema registry is disabled'}), 404
+    return None
+
+@converter_route.route('/schemas', methods=['GET'])
+@jwt_required()
+def list_schemas():
+    error = _schema_registry_error()
+    if error:
+        return error
+    
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    return jsonify({'schemas': converter_service.schemas.list_schemas(limit)}), 200
+
+@converter_route.route('/schemas', methods=['DELETE'])
+@jwt_required()
+def evict_schemas():
+    error = _schema_registry_error()
+    if error:
+        return error
+    
+    # Pinned layouts are kept
+    return jsonify({'evicted': converter_service.schemas.evict()}), 200
+
+@converter_route.route('/schemas/<fingerprint>', methods=['GET'])
+@jwt_required()
+def schema_details(fingerprint):
+    error = _schema_registry_error()
+    if error:
+        return error
+    
+    schema = converter_service.schemas.get(fingerprint)
+    if not schema:
+        return jsonify({'error': 'Schema not found'}), 404
+    return jsonify(schema), 200
+
+@converter_route.route('/schemas/<fingerprint>', methods=['DELETE'])
+@jwt_required()
+def evict_schema(fingerprint):
+    error = _schema_registry_error()
+    if error:
+        return error
+    
+    if not converter_service.schemas.evict(fingerprint):
+        return jsonify({'error': 'Schema not found'}), 404
+    return jsonify({'evicted': 1}), 200
+
+@converter_route.route('/schemas/<fingerprint>/pin', methods=['POST', 'DELETE'])
+@jwt_required()
+def pin_schema(fingerprint):
+    error = _schema_registry_error()
+    if error:
+        return error
+    
+    if not converter_service.schemas.pin(fingerprint, request.method == 'POST'):
+        return jsonify({'error': 'Schema not found'}), 404
+    return jsonify(converter_service.schemas.get(fingerprint)), 200
+
+@converter_route.route('/files', methods=['GET'])
+@jwt_required()
+def list_files():
+    if not converter_service.artifacts:
+        return jsonify({'error': 'Artifact index is disabled'}), 404
+
+    current_user_id = get_jwt_identity()
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    files = converter_service.file_handler.list_files(
+        request.args.get('extension'), owner=current_user_id, limit=limit
+    )
+    return jsonify({
+        'files': files,
+        'usage': {
+            'size_bytes': converter_service.artifacts.usage(current_user_id),
+            'quota_bytes': converter_service.artifacts.user_quota or None
+        }
+    }), 200
 
 @converter_route.route('/download/<path:filename>', methods=['GET'])
 @jwt_required()
 def download_file(filename):
-    try:
-        return send_file(filename, as_attachment=True)
-    except FileNotFoundError:
-        return jsonify({'error': 'File not found'}), 404
+    return _send_artifact(filename)
 
 @converter_route.route('/conversion-result')
 @jwt_required()
@@ -49,15 +503,4 @@ def api_download():
     if not file_path:
         return jsonify({'error': 'No file specified'}), 400
     
-    try:
-        # Security check - ensure the file exists
-        if not os.path.exists(file_path):
-            return jsonify({'error': 'File not found'}), 404
-            
-        filename = os.path.basename(file_path)
-        return send_file(file_path, 
-                        as_attachment=True, 
-                        download_name=filename)
-    except Exception as e:
-        current_app.logger.error(f"Download error: {str(e)}")
-        return jsonify({'error': 'File download failed'}), 500
\ No newline at end of file
+    return _send_artifact(file_path)
\ No newline at end of file
@@ -0,0 +1,31 @@
+import ipaddress
+from flask import Blueprint, Response, current_app, jsonify, request
+from app.services.data_converter import DataConverterService
+
+metrics_route = Blueprint('metrics', __name__)
+converter_service = DataConverterService()
+
+# Prometheus text exposition format
+METRICS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _scraper_allowed():
+    # The endpoint has no login, so it is served to the configured networks only
+    try:
+        address = ipaddress.ip_address(request.remote_addr or '')
+    except ValueError:
+        return False
+    networks = current_app.config.get('METRICS_ALLOWED_NETWORKS') or ''
+    return any(
+        address in ipaddress.ip_network(network.strip(), strict=False)
+        for network in networks.split(',') if network.strip()
+    )
+
+@metrics_route.route('/metrics', methods=['GET'])
+def metrics():
+    if not converter_service.metrics:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    
+    if not _scraper_allowed():
+        return jsonify({'error': 'Metrics are not available from this address'}), 403
+    
+    return Response(converter_service.metrics.render(), content_type=METRICS_MIMETYPE)
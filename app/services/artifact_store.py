@@ -0,0 +1,393 @@
+import os
+import re
+import glob
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Iterable
+from app.services.sqlite_store import SQLiteStore
+
+# Groups used more recently than this are never evicted for size: their
+# conversion may still be running
+EVICTION_GRACE_SECONDS = 3600
+
+
+def shard_directory(folder: str, filename: str, depth: int = 2) -> str:
+    """
+    Subdirectory of a folder that a file is stored in
+
+    Files are spread over ``depth`` levels of 256 directories by the hash of
+    their name, so no directory grows past a few thousand entries.
+
+    Args:
+        folder (str): Root folder, e.g. UPLOAD_FOLDER
+        filename (str): Name of the file
+        depth (int, optional): Levels of subdirectories
+
+    Returns:
+        str: Directory path, e.g. ``<folder>/3f/a2``
+    """
+    digest = hashlib.sha1(filename.encode('utf-8')).hexdigest()
+    return os.path.join(folder, *(digest[2 * level:2 * level + 2] for level in range(depth)))
+
+
+def artifact_group(path: str) -> str:
+    """
+    Group of an artifact: the upload it belongs to
+
+    An upload ``<id>.xml`` and everything derived from it, such as
+    ``<id>_converted.csv`` or the ``<id>.<member>_converted.rows`` of an
+    archive member, share the directory and the leading ``<id>``.
+
+    Args:
+        path (str): Artifact path
+
+    Returns:
+        str: Path of the group, ``<directory>/<id>``
+    """
+    directory, filename = os.path.split(path)
+    return os.path.join(directory, re.match(r'[^._]*', filename).group())
+
+
+def result_paths(result: Dict[str, Any]) -> List[str]:
+    """
+    Files of a conversion result
+
+    Args:
+        result (dict): Conversion result
+
+    Returns:
+        list: Every ``*_path`` of the result and of its relational tables
+    """
+    paths = {}
+    for entry in [result] + result.get('tables', []):
+        paths.update((value, None) for key, value in entry.items() if key.endswith('_path') and value)
+    return list(paths)
+
+
+class ArtifactStore(SQLiteStore):
+    """
+    Index of the uploads and conversion outputs in the upload folder.
+
+    Every file is recorded with its owner, format, size and content hash,
+    in the group of the upload it came from. Groups are what is accounted
+    and evicted: a group's size counts against its owner's quota, and its
+    last access, refreshed on every download, orders least recently used
+    eviction. Listing a user's files and looking one up are index queries,
+    however many files the folder holds.
+    """
+
+    def __init__(self, db_path: str, user_quota: int = None, max_bytes: int = None, max_age: int = None):
+        """
+        Initialize ArtifactStore and create its tables if needed
+
+        Args:
+            db_path (str): Path to the SQLite index file
+            user_quota (int, optional): Bytes each user's groups may take
+            max_bytes (int, optional): Total size budget for all groups
+            max_age (int, optional): Seconds since last access before eviction
+        """
+        self.user_quota = user_quota
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.logger = logging.getLogger(__name__)
+        super().__init__(db_path)
+
+    def _create_schema(self, conn):
+        conn.execute(
+            '''CREATE TABLE IF NOT EXISTS artifact_groups (
+                group_key TEXT PRIMARY KEY,
+                owner TEXT,
+                size_bytes INTEGER NOT NULL,
+                files INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )'''
+        )
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS ix_artifact_groups_owner ON artifact_groups (owner)'
+        )
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS ix_artifact_groups_last_access ON artifact_groups (last_access)'
+        )
+        conn.execute(
+            '''CREATE TABLE IF NOT EXISTS artifacts (
+                path TEXT PRIMARY KEY,
+                group_key TEXT NOT NULL,
+                owner TEXT,
+                format TEXT NOT NULL,
+                content_hash TEXT,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )'''
+        )
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS ix_artifacts_group_key ON artifacts (group_key)'
+        )
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS ix_artifacts_owner_created_at ON artifacts (owner, created_at)'
+        )
+
+    @staticmethod
+    def format_of(path: str) -> str:
+        # Everything after the first dot, e.g. ``xml.gz`` or ``csv``
+        return os.path.basename(path).partition('.')[2].lower()
+
+    def register(self, paths: Iterable[str], owner: str = None, content_hash: str = None) -> int:
+        """
+        Record files, or their new size if already recorded
+
+        Args:
+            paths (iterable): Paths of the files; missing files are skipped
+            owner (str, optional): Owner of a new group; files added to an
+                                   existing group belong to its owner
+            content_hash (str, optional): SHA-256 of the files' content
+
+        Returns:
+            int: Bytes added to the index
+        """
+        added = 0
+        now = time.time()
+        with self._connect() as conn:
+            for path in paths:
+                if not os.path.exists(path):
+                    continue
+                size_bytes = os.path.getsize(path)
+                group_key = artifact_group(path)
+                group = conn.execute(
+                    'SELECT owner FROM artifact_groups WHERE group_key = ?', (group_key,)
+                ).fetchone()
+                if group is None:
+                    conn.execute(
+                        'INSERT INTO artifact_groups (group_key, owner, size_bytes, files, created_at, last_access) '
+                        'VALUES (?, ?, 0, 0, ?, ?)',
+                        (group_key, owner, now, now)
+                    )
+                group_owner = group[0] if group and group[0] else owner
+
+                existing = conn.execute(
+                    'SELECT size_bytes FROM artifacts WHERE path = ?', (path,)
+                ).fetchone()
+                conn.execute(
+                    'INSERT OR REPLACE INTO artifacts '
+                    '(path, group_key, owner, format, content_hash, size_bytes, created_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (path, group_key, group_owner, self.format_of(path), content_hash, size_bytes, now)
+                )
+                delta = size_bytes - (existing[0] if existing else 0)
+                conn.execute(
+                    'UPDATE artifact_groups SET owner = ?, size_bytes = size_bytes + ?, files = files + ?, '
+                    'last_access = ? WHERE group_key = ?',
+                    (group_owner, delta, 0 if existing else 1, now, group_key)
+                )
+                added += delta
+        return added
+
+    def forget(self, paths: Iterable[str]):
+        """
+        Drop files from the index, e.g. after they were deleted
+
+        Args:
+            paths (iterable): Paths of the files
+        """
+        with self._connect() as conn:
+            for path in paths:
+                row = conn.execute(
+                    'SELECT group_key, size_bytes FROM artifacts WHERE path = ?', (path,)
+                ).fetchone()
+                if row is None:
+                    continue
+                conn.execute('DELETE FROM artifacts WHERE path = ?', (path,))
+                conn.execute(
+                    'UPDATE artifact_groups SET size_bytes = size_bytes - ?, files = files - 1 WHERE group_key = ?',
+                    (row[1], row[0])
+                )
+                conn.execute('DELETE FROM artifact_groups WHERE group_key = ? AND files <= 0', (row[0],))
+
+    def touch(self, path: str):
+        """
+        Mark the group of a file as used now
+
+        Args:
+            path (str): Path of a file in the group
+        """
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE artifact_groups SET last_access = ? WHERE group_key = ?',
+                (time.time(), artifact_group(path))
+            )
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Look a file up
+
+        Args:
+            path (str): Path of the file
+
+        Returns:
+            dict: File details with its group's ``last_access``, or None if
+                  it is not recorded
+        """
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                'SELECT artifacts.*, artifact_groups.last_access FROM artifacts '
+                'JOIN artifact_groups USING (group_key) WHERE path = ?', (path,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def list_files(self, owner: str = None, file_format: str = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Recorded files, newest first
+
+        Args:
+            owner (str, optional): Only files of this user
+            file_format (str, optional): Only files of this format, e.g. ``csv``
+            limit (int, optional): Most files to return
+
+        Returns:
+            list: File details
+        """
+        conditions, params = [], []
+        if owner is not None:
+            conditions.append('owner = ?')
+            params.append(owner)
+        if file_format:
+            conditions.append('format = ?')
+            params.append(file_format.lower().lstrip('.'))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self._connect() as conn:
+            rows = conn.execute(
+                f'SELECT path, owner, format, content_hash, size_bytes, created_at FROM artifacts {where} '
+                'ORDER BY created_at DESC LIMIT ?', (*params, limit)
+            ).fetchall()
+        return [
+            {'path': path, 'owner': owner, 'format': fmt, 'content_hash': content_hash,
+             'size_bytes': size_bytes, 'created_at': created_at}
+            for path, owner, fmt, content_hash, size_bytes, created_at in rows
+        ]
+
+    def usage(self, owner: str) -> int:
+        """
+        Bytes taken by a user's groups
+
+        Args:
+            owner (str): User to account
+
+        Returns:
+            int: Total size of the user's files
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                'SELECT COALESCE(SUM(size_bytes), 0) FROM artifact_groups WHERE owner = ?', (owner,)
+            ).fetchone()[0]
+
+    def check_quota(self, owner: str, size_bytes: int):
+        """
+        Check that a user may store more bytes
+
+        Args:
+            owner (str): User storing the bytes
+            size_bytes (int): Bytes to store, beyond what is already recorded
+
+        Raises:
+            ValueError: If the user's quota would be exceeded
+        """
+        if not self.user_quota or owner is None:
+            return
+        used = self.usage(owner)
+        if used + size_bytes > self.user_quota:
+            raise ValueError(
+                f"Storage quota exceeded: {used + size_bytes} bytes needed, {self.user_quota} allowed"
+            )
+
+    def evict(self) -> int:
+        """
+        Remove groups past the age limit, then least recently used groups
+        until the index fits the size budget
+
+        The files of an evicted group are deleted with its index entries.
+
+        Returns:
+            int: Number of groups evicted
+        """
+        now = time.time()
+        cutoff = now - self.max_age if self.max_age else 0
+        with self._connect() as conn:
+            evicted = [group_key for group_key, in conn.execute(
+                'SELECT group_key FROM artifact_groups WHERE last_access < ?', (cutoff,)
+            ).fetchall()]
+
+            if self.max_bytes:
+                total = conn.execute(
+                    'SELECT COALESCE(SUM(size_bytes), 0) FROM artifact_groups WHERE last_access >= ?', (cutoff,)
+                ).fetchone()[0]
+                if total > self.max_bytes:
+                    for group_key, size_bytes in conn.execute(
+                        'SELECT group_key, size_bytes FROM artifact_groups WHERE last_access >= ? '
+                        'AND last_access < ? ORDER BY last_access', (cutoff, now - EVICTION_GRACE_SECONDS)
+                    ):
+                        if total <= self.max_bytes:
+                            break
+                        evicted.append(group_key)
+                        total -= size_bytes
+
+        for group_key in evicted:
+            self._remove_group(group_key)
+        return len(evicted)
+
+    def _remove_group(self, group_key: str):
+        # Files of the group that were never indexed, e.g. left behind by a
+        # failed conversion, go too
+        with self._connect() as conn:
+            paths = {path for path, in conn.execute(
+                'SELECT path FROM artifacts WHERE group_key = ?', (group_key,)
+            ).fetchall()}
+            paths.update(glob.glob(f"{glob.escape(group_key)}.*") + glob.glob(f"{glob.escape(group_key)}_*"))
+            for path in paths:
+                try:
+                    if os.path.exists(path):
+                        os.remove(path)
+                except OSError as e:
+                    self.logger.error(f"Error evicting artifact {path}: {str(e)}")
+            conn.execute('DELETE FROM artifacts WHERE group_key = ?', (group_key,))
+            conn.execute('DELETE FROM artifact_groups WHERE group_key = ?', (group_key,))
+
+
+class ArtifactEvictor:
+    """
+    Run ArtifactStore.evict in a background thread at a fixed interval.
+
+    Each web process runs its own; evicting a group twice is harmless.
+    """
+
+    def __init__(self, store: ArtifactStore, interval: float):
+        """
+        Initialize ArtifactEvictor and start its thread
+
+        Args:
+            store (ArtifactStore): Index to evict from
+            interval (float): Seconds between evictions
+        """
+        self.store = store
+        self.interval = interval
+        self.logger = logging.getLogger(__name__)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='artifact-evictor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the thread after the eviction in progress, if any"""
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                evicted = self.store.evict()
+                if evicted:
+                    self.logger.info(f"Evicted {evicted} artifact groups")
+            except Exception as e:
+                self.logger.error(f"Error evicting artifacts: {str(e)}")
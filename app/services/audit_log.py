@@ -0,0 +1,275 @@
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List
+from sqlalchemy import create_engine, inspect, text, MetaData, Table, Column, String, column, table
+from sqlalchemy.exc import InterfaceError, OperationalError
+from app.models import ConversionLog
+
+# ConversionLog columns filled in by the writer's callers
+AUDIT_FIELDS = (
+    'job_id', 'original_filename', 'converted_format', 'status', 'duration_seconds',
+    'bytes_in', 'bytes_out', 'total_rows', 'total_columns', 'error'
+)
+
+# Seconds until the writer looks again for audit columns the table lacked
+AUDIT_COLUMNS_RECHECK_INTERVAL = 60
+
+def _widen_column_sql(dialect: str, table_name: str, col: Column, type_sql: str):
+    # SQLite does not enforce string lengths, other databases name the change differently
+    not_null = '' if col.nullable else ' NOT NULL'
+    if dialect == 'mssql':
+        return f"ALTER TABLE {table_name} ALTER COLUMN {col.name} {type_sql}{not_null}"
+    if dialect == 'postgresql':
+        return f"ALTER TABLE {table_name} ALTER COLUMN {col.name} TYPE {type_sql}"
+    if dialect in ('mysql', 'mariadb'):
+        return f"ALTER TABLE {table_name} MODIFY {col.name} {type_sql}{not_null}"
+    return None
+
+def init_audit_database(database_uri: str):
+    """
+    Create the conversion log table of the audit database, or add the
+    audit columns an older table lacks and widen its string columns that
+    are narrower than the model's
+
+    Run by ``init-db``. A separate audit database holds no users table, so
+    the table is created there without the user foreign key.
+
+    Args:
+        database_uri (str): SQLAlchemy URI of the audit database
+    """
+    engine = create_engine(database_uri)
+    try:
+        logs = ConversionLog.__table__
+        existing = inspect(engine)
+        if not existing.has_table(logs.name):
+            Table(logs.name, MetaData(), *(
+                Column(col.name, col.type, primary_key=col.primary_key, nullable=col.nullable, index=col.index)
+                for col in logs.columns
+            )).create(engine)
+            return
+        
+        present = {col['name']: col['type'] for col in existing.get_columns(logs.name)}
+        with engine.begin() as conn:
+            for col in logs.columns:
+                type_sql = col.type.compile(engine.dialect)
+                if col.name not in present:
+                    # Audit columns are nullable, so they can be added to a filled table
+                    conn.execute(text(f"ALTER TABLE {logs.name} ADD COLUMN {col.name} {type_sql}"))
+                    continue
+                length = getattr(present[col.name], 'length', None)
+                if isinstance(col.type, String) and col.type.length and length and length < col.type.length:
+                    statement = _widen_column_sql(engine.dialect.name, logs.name, col, type_sql)
+                    if statement:
+                        conn.execute(text(statement))
+                    else:
+                        logging.getLogger(__name__).warning(
+                            f"{logs.name}.{col.name} holds {length} characters, values are cut to fit"
+                        )
+    finally:
+        engine.dispose()
+
+class ConversionAuditWriter:
+    """
+    Buffered writer of ConversionLog rows.
+
+    Committing one audit row per conversion would put a database round trip
+    on every job. Rows are queued in memory instead and a background thread
+    inserts them in batches, one executemany per batch. On mssql+pyodbc the
+    engine uses ``fast_executemany``, so a batch goes to the server as a
+    single bulk parameter array. Any SQLAlchemy URI works, e.g. a SQLite
+    file as a stand-in for tests.
+
+    Rows carry the user id of the main database, so a separate audit
+    database needs no users of its own. Audit columns missing from an older
+    table are left out of the inserts until ``init-db`` adds them, and
+    strings are cut to the column lengths the table has.
+
+    A batch is kept for the next flush while the database is unreachable.
+    A batch the database rejects is written row by row instead, and the
+    rows it still rejects are logged and dropped, so that they cannot hold
+    up the rows queued after them.
+    """
+
+    def __init__(self, database_uri: str, batch_size: int = 500, flush_interval: float = 2.0,
+                 max_pending: int = 100000):
+        """
+        Initialize ConversionAuditWriter and start its flush thread
+
+        Args:
+            database_uri (str): SQLAlchemy URI of the audit database
+            batch_size (int, optional): Rows per insert; a full batch is
+                                        flushed without waiting
+            flush_interval (float, optional): Seconds between flushes
+            max_pending (int, optional): Rows kept while the database is
+                                         unreachable; older rows are dropped
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.logger = logging.getLogger(__name__)
+        self.engine = create_engine(database_uri, **self.engine_options(database_uri))
+        self._table = None
+        self._lengths = {}
+        self._table_expires = None
+
+        self._pending = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='conversion-audit-writer', daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def engine_options(database_uri: str) -> Dict[str, Any]:
+        """
+        Engine options for bulk inserts on the given database
+
+        Args:
+            database_uri (str): SQLAlchemy URI
+
+        Returns:
+            dict: Keyword arguments for create_engine
+        """
+        if database_uri.startswith('mssql+pyodbc'):
+            return {'fast_executemany': True, 'pool_pre_ping': True}
+        return {}
+
+    def record(self, user_id: str, **fields):
+        """
+        Queue an audit row
+
+        Args:
+            user_id (str): Id of the user who requested the conversion
+            **fields: ConversionLog column values named in AUDIT_FIELDS
+        
+        Raises:
+            ValueError: If a field is not an audit column
+        """
+        unknown_fields = set(fields) - set(AUDIT_FIELDS)
+        if unknown_fields:
+            raise ValueError(f"Unknown audit fields: {', '.join(sorted(unknown_fields))}")
+        
+        # Every row carries every column, so a batch is one executemany
+        row = {field: fields.get(field) for field in AUDIT_FIELDS}
+        row['status'] = row['status'] or 'completed'
+        row['error'] = row['error'][:500] if row['error'] else None
+        row['user_id'] = user_id
+        row['created_at'] = datetime.utcnow()
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self.logger.error("Conversion audit buffer full, dropping the oldest row")
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+
+    def flush(self) -> int:
+        """
+        Insert every queued row
+
+        Returns:
+            int: Number of rows written
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                if not batch:
+                    return written
+                try:
+                    written += self._insert(batch)
+                    continue
+                except Exception as e:
+                    # Looked up again in case init-db changed the table
+                    self._table = None
+                    if self._unreachable(e):
+                        self.logger.error(f"Error writing conversion audit log: {str(e)}")
+                        self._requeue(batch)
+                        return written
+                    self.logger.error(f"Error writing conversion audit log batch, writing it row by row: {str(e)}")
+                
+                for index, row in enumerate(batch):
+                    try:
+                        written += self._insert([row])
+                    except Exception as e:
+                        if self._unreachable(e):
+                            self.logger.error(f"Error writing conversion audit log: {str(e)}")
+                            self._requeue(batch[index:])
+                            return written
+                        self.logger.error(
+                            f"Dropping conversion audit row of job {row.get('job_id')}: {str(e)}"
+                        )
+
+    def close(self):
+        """
+        Stop the flush thread and write the remaining rows
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self.engine.dispose()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if not self._closed:
+                self.flush()
+
+    def _requeue(self, batch: List[Dict[str, Any]]):
+        with self._lock:
+            # Kept for the next flush, ahead of newer rows
+            self._pending.extendleft(reversed(batch))
+
+    @staticmethod
+    def _unreachable(error: Exception) -> bool:
+        # Errors of the connection or a missing table, not of the rows
+        return (
+            isinstance(error, (OperationalError, InterfaceError, ValueError))
+            or getattr(error, 'connection_invalidated', False)
+        )
+
+    def _insert(self, batch: List[Dict[str, Any]]) -> int:
+        logs = self._log_table()
+        rows = []
+        for row in batch:
+            values = {key: row[key] for key in logs.columns.keys()}
+            for key, length in self._lengths.items():
+                if isinstance(values[key], str) and len(values[key]) > length:
+                    values[key] = values[key][:length]
+            rows.append(values)
+        with self.engine.begin() as conn:
+            conn.execute(logs.insert(), rows)
+        return len(rows)
+
+    def _log_table(self):
+        # The conversion log columns the audit database has, looked up again
+        # after a failed insert and, while columns are missing, now and then
+        if self._table_expires is not None and time.monotonic() >= self._table_expires:
+            self._table = None
+        if self._table is None:
+            existing = inspect(self.engine)
+            if not existing.has_table(ConversionLog.__tablename__):
+                raise ValueError(f"No {ConversionLog.__tablename__} table, run init-db")
+            present = {col['name']: col['type'] for col in existing.get_columns(ConversionLog.__tablename__)}
+            names = ('user_id', 'created_at') + AUDIT_FIELDS
+            missing = [name for name in names if name not in present]
+            if missing:
+                self.logger.warning(
+                    f"Conversion log table lacks {', '.join(missing)}, run init-db to add them"
+                )
+            self._table_expires = time.monotonic() + AUDIT_COLUMNS_RECHECK_INTERVAL if missing else None
+            self._lengths = {
+                name: present[name].length for name in names
+                if name in present and isinstance(present[name], String) and present[name].length
+            }
+            self._table = table(
+                ConversionLog.__tablename__, *(column(name) for name in names if name in present)
+            )
+        return self._table
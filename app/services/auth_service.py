@@ -1,8 +1,24 @@
+from flask import current_app
+from sqlalchemy import event, inspect, or_
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
 from werkzeug.security import generate_password_hash, check_password_hash
 from app.models import db, User
+from app.services.identity_cache import IdentityCache
 
 class AuthService:
+    # Shared by all instances, so that user changes invalidate every lookup
+    _identity_cache = None
+
+    @property
+    def identity_cache(self) -> IdentityCache:
+        if AuthService._identity_cache is None:
+            AuthService._identity_cache = IdentityCache(
+                max_size=current_app.config.get('IDENTITY_CACHE_SIZE', 10000),
+                ttl=current_app.config.get('IDENTITY_CACHE_TTL', 60)
+            )
+        return AuthService._identity_cache
+
     def register_user(self, user_id, username, password, email, is_admin=False):
         """
         Register a new user
@@ -19,11 +35,14 @@ class AuthService:
         Raises:
             ValueError: If username or email already exists
         """
-        # Check if user already exists
-        if User.query.filter_by(username=username).first():
-            raise ValueError('Username already exists')
-        
-        if User.query.filter_by(email=email).first():
+        # Check if username or email already exist in one query
+        existing = db.session.query(User.username).filter(
+            or_(User.username == username, User.email == email)
+        ).limit(2).all()
+        if existing:
+            # Compared without case, as a case-insensitive collation matches
+            if any(row.username.lower() == username.lower() for row in existing):
+                raise ValueError('Username already exists')
             raise ValueError('Email already exists')
         
         # Hash the password
@@ -65,12 +84,18 @@ class AuthService:
         if not user or not check_password_hash(user.password, password):
             raise ValueError('Invalid credentials')
         
+        # The new token's identity is looked up on the following requests
+        self._cache_user(user)
         return user
 
     def get_user_by_username(self, username):
         """
         Retrieve user by username
         
+        Users are served from the identity cache when possible, attached to
+        the current session without a query. Entries are dropped when the
+        user is updated or deleted, and expire after IDENTITY_CACHE_TTL.
+        
         Args:
             username (str): Username to search for
         
@@ -80,9 +105,63 @@ class AuthService:
         Raises:
             ValueError: If user not found
         """
+        columns = self.identity_cache.get(username)
+        if columns is not None:
+            user = User(**columns)
+            make_transient_to_detached(user)
+            return db.session.merge(user, load=False)
+        
         user = User.query.filter_by(username=username).first()
         
         if not user:
             raise ValueError('User not found')
         
-        return user
\ No newline at end of file
+        self._cache_user(user)
+        return user
+
+    def _cache_user(self, user):
+        # Column values rather than the instance, which is bound to its
+        # session. The password hash is left out; it is loaded from the
+        # database if a cached user's password is read.
+        columns = {
+            column.key: getattr(user, column.key) for column in inspect(User).column_attrs
+            if column.key not in UNCACHED_COLUMNS
+        }
+        self.identity_cache.put(user.username, columns)
+
+
+# User columns kept out of the identity cache
+UNCACHED_COLUMNS = ('password',)
+
+# Session.info key of the usernames to invalidate again once committed
+STALE_IDENTITIES = 'stale_identities'
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_identity(mapper, connection, user):
+    cache = AuthService._identity_cache
+    if cache is None:
+        return
+    # A renamed user is cached under the old username
+    usernames = [user.username] + list(inspect(user).attrs.username.history.deleted)
+    for username in usernames:
+        cache.invalidate(username)
+    # A lookup between the flush and the commit reads the old row and
+    # caches it again
+    session = object_session(user)
+    if session is not None:
+        session.info.setdefault(STALE_IDENTITIES, set()).update(usernames)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_identities(session):
+    cache = AuthService._identity_cache
+    for username in session.info.pop(STALE_IDENTITIES, ()):
+        if cache is not None:
+            cache.invalidate(username)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_stale_identities(session):
+    session.info.pop(STALE_IDENTITIES, None)
\ No newline at end of file
@@ -0,0 +1,398 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+from typing import Dict, Any, Optional, List
+from flask import current_app
+from app.services.sqlite_store import SQLiteStore
+from app.services.data_converter import DataConverterService
+from app.services.job_service import JobService, JobStore, JOB_COMPLETED, JOB_FAILED
+from app.services.record_writer import ConvertedData
+from app.services.compressed_input import ARCHIVE_EXTENSIONS
+
+# Batch lifecycle states; a batch is submitting until all of its files are
+# queued, so that jobs finishing early cannot complete it
+BATCH_SUBMITTING = 'submitting'
+BATCH_RUNNING = 'running'
+BATCH_MERGING = 'merging'
+BATCH_COMPLETED = 'completed'
+BATCH_FAILED = 'failed'
+
+class BatchStore(SQLiteStore):
+    """
+    SQLite-backed store of conversion batches: the jobs started for each
+    file of a batch request and the outputs merged from them.
+    """
+
+    def _create_schema(self, conn):
+        conn.execute(
+            '''CREATE TABLE IF NOT EXISTS batches (
+                batch_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                options TEXT NOT NULL,
+                merge INTEGER NOT NULL,
+                merged TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )'''
+        )
+        # Files of a batch in request order; a file rejected before
+        # conversion has an error and no job
+        conn.execute(
+            '''CREATE TABLE IF NOT EXISTS batch_files (
+                batch_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                job_id TEXT,
+                error TEXT,
+                PRIMARY KEY (batch_id, position)
+            )'''
+        )
+
+    def create(self, user_id: str, options: Dict[str, Any], merge: bool) -> str:
+        """
+        Register a new batch, submitting until its files are added
+
+        Args:
+            user_id (str): Owner of the batch
+            options (dict): Converter options shared by its files
+            merge (bool): Whether to merge files of the same columns
+
+        Returns:
+            str: New batch id
+        """
+        batch_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO batches (batch_id, user_id, status, options, merge, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (batch_id, user_id, BATCH_SUBMITTING, json.dumps(options), int(merge), now, now)
+            )
+        return batch_id
+
+    def add_file(self, batch_id: str, position: int, name: str, job_id: str = None, error: str = None):
+        """
+        Record a file of a batch
+
+        Args:
+            batch_id (str): Batch the file belongs to
+            position (int): Place of the file in the batch
+            name (str): Name of the file, ``archive/member`` for archive members
+            job_id (str, optional): Conversion job of the file
+            error (str, optional): Why the file was not converted
+        """
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO batch_files (batch_id, position, name, job_id, error) VALUES (?, ?, ?, ?, ?)',
+                (batch_id, position, name, job_id, error)
+            )
+
+    def update(self, batch_id: str, **fields):
+        """
+        Update batch columns
+
+        Args:
+            batch_id (str): Batch to update
+            **fields: Column values; ``merged`` is stored as JSON
+        """
+        if 'merged' in fields:
+            fields['merged'] = json.dumps(fields['merged'])
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f"{column} = ?" for column in fields)
+        with self._connect() as conn:
+            conn.execute(
+                f'UPDATE batches SET {assignments} WHERE batch_id = ?',
+                (*fields.values(), batch_id)
+            )
+
+    def claim(self, batch_id: str, status: str) -> bool:
+        """
+        Move a running batch on to a new status, once
+
+        Args:
+            batch_id (str): Batch to update
+            status (str): New status
+
+        Returns:
+            bool: True if this call changed the status
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                'UPDATE batches SET status = ?, updated_at = ? WHERE batch_id = ? AND status = ?',
+                (status, time.time(), batch_id, BATCH_RUNNING)
+            ).rowcount == 1
+
+    def get(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a batch with its files and the state of their jobs
+
+        Args:
+            batch_id (str): Batch to fetch
+
+        Returns:
+            dict: Batch details with ``files`` in order, or None if the batch
+                  does not exist
+        """
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM batches WHERE batch_id = ?', (batch_id,)).fetchone()
+            if row is None:
+                return None
+            files = conn.execute(
+                'SELECT name, job_id, error FROM batch_files WHERE batch_id = ? ORDER BY position',
+                (batch_id,)
+            ).fetchall()
+
+        batch = dict(row)
+        batch['options'] = json.loads(batch['options'])
+        batch['merge'] = bool(batch['merge'])
+        batch['merged'] = json.loads(batch['merged']) if batch['merged'] else None
+        batch['files'] = [dict(file) for file in files]
+        return batch
+
+
+def run_batch_merge(job_db_path: str, batch_db_path: str, batch_id: str, config: Dict[str, Any]):
+    """
+    Merge the converted files of a finished batch inside a pool worker
+
+    Files whose columns are the same are joined, in batch order, into one
+    converted data file per schema with the batch's output formats. A schema
+    of a single file is left as it is.
+
+    Args:
+        job_db_path (str): Path to the job store database
+        batch_db_path (str): Path to the batch store database
+        batch_id (str): Batch being merged
+        config (dict): Converter settings from the submitting app
+    """
+    job_store = JobStore(job_db_path)
+    batch_store = BatchStore(batch_db_path)
+    batch = batch_store.get(batch_id)
+
+    jobs = job_store.get_many([file['job_id'] for file in batch['files'] if file['job_id']])
+    groups = {}
+    for file in batch['files']:
+        job = jobs.get(file['job_id'])
+        if not job or job['status'] != JOB_COMPLETED:
+            continue
+        conversion_result = job['result']['conversion_result']
+        columns = ConvertedData(conversion_result['data_path']).columns
+        if columns:
+            groups.setdefault(frozenset(columns), []).append((file['name'], conversion_result['data_path']))
+
+    try:
+        service = DataConverterService(config)
+        merged = []
+        for index, files in enumerate(group for group in groups.values() if len(group) > 1):
+            base_path = service.file_handler.shard_path(f"{batch_id}_merged{index}")
+            result = service.merge(
+                [data_path for _, data_path in files], base_path, batch['options'].get('formats'), batch['user_id']
+            )
+            job_store.add_artifacts(batch_id, [result['data_path']], batch['user_id'])
+            merged.append({'files': [name for name, _ in files], 'conversion_result': result})
+    except Exception as e:
+        batch_store.update(batch_id, status=BATCH_FAILED, error=f"Merge failed: {str(e)}")
+        return
+    batch_store.update(batch_id, status=BATCH_COMPLETED, merged=merged)
+
+
+class BatchService:
+    """
+    Convert many files per request as one batch.
+
+    Each file, or each data file of an uploaded archive, becomes a job on
+    the conversion pool, so the batch runs as concurrently as
+    CONVERSION_WORKERS allows. Once the last job has finished, files with
+    the same columns are optionally merged into combined outputs, and the
+    batch manifest reports every file's result or error.
+    """
+
+    def __init__(self, job_service: JobService = None):
+        self.job_service = job_service or JobService()
+        self.converter_service = self.job_service.converter_service
+        self.logger = logging.getLogger(__name__)
+        self._store = None
+
+    @property
+    def store(self) -> BatchStore:
+        if self._store is None:
+            self._store = BatchStore(current_app.config['JOB_DATABASE'])
+        return self._store
+
+    def submit(self, files: List[Any], user_id: str, options: Dict[str, Any] = None,
+               merge: bool = False) -> Dict[str, Any]:
+        """
+        Save the files of a batch request and queue their conversions
+
+        Files that cannot be saved, e.g. of a type that is not allowed, are
+        recorded with their error instead of failing the batch.
+
+        Args:
+            files (list): File objects from Flask request; zip archives are
+                          expanded into their data files
+            user_id (str): Identity of the requesting user
+            options (dict, optional): Converter options for every file
+            merge (bool, optional): Merge files of the same columns into one
+                                    output once all are converted
+
+        Returns:
+            dict: Batch manifest as returned by get_batch
+
+        Raises:
+            ValueError: If there are no files, too many, or merging is
+                        requested for a layout that cannot be merged
+        """
+        options = options or {}
+        if not files:
+            raise ValueError('No files provided')
+        if merge and options.get('layout', 'flat') != 'flat':
+            raise ValueError(f"The {options['layout']} layout cannot be merged")
+
+        max_files = current_app.config.get('BATCH_MAX_FILES', 1000)
+        if len(files) > max_files:
+            raise ValueError(f"A batch holds at most {max_files} files")
+
+        store = self.store
+        batch_id = store.create(user_id, options, merge)
+        app = current_app._get_current_object()
+        position = 0
+        jobs = 0
+
+        def on_done(job_id):
+            with app.app_context():
+                self._finish(batch_id)
+
+        def add(name, file_info=None, error=None):
+            # Each file is queued as soon as it is saved, so the pool starts
+            # converting while the rest of the request is still being read
+            nonlocal position, jobs
+            if file_info and jobs >= max_files:
+                file_info, error = None, f"The batch limit of {max_files} files was reached"
+            job_id = self.job_service.store.create(user_id, file_info) if file_info else None
+            store.add_file(batch_id, position, name, job_id=job_id, error=error)
+            position += 1
+            if job_id:
+                jobs += 1
+                self.job_service.submit_saved_file(file_info, user_id, options, on_done, job_id=job_id)
+
+        for file in files:
+            try:
+                file_info = self.converter_service.save_file(file, user_id)
+            except ValueError as e:
+                add(file.filename, error=str(e))
+                continue
+            if file_info['file_extension'] not in ARCHIVE_EXTENSIONS:
+                add(file_info['original_filename'], file_info)
+                continue
+
+            try:
+                members = self.converter_service.archive_members(file_info['filepath'])
+            except ValueError as e:
+                os.remove(file_info['filepath'])
+                add(file_info['original_filename'], error=str(e))
+                continue
+            if len(members) > max_files - jobs:
+                # Nothing of an archive over the limit is converted
+                os.remove(file_info['filepath'])
+                add(file_info['original_filename'],
+                    error=f"The archive holds {len(members)} files, over the batch limit of {max_files}")
+                continue
+            for member in members:
+                # Members are read from the archive; they skip the conversion
+                # cache, whose entries own their source file
+                add(f"{file_info['original_filename']}/{member.member}", dict(
+                    file_info,
+                    member=member.member,
+                    file_extension=member.file_extension,
+                    compression=member.compression,
+                    file_size=member.size,
+                    content_hash=None
+                ))
+
+        store.update(batch_id, status=BATCH_RUNNING)
+        self._finish(batch_id)
+        return self.get_batch(batch_id, user_id)
+
+    def get_batch(self, batch_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch the manifest of a batch owned by the given user
+
+        Args:
+            batch_id (str): Batch to fetch
+            user_id (str): Identity of the requesting user
+
+        Returns:
+            dict: ``batch_id``, ``status``, ``files`` with each file's
+                  ``name``, ``job_id``, ``status`` and ``result`` or
+                  ``error``, ``summary`` counts, and ``merged`` outputs once
+                  merged; None if not found or owned by another user
+        """
+        batch = self.store.get(batch_id)
+        if not batch or batch['user_id'] != user_id:
+            return None
+        # Also finishes batches whose last callback was lost, e.g. on restart
+        if batch['status'] == BATCH_RUNNING and self._finish(batch_id):
+            batch = self.store.get(batch_id)
+
+        jobs = self.job_service.store.get_many([file['job_id'] for file in batch['files'] if file['job_id']])
+        files = []
+        summary = {'total': len(batch['files']), JOB_COMPLETED: 0, JOB_FAILED: 0, 'pending': 0}
+        for file in batch['files']:
+            job = jobs.get(file['job_id'])
+            entry = {'name': file['name'], 'job_id': file['job_id']}
+            if job is None:
+                entry.update(status=JOB_FAILED, error=file['error'])
+            else:
+                entry['status'] = job['status']
+                if job['error']:
+                    entry['error'] = job['error']
+                if job['result']:
+                    entry['result'] = job['result']['conversion_result']
+            summary[entry['status'] if entry['status'] in summary else 'pending'] += 1
+            files.append(entry)
+
+        manifest = {
+            'batch_id': batch['batch_id'],
+            'status': batch['status'],
+            'merge': batch['merge'],
+            'files': files,
+            'summary': summary
+        }
+        if batch['merged'] is not None:
+            manifest['merged'] = batch['merged']
+        if batch['error']:
+            manifest['error'] = batch['error']
+        return manifest
+
+    def _finish(self, batch_id: str) -> bool:
+        # Completes the batch, or queues its merge, once no job is pending
+        batch = self.store.get(batch_id)
+        job_ids = [file['job_id'] for file in batch['files'] if file['job_id']]
+        counts = self.job_service.store.count_statuses(job_ids)
+        completed = counts.get(JOB_COMPLETED, 0)
+        if completed + counts.get(JOB_FAILED, 0) < len(job_ids):
+            return False
+
+        if not batch['merge'] or completed < 2:
+            return self.store.claim(batch_id, BATCH_COMPLETED)
+        if not self.store.claim(batch_id, BATCH_MERGING):
+            return False
+
+        config = self.job_service.pool_config()
+        future = self.job_service.executor.submit(
+            run_batch_merge, self.job_service.store.db_path, self.store.db_path, batch_id, config
+        )
+        future.add_done_callback(lambda f: self._on_merge_done(batch_id, f))
+        return True
+
+    def _on_merge_done(self, batch_id: str, future):
+        # A worker that dies never records the failed merge
+        error = future.exception()
+        if error is not None:
+            self.logger.error(f"Batch {batch_id} merge crashed: {str(error)}")
+            self.store.update(batch_id, status=BATCH_FAILED, error=f"Merge failed: {str(error)}")
@@ -0,0 +1,311 @@
+import re
+import sys
+import json
+from typing import Dict, Any, List, Optional
+import numpy as np
+import pandas as pd
+
+# Column types tried on a sample, in order, and what a column falls back to
+# when a later batch holds a value its type cannot. Integers beyond int64
+# only become floats where float64 holds them exactly, else text.
+INFERRED_TYPES = ('boolean', 'integer', 'float', 'datetime')
+FALLBACK_TYPES = {'boolean': 'string', 'integer': 'float', 'float': 'string', 'datetime': 'string'}
+
+# Text accepted for each type. Numbers with leading zeros stay strings, as
+# they are usually codes; dates must be ISO 8601 without a time zone.
+BOOLEAN_VALUES = {'true': True, 'false': False}
+INTEGER_PATTERN = r'[+-]?(?:0|[1-9]\d*)'
+FLOAT_PATTERN = r'[+-]?(?:(?:0|[1-9]\d*)(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?'
+DATETIME_PATTERN = r'\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?:\:\d{2}(?:\.\d+)?)?)?'
+
+INTEGER_DTYPES = ('int8', 'int16', 'int32', 'int64')
+FLOAT32_MAX_INTEGER = 2 ** 24
+FLOAT64_MAX_INTEGER = 2 ** 53
+
+# Bytes per value of the compact dtypes
+DTYPE_BYTES = {
+    'boolean': 1, 'int8': 1, 'int16': 2, 'int32': 4, 'int64': 8,
+    'float32': 4, 'float64': 8, 'datetime': 8
+}
+
+
+def text_values(values: pd.Series) -> pd.Series:
+    """
+    Cell values as text, nested lists and objects as JSON
+
+    Args:
+        values (pd.Series): Non-null cell values
+
+    Returns:
+        pd.Series: String values
+    """
+    return values.map(lambda value: value if isinstance(value, str) else (
+        json.dumps(value) if isinstance(value, (list, dict)) else str(value)
+    ))
+
+
+def cast_values(values: pd.Series, column_type: str) -> Optional[pd.Series]:
+    """
+    Convert non-null cell values to a column type in bulk
+
+    Args:
+        values (pd.Series): Non-null cell values, object dtype
+        column_type (str): One of INFERRED_TYPES
+
+    Returns:
+        pd.Series: Converted values, or None if any value does not convert
+    """
+    # XML values are all strings, which pandas tells without a Python loop
+    if pd.api.types.infer_dtype(values, skipna=False) == 'string':
+        kinds = {str}
+    else:
+        kinds = set(values.map(type).unique())
+
+    if column_type == 'boolean':
+        if not kinds <= {bool, str}:
+            return None
+        text = values if kinds == {str} else values.map(str)
+        converted = text.str.lower().map(BOOLEAN_VALUES)
+        return converted.astype(bool) if converted.notna().all() else None
+
+    if column_type in ('integer', 'float'):
+        allowed = {int, str} if column_type == 'integer' else {int, float, str}
+        if not kinds <= allowed:
+            return None
+        if str in kinds:
+            strings = values if kinds == {str} else values[values.map(type) == str]
+            pattern = INTEGER_PATTERN if column_type == 'integer' else FLOAT_PATTERN
+            if not strings.str.fullmatch(pattern).all():
+                return None
+        converted = pd.to_numeric(values, errors='coerce')
+        if converted.isna().any():
+            return None
+        if column_type == 'integer':
+            # Integers beyond int64 are not integer columns
+            return converted if converted.dtype.kind == 'i' else None
+        converted = converted.astype('float64')
+        return converted if exact_floats(values, converted) else None
+
+    if column_type == 'datetime':
+        if kinds != {str} or not values.str.fullmatch(DATETIME_PATTERN).all():
+            return None
+        converted = pd.to_datetime(values, format='ISO8601', errors='coerce')
+        return converted if converted.notna().all() else None
+
+    raise ValueError(f"Unsupported column type: {column_type}")
+
+
+def exact_floats(values: pd.Series, converted: pd.Series) -> bool:
+    """
+    Tell whether float64 holds the integers among some values exactly
+
+    Args:
+        values (pd.Series): Non-null cell values
+        converted (pd.Series): The values as float64
+
+    Returns:
+        bool: False if an integer, or integer text, would be rounded
+    """
+    large = converted.abs() > FLOAT64_MAX_INTEGER
+    if not large.any():
+        return True
+    for value, number in zip(values[large], converted[large]):
+        if isinstance(value, str) and not re.fullmatch(INTEGER_PATTERN, value):
+            continue
+        if isinstance(value, (int, str)) and int(value) != int(number):
+            return False
+    return True
+
+
+def non_null(values: pd.Series) -> pd.Series:
+    # Empty strings are missing values too: XML has no other way to say so
+    return values[values.notna() & (values != '')]
+
+
+def cast_column(values: pd.Series, column_type: Dict[str, Any]) -> pd.Series:
+    """
+    Convert a batch of a column's cell values to its inferred dtype
+
+    Args:
+        values (pd.Series): Cell values, object dtype
+        column_type (dict): Entry of ``ColumnTypeInference.result()['types']``
+
+    Returns:
+        pd.Series: Values in the compact dtype, missing values as nulls
+    """
+    dtype = column_type['dtype']
+    present = non_null(values)
+    if dtype in ('string', 'category'):
+        text = pd.Series(None, index=values.index, dtype=object)
+        text[present.index] = text_values(present)
+        if dtype == 'category':
+            return text.astype(pd.CategoricalDtype(column_type['categories']))
+        return text
+
+    column_kind = {'boolean': 'boolean', 'datetime': 'datetime'}.get(dtype) or (
+        'integer' if dtype.startswith('int') else 'float'
+    )
+    converted = cast_values(present, column_kind) if len(present) else present
+    if dtype == 'datetime':
+        result = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    else:
+        nullable = {'boolean': 'boolean', 'float32': 'float32', 'float64': 'float64'}.get(dtype) or dtype.capitalize()
+        result = pd.Series(None, index=values.index, dtype=nullable)
+    if len(present):
+        result[present.index] = converted
+    return result
+
+
+def python_values(values: pd.Series) -> List[Any]:
+    """
+    Typed values as Python objects, nulls as None
+
+    Args:
+        values (pd.Series): Values from cast_column
+
+    Returns:
+        list: Cell values
+    """
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+class ColumnTypeInference:
+    """
+    Infer compact column types for converted data with pandas bulk conversions.
+
+    The first batch is a sample: for each column it proposes the first of
+    boolean, integer, float and datetime that all its values convert to,
+    or string. Every later batch is cast to the proposed type in bulk and a
+    column holding a value its type cannot falls back to a wider one.
+
+    Integer and float columns record their range, so they can be stored in
+    the narrowest dtype that holds them. String columns with few distinct
+    values become categories. The memory the data would take in object
+    columns and in the compact dtypes is estimated as batches go by.
+    """
+
+    def __init__(self, width: int, category_max_distinct: int = 1000):
+        """
+        Initialize ColumnTypeInference
+
+        Args:
+            width (int): Number of columns
+            category_max_distinct (int, optional): Most distinct values a
+                                                   string column may have to
+                                                   become a category
+        """
+        self.category_max_distinct = category_max_distinct
+        self.total_rows = 0
+        self.columns = [
+            {'type': None, 'min': None, 'max': None, 'float32': True, 'values': 0,
+             'distinct': set(), 'object_bytes': 0}
+            for _ in range(width)
+        ]
+
+    def update(self, frame: pd.DataFrame):
+        """
+        Cast a batch of rows and narrow the column types down
+
+        Args:
+            frame (pd.DataFrame): Rows of object dtype, one column per data
+                                  column in order
+        """
+        self.total_rows += len(frame)
+        object_bytes = frame.memory_usage(deep=True, index=False)
+        for index, column in enumerate(self.columns):
+            column['object_bytes'] += int(object_bytes.iloc[index])
+            values = non_null(frame.iloc[:, index])
+            if not len(values):
+                continue
+            column['values'] += len(values)
+
+            if column['type'] is None:
+                # The first values of a column are its sample
+                column_type, converted = 'string', None
+                for candidate in INFERRED_TYPES:
+                    converted = cast_values(values, candidate)
+                    if converted is not None:
+                        column_type = candidate
+                        break
+            else:
+                column_type = column['type']
+                converted = None if column_type == 'string' else cast_values(values, column_type)
+                while converted is None and column_type != 'string':
+                    column_type = FALLBACK_TYPES[column_type]
+                    if column_type == 'float' and column['type'] == 'integer' and max(
+                        abs(column['min']), abs(column['max'])
+                    ) > FLOAT64_MAX_INTEGER:
+                        # The integers of earlier batches would be rounded
+                        column_type = 'string'
+                    if column_type != 'string':
+                        converted = cast_values(values, column_type)
+                if column_type != column['type']:
+                    self._widen(column, column_type)
+            column['type'] = column_type
+            self._track(column, values, converted)
+
+    @staticmethod
+    def _widen(column: Dict[str, Any], column_type: str):
+        if column_type == 'string':
+            # Distinct values of the earlier batches were not collected
+            column['distinct'] = None
+        elif column['type'] == 'integer':
+            bound = max(abs(column['min']), abs(column['max']))
+            column['float32'] = bool(bound <= FLOAT32_MAX_INTEGER)
+
+    def _track(self, column: Dict[str, Any], values: pd.Series, converted: Optional[pd.Series]):
+        if column['type'] in ('integer', 'float'):
+            low, high = converted.min(), converted.max()
+            column['min'] = low if column['min'] is None else min(column['min'], low)
+            column['max'] = high if column['max'] is None else max(column['max'], high)
+            if column['type'] == 'float' and column['float32']:
+                column['float32'] = bool((converted.astype('float32').astype('float64') == converted).all())
+        elif column['type'] == 'string' and column['distinct'] is not None:
+            column['distinct'].update(text_values(values).unique())
+            if len(column['distinct']) > self.category_max_distinct:
+                column['distinct'] = None
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Final column types and memory estimate
+
+        Returns:
+            dict: ``types``, a ``{'dtype': ...}`` entry per column, with the
+                  ``categories`` of category columns, and ``memory`` with the
+                  estimated ``object_bytes`` and ``typed_bytes`` of the data
+        """
+        types = []
+        typed_bytes = 0
+        for column in self.columns:
+            column_type = self._dtype(column)
+            types.append(column_type)
+            typed_bytes += self._typed_bytes(column, column_type)
+        object_bytes = sum(column['object_bytes'] for column in self.columns)
+        return {'types': types, 'memory': {'object_bytes': object_bytes, 'typed_bytes': typed_bytes}}
+
+    def _dtype(self, column: Dict[str, Any]) -> Dict[str, Any]:
+        column_type = column['type']
+        if column_type == 'integer':
+            dtype = next(
+                dtype for dtype in INTEGER_DTYPES
+                if np.iinfo(dtype).min <= column['min'] and column['max'] <= np.iinfo(dtype).max
+            )
+            return {'dtype': dtype}
+        if column_type == 'float':
+            return {'dtype': 'float32' if column['float32'] else 'float64'}
+        if column_type in ('boolean', 'datetime'):
+            return {'dtype': column_type}
+
+        distinct = column['distinct']
+        if distinct and len(distinct) * 2 <= column['values']:
+            return {'dtype': 'category', 'categories': sorted(distinct)}
+        return {'dtype': 'string'}
+
+    def _typed_bytes(self, column: Dict[str, Any], column_type: Dict[str, Any]) -> int:
+        dtype = column_type['dtype']
+        if dtype == 'string':
+            return column['object_bytes']
+        if dtype == 'category':
+            code_bytes = 1 if len(column_type['categories']) < 128 else 2 if len(column_type['categories']) < 32768 else 4
+            return self.total_rows * code_bytes + sum(sys.getsizeof(value) for value in column_type['categories'])
+        return self.total_rows * DTYPE_BYTES[dtype]
@@ -0,0 +1,219 @@
+import io
+import os
+import gzip
+import hashlib
+import zipfile
+from contextlib import contextmanager, ExitStack
+from typing import List, Optional, Tuple, Iterable
+
+# Compressed single files, by the extension following the data type's
+# (``report.xml.gz``), and archives holding any number of data files
+COMPRESSED_EXTENSIONS = ('gz', 'zst')
+ARCHIVE_EXTENSIONS = ('zip',)
+
+
+def split_extension(filename: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Split a filename's data type from its compression
+
+    Args:
+        filename (str): File name, e.g. ``report.xml.gz``
+
+    Returns:
+        tuple: Data type extension (``xml``; ``zip`` for an archive) and
+               compression extension (``gz``, ``zst`` or None); the type is
+               None if the name has no extension before the compression's
+    """
+    parts = os.path.basename(filename).lower().split('.')
+    if len(parts) < 2:
+        return None, None
+    if parts[-1] in COMPRESSED_EXTENSIONS:
+        return (parts[-2] if len(parts) > 2 else None), parts[-1]
+    return parts[-1], None
+
+
+def strip_extension(path: str) -> str:
+    """
+    Path without its data type and compression extensions
+
+    Args:
+        path (str): File path, e.g. ``uploads/abc.xml.gz``
+
+    Returns:
+        str: Path without extensions, e.g. ``uploads/abc``
+    """
+    file_extension, compression = split_extension(path)
+    suffix = ''.join(f".{extension}" for extension in (file_extension, compression) if extension)
+    return path[:-len(suffix)] if suffix else path
+
+
+def decompress(stream, compression: Optional[str]):
+    """
+    Wrap a binary stream so that reads return decompressed bytes
+
+    Data is decompressed as it is read, nothing is written to disk.
+
+    Args:
+        stream: Readable binary stream
+        compression (str): ``gz``, ``zst`` or None for uncompressed data
+
+    Returns:
+        Readable binary stream of the decompressed data
+
+    Raises:
+        ValueError: If the compression is unsupported or its package is missing
+    """
+    if compression is None:
+        return stream
+    if compression == 'gz':
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    if compression == 'zst':
+        try:
+            import zstandard
+            return zstandard.ZstdDecompressor().stream_reader(stream)
+        except ImportError:
+            pass
+        try:
+            import pyarrow
+        except ImportError:
+            raise ValueError("zstd input requires the zstandard or pyarrow package")
+        return pyarrow.CompressedInputStream(stream, 'zstd')
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+class HeadReader(io.RawIOBase):
+    """
+    Read a stream in small pieces, up to where its input is cut off.
+
+    Decompressors fail a read that reaches past input cut off mid-frame,
+    discarding what that read had decompressed so far. Small reads hand the
+    data before the cut to the parser first, as previews of a file's first
+    bytes need, and the failing read ends the stream instead of raising, so
+    that parsers which read ahead, e.g. through a TextIOWrapper, keep the
+    data they were given.
+    """
+
+    def __init__(self, stream, read_size: int = 4096):
+        self.stream = stream
+        self.read_size = read_size
+        self.cut_off = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.cut_off:
+            return 0
+        try:
+            data = self.stream.read(min(len(buffer), self.read_size))
+        except (EOFError, OSError):
+            # Compressed input cut off mid-block
+            self.cut_off = True
+            return 0
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        self.cut_off = False
+        return self.stream.seek(offset, whence)
+
+
+class InputSource:
+    """
+    A file to convert, read through its decompression.
+
+    Plain files are read as they are and can be split into byte ranges.
+    Gzip and zstd files, and members of a zip archive, are decompressed as
+    they are parsed and can only be read from the start.
+    """
+
+    def __init__(self, path: str, member: str = None, size: int = None):
+        """
+        Initialize InputSource
+
+        Args:
+            path (str): Path of the file, or of the archive holding the member
+            member (str, optional): Name of the zip member to read
+            size (int, optional): Size of the member, uncompressed
+        """
+        self.path = path
+        self.member = member
+        self.size = size
+        self.file_extension, self.compression = split_extension(member or path)
+        # Output path without extension; members get their own next to the archive's
+        self.base_path = strip_extension(path)
+        if member is not None:
+            self.base_path += f".{hashlib.sha1(member.encode('utf-8')).hexdigest()[:16]}"
+
+    @classmethod
+    def of(cls, source) -> 'InputSource':
+        """
+        The input source for a path, or the source itself
+
+        Args:
+            source (str or InputSource): File path or input source
+
+        Returns:
+            InputSource: Input source
+        """
+        return source if isinstance(source, cls) else cls(source)
+
+    @property
+    def seekable(self) -> bool:
+        # Byte offsets only mean something in an uncompressed file
+        return self.member is None and self.compression is None
+
+    @property
+    def name(self) -> str:
+        return self.member or os.path.basename(self.path)
+
+    @contextmanager
+    def open(self):
+        """
+        Open the source for reading
+
+        Yields:
+            Readable binary stream of the decompressed content
+        """
+        with ExitStack() as stack:
+            if self.member is None:
+                stream = stack.enter_context(open(self.path, 'rb'))
+            else:
+                # The member stays readable after the archive is closed
+                with zipfile.ZipFile(self.path) as archive:
+                    stream = stack.enter_context(archive.open(self.member))
+            if self.compression:
+                stream = stack.enter_context(decompress(stream, self.compression))
+            yield stream
+
+    def members(self, file_extensions: Iterable[str]) -> List['InputSource']:
+        """
+        Data files of a zip archive, in archive order
+
+        Directories, hidden files and members of other types are skipped.
+
+        Args:
+            file_extensions (iterable): Data types to include, e.g. ``xml``
+
+        Returns:
+            list: An input source per member
+
+        Raises:
+            ValueError: If the file is not a valid zip archive
+        """
+        try:
+            with zipfile.ZipFile(self.path) as archive:
+                infos = [info for info in archive.infolist() if not info.is_dir()]
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"Invalid zip archive: {str(e)}")
+
+        members = []
+        for info in infos:
+            name = info.filename
+            basename = os.path.basename(name)
+            if basename.startswith('.') or name.startswith('__MACOSX/'):
+                continue
+            file_extension, compression = split_extension(basename)
+            if file_extension in file_extensions and compression in (None, *COMPRESSED_EXTENSIONS):
+                members.append(InputSource(self.path, name, info.file_size))
+        return members
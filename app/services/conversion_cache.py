@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Dict, Any, Optional, List
+from app.services.sqlite_store import SQLiteStore
+from app.services.artifact_store import ArtifactStore, result_paths
+
+# Bump when converter output changes so stale artifacts are not reused
+CONVERTER_VERSION = 4
+
+class ConversionCache(SQLiteStore):
+    """
+    Content-addressed cache of conversion artifacts.
+
+    Entries are keyed by the upload's content hash, its file type and the
+    converter options, and point at the converted data and its outputs
+    already sitting in the upload folder. The index lives in SQLite so the web process and the
+    job workers share it. Entries are evicted least recently used first once
+    they exceed the configured age or the total size budget.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = None, max_age: int = None,
+                 artifacts: ArtifactStore = None):
+        """
+        Initialize ConversionCache and create its tables if needed
+
+        Args:
+            db_path (str): Path to the SQLite index file
+            max_bytes (int, optional): Total size budget for cached files
+            max_age (int, optional): Seconds since last access before eviction
+            artifacts (ArtifactStore, optional): Index to drop evicted files from
+        """
+        self.artifacts = artifacts
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.logger = logging.getLogger(__name__)
+        super().__init__(db_path)
+
+    def _create_schema(self, conn):
+        conn.execute(
+            '''CREATE TABLE IF NOT EXISTS cache_entries (
+                cache_key TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                source_path TEXT NOT NULL,
+                data_path TEXT NOT NULL,
+                result TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )'''
+        )
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS ix_cache_entries_last_access '
+            'ON cache_entries (last_access)'
+        )
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS ix_cache_entries_data_path '
+            'ON cache_entries (data_path)'
+        )
+        conn.execute(
+            '''CREATE TABLE IF NOT EXISTS cache_stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )'''
+        )
+
+    @staticmethod
+    def make_key(content_hash: str, file_extension: str, options: Dict[str, Any] = None) -> str:
+        """
+        Build the cache key for an upload and its converter options
+
+        Args:
+            content_hash (str): SHA-256 of the uploaded bytes
+            file_extension (str): Extension that selects the converter
+            options (dict, optional): Converter options affecting the output
+
+        Returns:
+            str: Cache key
+        """
+        fingerprint = json.dumps(
+            [CONVERTER_VERSION, file_extension, options or {}],
+            sort_keys=True, default=str
+        )
+        options_hash = hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+        return f"{content_hash}:{options_hash}"
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up cached conversion output
+
+        Args:
+            cache_key (str): Key from make_key
+
+        Returns:
+            dict: ``result`` and ``source_path`` of the cached conversion,
+                  or None on a miss
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT result, source_path FROM cache_entries WHERE cache_key = ?', (cache_key,)
+            ).fetchone()
+
+            entry = {'result': json.loads(row[0]), 'source_path': row[1]} if row else None
+            if entry and not os.path.exists(entry['result']['data_path']):
+                # Artifacts were removed behind our back, treat as a miss
+                conn.execute('DELETE FROM cache_entries WHERE cache_key = ?', (cache_key,))
+                entry = None
+
+            if entry is None:
+                self._increment(conn, 'misses')
+                return None
+
+            conn.execute(
+                'UPDATE cache_entries SET last_access = ? WHERE cache_key = ?',
+                (time.time(), cache_key)
+            )
+            self._increment(conn, 'hits')
+            return entry
+
+    def put(self, cache_key: str, content_hash: str, source_path: str, result: Dict[str, Any]):
+        """
+        Record conversion output and evict old entries if over budget
+
+        Args:
+            cache_key (str): Key from make_key
+            content_hash (str): SHA-256 of the uploaded bytes
+            source_path (str): Path to the uploaded file
+            result (dict): Conversion result pointing at the output files
+        """
+        paths = [source_path] + self._output_paths(result)
+        size_bytes = sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_entries '
+                '(cache_key, content_hash, source_path, data_path, result, size_bytes, created_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (cache_key, content_hash, source_path, result['data_path'], json.dumps(result),
+                 size_bytes, now, now)
+            )
+        self.evict(keep=cache_key)
+
+    def add_size(self, data_path: str, size_bytes: int):
+        """
+        Account for an output materialized after the entry was cached
+
+        Args:
+            data_path (str): Converted data the output was produced from
+            size_bytes (int): Size of the new output file
+        """
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE cache_entries SET size_bytes = size_bytes + ? WHERE data_path = ?',
+                (size_bytes, data_path)
+            )
+
+    def evict(self, keep: str = None) -> int:
+        """
+        Remove entries past the age limit, then least recently used entries
+        until the cache fits the size budget
+
+        Args:
+            keep (str, optional): Key that must not be evicted, e.g. the entry
+                                  just added for the caller
+
+        Returns:
+            int: Number of entries evicted
+        """
+        with self._connect() as conn:
+            evicted = []
+            if self.max_age:
+                evicted.extend(conn.execute(
+                    'SELECT cache_key, source_path, result FROM cache_entries WHERE last_access < ?',
+                    (time.time() - self.max_age,)
+                ).fetchall())
+                self._delete_entries(conn, evicted)
+
+            if self.max_bytes:
+                total = conn.execute(
+                    'SELECT COALESCE(SUM(size_bytes), 0) FROM cache_entries'
+                ).fetchone()[0]
+                over_budget = []
+                if total > self.max_bytes:
+                    for cache_key, source_path, result, size_bytes in conn.execute(
+                        'SELECT cache_key, source_path, result, size_bytes '
+                        'FROM cache_entries ORDER BY last_access'
+                    ).fetchall():
+                        if total <= self.max_bytes:
+                            break
+                        if cache_key == keep:
+                            continue
+                        over_budget.append((cache_key, source_path, result))
+                        total -= size_bytes
+                self._delete_entries(conn, over_budget)
+                evicted.extend(over_budget)
+
+            if evicted:
+                self._increment(conn, 'evictions', len(evicted))
+
+        return len(evicted)
+
+    def _delete_entries(self, conn, entries):
+        for cache_key, source_path, result in entries:
+            self._remove_files([source_path] + self._output_paths(json.loads(result)))
+            conn.execute('DELETE FROM cache_entries WHERE cache_key = ?', (cache_key,))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Cache counters and current size
+
+        Returns:
+            dict: hits, misses, evictions, entries and size_bytes
+        """
+        with self._connect() as conn:
+            counters = dict(conn.execute('SELECT name, value FROM cache_stats').fetchall())
+            entries, size_bytes = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM cache_entries'
+            ).fetchone()
+        return {
+            'hits': counters.get('hits', 0),
+            'misses': counters.get('misses', 0),
+            'evictions': counters.get('evictions', 0),
+            'entries': entries,
+            'size_bytes': size_bytes
+        }
+
+    @staticmethod
+    def _increment(conn, name: str, amount: int = 1):
+        conn.execute(
+            'INSERT INTO cache_stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            (name, amount)
+        )
+
+    @staticmethod
+    def _output_paths(result: Dict[str, Any]) -> List[str]:
+        # Child tables of the relational layout have files of their own
+        return result_paths(result)
+
+    def _remove_files(self, paths: List[str]):
+        for path in paths:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                self.logger.error(f"Error evicting cached file {path}: {str(e)}")
+        if self.artifacts:
+            self.artifacts.forget(paths)
@@ -1,16 +1,84 @@
+import io
 import os
+import csv
+import glob
+import mmap
 import json
-import xmltodict
-import pandas as pd
+import time
+import cProfile
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from xml.parsers import expat
 import logging
 from flask import current_app
 from app.services.file_handler import FileHandler
+from app.services.compressed_input import (
+    InputSource, HeadReader, ARCHIVE_EXTENSIONS, decompress, split_extension, strip_extension
+)
+from app.services.record_writer import (
+    RecordWriter, RelationalWriter, ConvertedData, OUTPUT_FORMATS, OUTPUT_SETTINGS, DATA_SUFFIX, TYPES_SUFFIX,
+    CSV_LINE_TERMINATOR
+)
+from app.services.conversion_cache import ConversionCache
+from app.services.artifact_store import ArtifactStore, ArtifactEvictor, result_paths
+from app.services.schema_registry import SchemaRegistry
+from app.services.metrics import MetricsStore, ConversionMetrics, conversion_labels
+from app.services.flattener import XMLFlattener, RelationalFlattener
 from app.models.user import User, db
 from app.models.conversion_log import ConversionLog
 
+# Table layouts of the converted data: one wide table, or a root table plus
+# child tables for repeated elements
+LAYOUTS = ('flat', 'relational')
+
+# Characters that may follow an element name in a start tag
+XML_NAME_END = (b' ', b'\t', b'\r', b'\n', b'/', b'>')
+
+# Characters a JSON number starts with and may go on with
+JSON_NUMBER_START = '-0123456789'
+JSON_NUMBER_CHARS = '0123456789.eE+-'
+
+# Records parsed per batch when streaming CSV, and batches an XML parser
+# thread may get ahead of the response by
+STREAM_BATCH_RECORDS = 256
+STREAM_QUEUE_BATCHES = 4
+# Queued by the XML parser thread when its guess of the record element changed
+XML_RESTART = object()
+
+def convert_file_range(config, method, *args):
+    """
+    Run a DataConverterService range method inside a pool worker
+    
+    Args:
+        config (dict): Converter settings from the submitting process
+        method (str): Name of the method to run
+        *args: Arguments for the method
+    
+    Returns:
+        The method's result
+    """
+    return getattr(DataConverterService(config), method)(*args)
+
 class DataConverterService:
-    def __init__(self):
+    # Background artifact eviction, one per index in the web process
+    _evictors = {}
+    _evictors_lock = threading.Lock()
+
+    def __init__(self, config=None):
+        """
+        Initialize DataConverterService
+        
+        Args:
+            config (dict, optional): Settings to use instead of the current
+                                     app config, e.g. in a worker process
+        """
         self._file_handler = None
+        self._cache = None
+        self._artifacts = None
+        self._schemas = None
+        self._metrics = None
+        self._config = config
         self.logger = logging.getLogger(__name__)
         if not self.logger.handlers:
             handler = logging.StreamHandler()
@@ -19,36 +87,777 @@ class DataConverterService:
             self.logger.addHandler(handler)
             self.logger.setLevel(logging.INFO)
 
+    def _get_config(self, key, default):
+        if self._config is not None:
+            return self._config.get(key, default)
+        try:
+            return current_app.config.get(key, default)
+        except RuntimeError:
+            return default
+
     @property
     def file_handler(self):
         if self._file_handler is None:
-            self._file_handler = FileHandler()
+            self._file_handler = FileHandler(self._get_config('UPLOAD_FOLDER', None), self.artifacts)
         return self._file_handler
 
-    def convert_file(self, file, user_id):
+    @property
+    def cache(self):
+        if self._cache is None and self._get_config('CONVERSION_CACHE_ENABLED', False):
+            self._cache = ConversionCache(
+                self._get_config('CACHE_DATABASE', None),
+                max_bytes=self._get_config('CACHE_MAX_BYTES', None),
+                max_age=self._get_config('CACHE_MAX_AGE', None),
+                artifacts=self.artifacts
+            )
+        return self._cache
+
+    @property
+    def artifacts(self):
+        if self._artifacts is None and self._get_config('ARTIFACT_DATABASE', None):
+            self._artifacts = ArtifactStore(
+                self._get_config('ARTIFACT_DATABASE', None),
+                user_quota=self._get_config('ARTIFACT_USER_QUOTA_BYTES', None),
+                max_bytes=self._get_config('ARTIFACT_MAX_BYTES', None),
+                max_age=self._get_config('ARTIFACT_MAX_AGE', None)
+            )
+            interval = self._get_config('ARTIFACT_EVICTION_INTERVAL', 0)
+            if self._config is None and interval:
+                # Pool workers leave eviction to the web process
+                with self._evictors_lock:
+                    if self._artifacts.db_path not in self._evictors:
+                        self._evictors[self._artifacts.db_path] = ArtifactEvictor(self._artifacts, interval)
+        return self._artifacts
+
+    @property
+    def schemas(self):
+        if self._schemas is None and self._get_config('SCHEMA_DATABASE', None):
+            self._schemas = SchemaRegistry(
+                self._get_config('SCHEMA_DATABASE', None),
+                max_entries=self._get_config('SCHEMA_MAX_ENTRIES', None)
+            )
+        return self._schemas
+    
+    @property
+    def metrics(self):
+        if self._metrics is None and self._get_config('METRICS_ENABLED', False):
+            self._metrics = MetricsStore(self._get_config('METRICS_DATABASE', None))
+        return self._metrics
+
+    def convert_file(self, file, user_id, options=None):
+        try:
+            file_info = self.save_file(file, user_id)
+        except Exception as e:
+            self.logger.error(f"Conversion error: {str(e)}")
+            raise ValueError(f"Conversion failed: {str(e)}")
+        return self.convert_saved_file(file_info, options=options)
+    
+    def save_file(self, file, user_id=None):
+        """
+        Save an upload to the upload folder, timing it as the ``saving`` stage
+        
+        Args:
+            file: File object from Flask request
+            user_id (str, optional): Owner of the upload, for the artifact
+                                     index and its quota
+        
+        Returns:
+            dict: File details as returned by FileHandler.save_file
+        
+        Raises:
+            ValueError: If the file is invalid or over the user's quota
+        """
+        started = time.perf_counter()
+        file_info = self.file_handler.save_file(file)
+        self.record_save(file_info, time.perf_counter() - started)
+        self.register_upload(file_info, user_id)
+        return file_info
+    
+    def register_upload(self, file_info, user_id=None):
+        """
+        Record a saved upload in the artifact index, if enabled
+        
+        Args:
+            file_info (dict): Saved upload details
+            user_id (str, optional): Owner of the upload
+        
+        Raises:
+            ValueError: If the upload is over the user's quota; it is deleted
+        """
+        if not self.artifacts:
+            return
+        try:
+            self.artifacts.check_quota(user_id, file_info['file_size'])
+        except ValueError:
+            self.file_handler.delete_file(file_info['filepath'])
+            raise
+        self.artifacts.register([file_info['filepath']], user_id, file_info.get('content_hash'))
+    
+    def record_save(self, file_info, seconds):
+        """
+        Record the ``saving`` stage of an upload when metrics are enabled
+        
+        Args:
+            file_info (dict): Saved upload details
+            seconds (float): Time spent writing the upload
+        """
+        if self.metrics:
+            labels = conversion_labels(self._file_type(file_info), file_info['file_size'], stage='saving')
+            self.metrics.record([
+                ('conversion_stage_duration_seconds', labels, seconds),
+                ('conversion_stage_bytes', labels, file_info['file_size'])
+            ])
+    
+    def convert_saved_file(self, file_info, progress=None, options=None):
+        """
+        Convert a file that has already been saved to the upload folder
+        
+        The converted data is stored once and only the requested output
+        formats are written; the others are materialized on first download.
+        When the conversion cache is enabled and an upload with the same
+        content hash and options was converted before, the cached data is
+        reused and the duplicate upload is removed.
+        
+        When metrics are enabled, each stage reported through ``progress``
+        is timed and recorded together with the peak memory of the process.
+        
+        Args:
+            file_info (dict): File details as returned by FileHandler.save_file
+            progress (callable, optional): Called as progress(stage, records_processed)
+            options (dict, optional): Converter options. ``formats`` lists the
+                                      outputs to write now, defaulting to
+                                      DEFAULT_OUTPUT_FORMATS. ``layout`` is
+                                      one of LAYOUTS, ``flat`` by default.
+                                      ``profile`` dumps a cProfile trace of
+                                      the conversion to PROFILE_FOLDER when
+                                      CONVERSION_PROFILING_ENABLED is set;
+                                      profiled conversions skip the cache
+                                      lookup so the converter actually runs.
+        
+        Returns:
+            dict: Original file details, conversion result and cache status,
+                  plus ``profile_path`` for a profiled conversion
+        
+        Raises:
+            ValueError: If the file type is unsupported or conversion fails
+        """
+        options = dict(options or {})
+        profile = options.pop('profile', False) and self._get_config('CONVERSION_PROFILING_ENABLED', False)
+        metrics = None
+        if self.metrics:
+            metrics = ConversionMetrics(self.metrics, self._file_type(file_info), file_info['file_size'])
+            progress = metrics.track(progress)
+        
+        profiler = cProfile.Profile() if profile else None
+        if profiler:
+            profiler.enable()
+        try:
+            result = self._convert_saved_file(file_info, progress, options, metrics, use_cache=not profile)
+        except Exception:
+            if metrics:
+                metrics.finish('failed')
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+        
+        if metrics:
+            metrics.finish('cached' if result['cached'] else 'completed')
+        if profiler:
+            result['profile_path'] = self._dump_profile(profiler, file_info)
+        return result
+    
+    def _convert_saved_file(self, file_info, progress, options, metrics=None, use_cache=True):
         try:
-            file_info = self.file_handler.save_file(file)
-            conversion_methods = {'json': self._convert_json, 'xml': self._convert_xml}
-            converter = conversion_methods.get(file_info['file_extension'])
+            formats = options.pop('formats', None) or self._get_config('DEFAULT_OUTPUT_FORMATS', ['csv'])
+            unknown_formats = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+            if unknown_formats:
+                raise ValueError(f"Unsupported output format: {', '.join(unknown_formats)}")
+            
+            layout = options.get('layout') or 'flat'
+            if layout not in LAYOUTS:
+                raise ValueError(f"Unsupported layout: {layout}")
+            if layout == 'flat':
+                # Same output as no layout option, share its cache entries
+                options.pop('layout', None)
+            columns = options.get('columns')
+            if columns and layout != 'flat':
+                raise ValueError(f"Declared columns are not supported for the {layout} layout")
+            
+            converter = self._converters().get(file_info['file_extension'])
             if not converter:
                 raise ValueError(f"Unsupported file type: {file_info['file_extension']}")
-            conversion_result = converter(file_info['filepath'])
-            return {'original_file': file_info, 'conversion_result': conversion_result}
+            
+            cache_key = None
+            if self.cache and file_info.get('content_hash'):
+                cache_key = ConversionCache.make_key(
+                    file_info['content_hash'], file_info['file_extension'], options
+                )
+                cached = self.cache.get(cache_key) if use_cache else None
+                if cached:
+                    result = self._cached_result(file_info, cached)
+                    self._materialize_outputs(result['conversion_result'], formats, progress, metrics)
+                    if self.artifacts:
+                        self.artifacts.touch(cached['source_path'])
+                    return result
+            
+            conversion_result = converter(
+                InputSource(file_info['filepath'], file_info.get('member')), progress, layout, columns
+            )
+            if self.artifacts:
+                self.artifacts.register(result_paths(conversion_result))
+            if cache_key:
+                self.cache.put(cache_key, file_info['content_hash'], file_info['filepath'], conversion_result)
+            self._materialize_outputs(conversion_result, formats, progress, metrics)
+            return {'original_file': file_info, 'conversion_result': conversion_result, 'cached': False}
         except Exception as e:
             self.logger.error(f"Conversion error: {str(e)}")
             raise ValueError(f"Conversion failed: {str(e)}")
     
-    def _convert_json(self, filepath):
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                df = pd.json_normalize(data, sep='_')
-                base_path = filepath.rsplit('.', 1)[0]
-                csv_output = f"{base_path}_converted.csv"
-                excel_output = f"{base_path}_converted.xlsx"
-                df.to_csv(csv_output, index=False, encoding='utf-8')
-                df.to_excel(excel_output, index=False)
-                return {'csv_path': csv_output, 'excel_path': excel_output, 'total_rows': len(df), 'total_columns': len(df.columns)}
+    def materialize_output(self, data, fmt):
+        """
+        Write an output format of converted data if it does not exist yet
+        
+        Outputs written on demand, e.g. on first download, are recorded as a
+        ``writing <fmt>`` stage of their source file's kind.
+        
+        Args:
+            data (ConvertedData): Converted data to write from
+            fmt (str): Output format name
+        
+        Returns:
+            str: Path of the output file
+        """
+        started = time.perf_counter()
+        output_path, added = self._materialize_output(data, fmt)
+        if self.metrics and added:
+            labels = conversion_labels(*self._source_kind(data), stage=f"writing {fmt}")
+            self.metrics.record([
+                ('conversion_stage_duration_seconds', labels, time.perf_counter() - started),
+                ('conversion_stage_bytes', labels, added)
+            ])
+        return output_path
+    
+    def preview(self, stream, file_extension, limit=None, compression=None):
+        """
+        Parse and flatten the first records of a file, stopping as soon as
+        they are read
+        
+        The input may be only the head of a larger file, e.g. the first
+        megabyte sent by the browser: a record cut off by the end of the
+        input, compressed or not, ends the preview instead of failing it.
+        Rows are flattened as in the flat layout.
+        
+        Args:
+            stream: Readable binary stream of the file's content
+            file_extension (str): ``xml``, ``json``, ``jsonl`` or ``ndjson``
+            limit (int, optional): Records to return, PREVIEW_RECORDS by default
+            compression (str, optional): ``gz`` or ``zst`` for compressed input
+        
+        Returns:
+            dict: ``columns``, ``rows`` padded to the columns, and ``more``,
+                  True if the input holds further records or ends inside one
+        
+        Raises:
+            ValueError: If the type is unsupported or no record could be parsed
+        """
+        limit = limit or self._get_config('PREVIEW_RECORDS', 20)
+        records = []
+        cut_off = False
+        if file_extension in ARCHIVE_EXTENSIONS:
+            raise ValueError("Preview is not available for archives")
+        head = None
+        try:
+            if compression:
+                # Compressed input cut off mid-block ends where the cut is
+                head = stream = HeadReader(decompress(stream, compression))
+            # One record past the limit tells whether there are more
+            if file_extension == 'xml':
+                self._parse_xml_head(stream, limit + 1, records)
+            elif file_extension in ('json', 'jsonl', 'ndjson'):
+                text = io.TextIOWrapper(stream, encoding='utf-8')
+                parsed = self._iter_json_document(text) if file_extension == 'json' else self._iter_json_lines(text)
+                for record in parsed:
+                    records.append(record)
+                    if len(records) > limit:
+                        break
+                text.detach()
+            else:
+                raise ValueError(f"Unsupported file type: {file_extension}")
+        except (ValueError, expat.ExpatError, OSError) as e:
+            if not records and not (head and head.cut_off):
+                raise ValueError(f"Preview failed: {str(e)}")
+            cut_off = True
+        if head and head.cut_off:
+            if not records:
+                # e.g. zstd only decodes whole blocks, of up to 128 KB
+                raise ValueError("Preview failed: the compressed input ends before its first whole record")
+            cut_off = True
+        
+        columns = {}
+        if file_extension == 'xml':
+            flatten = XMLFlattener(columns).flatten
+        else:
+            def flatten(record):
+                return self._json_row(columns, self._normalize_json_chunk([record])[0])
+        rows = [flatten(record) for record in records[:limit]]
+        
+        return {
+            'columns': list(columns),
+            'rows': [row + [None] * (len(columns) - len(row)) for row in rows],
+            'more': cut_off or len(records) > limit
+        }
+    
+    def stream_csv(self, stream, file_extension, compression=None, columns=None):
+        """
+        Convert a file to CSV chunks produced while it is parsed
+        
+        Nothing is written to disk. Records are flattened as in the flat
+        layout and the CSV matches the file a conversion writes, given the
+        same columns. The header is the declared ``columns``, which also
+        select the columns sent, or else the columns of the first
+        CSV_STREAM_SAMPLE_RECORDS records; a column first seen after the
+        header was sent fails the stream, as does an XML record element
+        that turns out to be another one than guessed after rows were sent.
+        
+        Args:
+            stream: Readable binary stream of the file's content
+            file_extension (str): ``xml``, ``json``, ``jsonl`` or ``ndjson``
+            compression (str, optional): ``gz`` or ``zst`` for compressed input
+            columns (list, optional): Columns to send, in order
+        
+        Returns:
+            generator: UTF-8 encoded chunks of about CSV_STREAM_CHUNK_BYTES,
+                       the first holding the header and the first rows;
+                       raises ValueError where the input fails
+        
+        Raises:
+            ValueError: If the file type cannot be streamed
+        """
+        if file_extension in ARCHIVE_EXTENSIONS:
+            raise ValueError("Streaming is not available for archives")
+        if file_extension not in ('xml', 'json', 'jsonl', 'ndjson'):
+            raise ValueError(f"Unsupported file type: {file_extension}")
+        return self._stream_csv(stream, file_extension, compression, columns)
+    
+    def _stream_csv(self, stream, file_extension, compression, declared):
+        sample_size = self._get_config('CSV_STREAM_SAMPLE_RECORDS', 1000)
+        chunk_bytes = self._get_config('CSV_STREAM_CHUNK_BYTES', 64 * 1024)
+        columns = {name: index for index, name in enumerate(declared or [])}
+        if file_extension == 'xml':
+            flatten = XMLFlattener(columns).flatten
+        else:
+            def flatten(record):
+                return self._json_row(columns, record)
+        
+        buffer = io.StringIO()
+        csv_writer = csv.writer(buffer, lineterminator=CSV_LINE_TERMINATOR)
+        header = None
+        held = []
+        
+        def write(rows):
+            nonlocal header
+            if header is None:
+                header = list(declared or columns)
+                csv_writer.writerow(header)
+            # Declared columns drop the others, rows are cut or padded to the header
+            width = len(header)
+            for row in rows:
+                if len(row) < width:
+                    row.extend([None] * (width - len(row)))
+                elif len(row) > width:
+                    del row[width:]
+            csv_writer.writerows(rows)
+        
+        def flush():
+            chunk = buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            return chunk
+        
+        def restart():
+            # The XML record element was guessed wrong, drop what it gave
+            nonlocal flatten
+            if sent:
+                raise ValueError(
+                    "The record element changed after rows were sent, convert this file instead"
+                )
+            held.clear()
+            columns.clear()
+            columns.update((name, index) for index, name in enumerate(declared or []))
+            flatten = XMLFlattener(columns).flatten
+        
+        sent = False
+        try:
+            stream = decompress(stream, compression)
+            if file_extension == 'xml':
+                batches = self._iter_xml_batches(stream, STREAM_BATCH_RECORDS, restart)
+            else:
+                text = io.TextIOWrapper(stream, encoding='utf-8')
+                parsed = self._iter_json_document(text) if file_extension == 'json' else self._iter_json_lines(text)
+                batches = (
+                    self._normalize_json_chunk(chunk) for chunk in self._chunked(parsed, STREAM_BATCH_RECORDS)
+                )
+            
+            for batch in batches:
+                rows = [flatten(record) for record in batch]
+                if header is None and not declared:
+                    # Rows wait until the sample has set the header
+                    held.extend(rows)
+                    if len(held) < sample_size:
+                        continue
+                    rows, held = held, []
+                elif not declared and len(columns) > len(header):
+                    raise ValueError(
+                        f"Column {list(columns)[len(header)]} first appears after the header was sent, "
+                        f"declare the columns to stream this file"
+                    )
+                write(rows)
+                # The header and first rows go out at once, later rows in full chunks
+                if not sent or buffer.tell() >= chunk_bytes:
+                    sent = True
+                    yield flush()
+            
+            if header is None or held:
+                write(held)
+            if buffer.tell():
+                yield flush()
+        except (ValueError, expat.ExpatError, EOFError, OSError) as e:
+            self.logger.error(f"CSV streaming error: {str(e)}")
+            raise ValueError(f"Streaming conversion failed: {str(e)}")
+    
+    @staticmethod
+    def _json_row(columns, flat_record):
+        """
+        Lay out a flattened JSON record by column index
+        
+        Args:
+            columns (dict): Column name to index registry, extended with the
+                            record's new columns
+            flat_record (dict): Record from _normalize_json_chunk
+        
+        Returns:
+            list: Cell values indexed by column
+        """
+        row = [None] * len(columns)
+        for key, value in flat_record.items():
+            index = columns.setdefault(key, len(columns))
+            if index == len(row):
+                row.append(None)
+            row[index] = value
+        return row
+    
+    def _materialize_output(self, data, fmt):
+        # Returns the output path and the bytes newly written for it
+        paths = data.output_paths(fmt)
+        existed = {path for path in paths if os.path.exists(path)}
+        output_path = data.materialize(fmt, self._output_settings())
+        added = sum(
+            os.path.getsize(path) for path in paths
+            if path not in existed and os.path.exists(path)
+        )
+        if self.cache and added:
+            self.cache.add_size(data.data_path, added)
+        if self.artifacts and added:
+            # Typed formats also write the column types on first use
+            self.artifacts.register(paths + [f"{table.base_path}{TYPES_SUFFIX}" for _, table in data.tables()])
+        return output_path, added
+    
+    def _output_settings(self):
+        return {key: self._get_config(key.upper(), default) for key, default in OUTPUT_SETTINGS.items()}
+    
+    def _materialize_outputs(self, conversion_result, formats, progress=None, metrics=None):
+        data = ConvertedData(conversion_result['data_path'])
+        if any(OUTPUT_FORMATS[fmt].get('typed') for fmt in formats):
+            if progress:
+                progress('typing', data.total_rows)
+            saved = self._infer_column_types(data)
+            conversion_result['memory_saved_bytes'] = saved
+            if metrics:
+                metrics.observe('conversion_memory_saved_bytes', saved)
+            if conversion_result.get('schema') and self.schemas:
+                types = data.column_types(self._output_settings())['types']
+                self.schemas.record_types(conversion_result['schema'], dict(zip(data.columns, types)))
+        for fmt in formats:
+            if progress:
+                progress(f"writing {fmt}", data.total_rows)
+            added = self._materialize_output(data, fmt)[1]
+            if metrics:
+                metrics.add_bytes(added)
+        conversion_result['formats'] = data.available_formats()
+    
+    def _infer_column_types(self, data):
+        # Infers the column types of every table once, for all typed outputs;
+        # returns the memory they save over object columns
+        saved = 0
+        for _, table in data.tables():
+            types_path = f"{table.base_path}{TYPES_SUFFIX}"
+            existed = os.path.exists(types_path)
+            memory = table.column_types(self._output_settings())['memory']
+            saved += memory['object_bytes'] - memory['typed_bytes']
+            if self.cache and not existed:
+                self.cache.add_size(table.data_path, os.path.getsize(types_path))
+            if self.artifacts and not existed:
+                self.artifacts.register([types_path])
+        return saved
+    
+    def _source_kind(self, data):
+        # File type and size of the upload the converted data came from
+        base_path = data.data_path[:-len(DATA_SUFFIX)]
+        extensions = self._get_config('ALLOWED_EXTENSIONS', ('xml', 'json', 'jsonl', 'ndjson'))
+        for source_path in glob.glob(f"{glob.escape(base_path)}.*"):
+            file_extension, compression = split_extension(source_path)
+            if strip_extension(source_path) == base_path and (
+                file_extension in extensions or file_extension in ARCHIVE_EXTENSIONS
+            ):
+                file_info = {'file_extension': file_extension, 'compression': compression}
+                return self._file_type(file_info), os.path.getsize(source_path)
+        return 'unknown', 0
+    
+    @staticmethod
+    def _file_type(file_info):
+        # Metrics label of an input, e.g. ``xml`` or ``xml.gz``
+        if file_info.get('compression'):
+            return f"{file_info['file_extension']}.{file_info['compression']}"
+        return file_info['file_extension']
+    
+    def _converters(self):
+        # Conversion method per input type
+        return {
+            'json': self._convert_json,
+            'jsonl': self._convert_json_lines,
+            'ndjson': self._convert_json_lines,
+            'xml': self._convert_xml,
+            'zip': self._convert_zip
+        }
+    
+    def _dump_profile(self, profiler, file_info):
+        profile_folder = self._get_config('PROFILE_FOLDER', None) or os.path.dirname(file_info['filepath'])
+        os.makedirs(profile_folder, exist_ok=True)
+        profile_path = os.path.join(
+            profile_folder, f"{strip_extension(file_info['saved_filename'])}.prof"
+        )
+        profiler.dump_stats(profile_path)
+        self.logger.info(f"Conversion profile of {file_info['original_filename']} written to {profile_path}")
+        return profile_path
+    
+    def _cached_result(self, file_info, cached):
+        # The new upload duplicates the cached source, keep only one copy
+        if cached['source_path'] != file_info['filepath'] and os.path.exists(file_info['filepath']):
+            os.remove(file_info['filepath'])
+            if self.artifacts:
+                self.artifacts.forget([file_info['filepath']])
+        original_file = dict(
+            file_info,
+            filepath=cached['source_path'],
+            saved_filename=os.path.basename(cached['source_path'])
+        )
+        self.logger.info(f"Conversion cache hit for {file_info['original_filename']}")
+        return {'original_file': original_file, 'conversion_result': cached['result'], 'cached': True}
+    
+    def _convert_ranges(self, filepath, method, ranges, args=(), progress=None, validate=None, columns=None):
+        """
+        Convert byte ranges of a file on a process pool and join the parts
+        
+        Each range is converted to partial converted data by ``method``.
+        The parts are joined in file order under the union of their columns,
+        in the order a single pass would have found them.
+        
+        Args:
+            filepath (str): Path to the source file
+            method (str): Range method, called as method(filepath, start, end,
+                          part_base_path, *args) and returning its result
+            ranges (list): ``(start, end)`` byte offsets in file order
+            args (tuple, optional): Extra arguments for the range method
+            progress (callable, optional): Called as progress(stage, records_processed)
+            validate (callable, optional): Called with the range results in
+                                           order; returning False discards them
+            columns (list, optional): Declared columns the parts were written with
+        
+        Returns:
+            dict: Paths of converted files, or None if the parts were rejected
+        """
+        base_path = strip_extension(filepath)
+        config = {'JSON_CHUNK_SIZE': self._get_config('JSON_CHUNK_SIZE', 5000)}
+        workers = min(self._parallel_workers(), len(ranges))
+        part_paths = [f"{base_path}.part{index}{DATA_SUFFIX}" for index in range(len(ranges))]
+        
+        if progress:
+            progress('parsing', 0)
+        
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = [
+                executor.submit(
+                    convert_file_range, config, method, filepath, start, end,
+                    part_path[:-len(DATA_SUFFIX)], *args
+                )
+                for (start, end), part_path in zip(ranges, part_paths)
+            ]
+            records_processed = 0
+            for future in as_completed(futures):
+                records_processed += future.result()['total_rows']
+                if progress:
+                    progress('parsing', records_processed)
+            
+            if validate and not validate([future.result() for future in futures]):
+                return None
+            
+            parts = [ConvertedData(part_path) for part_path in part_paths]
+            if columns is None:
+                columns = list(dict.fromkeys(column for part in parts for column in part.columns))
+            
+            if progress:
+                progress('merging', records_processed)
+            return ConvertedData.concat(parts, columns, base_path)
+        finally:
+            executor.shutdown(cancel_futures=True)
+            for part_path in part_paths:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+    
+    def _parallel_workers(self):
+        # Range workers per conversion job; by default every job worker gets
+        # an equal share of the CPUs, as they all may convert at once
+        workers = self._get_config('PARALLEL_CONVERSION_WORKERS', None)
+        if workers is None:
+            workers = (os.cpu_count() or 1) // max(self._get_config('CONVERSION_WORKERS', 1), 1)
+        return max(workers, 1)
+    
+    def archive_members(self, filepath):
+        """
+        Data files of a zip archive that can be converted
+        
+        Args:
+            filepath (str): Path to the zip archive
+        
+        Returns:
+            list: InputSource per member of an allowed data type, in archive order
+        
+        Raises:
+            ValueError: If the archive is invalid or holds no such files
+        """
+        extensions = [
+            extension for extension in self._get_config('ALLOWED_EXTENSIONS', ('xml', 'json', 'jsonl', 'ndjson'))
+            if extension in self._converters() and extension not in ARCHIVE_EXTENSIONS
+        ]
+        members = InputSource(filepath).members(extensions)
+        if not members:
+            raise ValueError("The archive holds no files of a supported type")
+        return members
+    
+    def merge(self, data_paths, base_path, formats=None, owner=None):
+        """
+        Join converted data of several files into one, in the given order,
+        and write its outputs
+        
+        Args:
+            data_paths (list): Paths of the ``_converted.rows`` files to join
+            base_path (str): Output path of the joined data without extension
+            formats (list, optional): Outputs to write, DEFAULT_OUTPUT_FORMATS
+                                      by default
+            owner (str, optional): User the joined data is indexed for
+        
+        Returns:
+            dict: Conversion result of the joined data
+        """
+        parts = [ConvertedData(data_path) for data_path in data_paths]
+        columns = list(dict.fromkeys(column for part in parts for column in part.columns))
+        result = ConvertedData.concat(parts, columns, base_path)
+        if self.artifacts:
+            self.artifacts.register(result_paths(result), owner)
+        self._materialize_outputs(
+            result, formats or self._get_config('DEFAULT_OUTPUT_FORMATS', ['csv'])
+        )
+        return result
+    
+    def _convert_zip(self, source, progress=None, layout='flat', columns=None):
+        """
+        Convert the data files of a zip archive, member by member
+        
+        Each member is decompressed as it is parsed, by the converter of its
+        own type, into partial converted data; nothing is extracted to disk.
+        The parts are joined in archive order under the union of their
+        columns, as the byte ranges of a large file are (see _convert_ranges).
+        
+        Args:
+            source (str or InputSource): Path to the zip archive
+            progress (callable, optional): Called as progress(stage, records_processed)
+            layout (str, optional): Table layout; only ``flat`` joins members
+            columns (list, optional): Declared columns, the only ones kept
+        
+        Returns:
+            dict: Paths of converted files, with ``members`` listing the
+                  ``name`` and ``total_rows`` of each member converted
+        
+        Raises:
+            ValueError: If the archive holds no data files or a member fails
+        """
+        if layout != 'flat':
+            raise ValueError(f"The {layout} layout is not supported for zip archives")
+        
+        archive = InputSource.of(source)
+        converters = self._converters()
+        members = self.archive_members(archive.path)
+        
+        results = []
+        try:
+            records_before = 0
+            for member in members:
+                def member_progress(stage, records_processed):
+                    progress(stage, records_before + records_processed)
+                
+                try:
+                    result = converters[member.file_extension](
+                        member, member_progress if progress else None, layout, columns
+                    )
+                except ValueError as e:
+                    raise ValueError(f"{member.name}: {str(e)}")
+                results.append(result)
+                records_before += result['total_rows']
+            
+            parts = [ConvertedData(result['data_path']) for result in results]
+            if columns is None:
+                columns = list(dict.fromkeys(column for part in parts for column in part.columns))
+            if progress:
+                progress('merging', records_before)
+            result = ConvertedData.concat(parts, columns, archive.base_path)
+            result['members'] = [
+                {'name': member.name, 'total_rows': part['total_rows']}
+                for member, part in zip(members, results)
+            ]
+            return result
+        finally:
+            for result in results:
+                if os.path.exists(result['data_path']):
+                    os.remove(result['data_path'])
+    
+    def _convert_json(self, source, progress=None, layout='flat', columns=None):
+        """
+        Convert JSON file to the intermediate converted data
+        
+        A top-level array is read incrementally, one element at a time, and
+        normalized in fixed-size chunks. A top-level object is converted as a
+        single record.
+        
+        Args:
+            source (str or InputSource): Path to the JSON file, possibly
+                                         compressed, or a zip member
+            progress (callable, optional): Called as progress(stage, records_processed)
+            layout (str, optional): Table layout, one of LAYOUTS
+            columns (list, optional): Declared columns, the only ones kept
+        
+        Returns:
+            dict: Paths of converted files
+        """
+        try:
+            source = InputSource.of(source)
+            with source.open() as stream:
+                f = io.TextIOWrapper(stream, encoding='utf-8')
+                return self._write_json_records(
+                    source.base_path, self._iter_json_document(f), progress, layout,
+                    columns, self._writes_csv(source, columns)
+                )
         except json.JSONDecodeError as e:
             self.logger.error(f"JSON parsing error: {str(e)}")
             raise ValueError(f"Invalid JSON format: {str(e)}")
@@ -56,105 +865,962 @@ class DataConverterService:
             self.logger.error(f"JSON conversion error: {str(e)}")
             raise ValueError(f"JSON conversion failed: {str(e)}")
     
-    def _convert_xml(self, filepath):
+    def _convert_json_lines(self, source, progress=None, layout='flat', columns=None):
         """
-        Convert XML file to CSV and Excel with improved flattening
+        Convert JSON Lines (.jsonl/.ndjson) file to the intermediate converted data
+        
+        Large uncompressed files in the flat layout are split into byte
+        ranges of whole lines and converted on a process pool (see
+        _convert_ranges).
         
         Args:
-            filepath (str): Path to the XML file
+            source (str or InputSource): Path to the JSON Lines file, possibly
+                                         compressed, or a zip member
+            progress (callable, optional): Called as progress(stage, records_processed)
+            layout (str, optional): Table layout, one of LAYOUTS
+            columns (list, optional): Declared columns, the only ones kept
+        
+        Returns:
+            dict: Paths of converted files
+        """
+        try:
+            source = InputSource.of(source)
+            # Large files are split at line boundaries and converted in parallel
+            ranges = self._plan_line_ranges(source.path) if layout == 'flat' and source.seekable else None
+            if ranges:
+                return self._convert_ranges(
+                    source.path, '_convert_json_lines_range', ranges, (columns,), progress, columns=columns
+                )
+            
+            with source.open() as stream:
+                f = io.TextIOWrapper(stream, encoding='utf-8')
+                return self._write_json_records(
+                    source.base_path, self._iter_json_lines(f), progress, layout,
+                    columns, self._writes_csv(source, columns)
+                )
+        except Exception as e:
+            self.logger.error(f"JSON conversion error: {str(e)}")
+            raise ValueError(f"JSON conversion failed: {str(e)}")
+    
+    def _write_json_records(self, base_path, records, progress=None, layout='flat', columns=None, write_csv=False):
+        """
+        Normalize JSON records in chunks and append them to the converted data
+        
+        In the relational layout lists become child tables instead of cells.
+        
+        Args:
+            base_path (str): Output path without extension
+            records (iterable): Parsed JSON records
+            progress (callable, optional): Called as progress(stage, records_processed)
+            layout (str, optional): Table layout, one of LAYOUTS
+            columns (list, optional): Declared columns, the only ones kept
+            write_csv (bool, optional): Write the CSV output in the same pass,
+                                        see RecordWriter
         
         Returns:
             dict: Paths of converted files
         """
+        chunk_size = self._get_config('JSON_CHUNK_SIZE', 5000)
+        if progress:
+            progress('parsing', 0)
+        
+        if layout == 'relational':
+            with RelationalWriter(base_path, progress) as writer:
+                # Same column names as json_normalize(sep='_'), keys kept as they are
+                flattener = RelationalFlattener(writer.add_table, sep='_', attr_prefix=None, text_key=None)
+                for record in records:
+                    for table, row in flattener.flatten(record if isinstance(record, dict) else {}):
+                        writer.write_row(table, row)
+                return writer.close()
+        
+        with RecordWriter(base_path, progress, columns, write_csv) as writer:
+            for chunk in self._chunked(records, chunk_size):
+                for record in self._normalize_json_chunk(chunk):
+                    writer.write(record)
+            return writer.close()
+    
+    @staticmethod
+    def _writes_csv(source, columns):
+        # With declared columns the CSV is written while converting, except
+        # for zip members, which are only parts of the archive's data
+        return columns is not None and source.member is None
+    
+    def _match_schema(self, source):
+        """
+        Fingerprint the layout of an XML document and look up its
+        registered plan
+        
+        The layout is taken from the first SCHEMA_SAMPLE_RECORDS records: the
+        element they repeat as and the columns they flatten to.
+        
+        Args:
+            source (InputSource): XML input to fingerprint
+        
+        Returns:
+            dict: ``fingerprint``, ``file_type``, the guessed ``record_path``
+                  and the registered ``plan``, None if the layout is new; None
+                  if the registry is disabled or the start of the document
+                  does not show its layout
+        """
+        if not self.schemas:
+            return None
+        
+        records = []
         try:
-            # Read XML file
-            with open(filepath, 'r', encoding='utf-8') as f:
-                xml_content = f.read()
+            with source.open() as stream:
+                record_path = self._parse_xml_head(
+                    stream, self._get_config('SCHEMA_SAMPLE_RECORDS', 20), records, single_root=False
+                )
+        except Exception as e:
+            # The conversion reports the document's errors
+            self.logger.info(f"Document layout not fingerprinted: {str(e)}")
+            return None
+        if record_path is None:
+            return None
+        
+        columns = {}
+        flattener = XMLFlattener(columns)
+        for record in records:
+            flattener.flatten(record)
+        fingerprint = SchemaRegistry.fingerprint(source.file_extension, record_path, list(columns))
+        return {
+            'fingerprint': fingerprint,
+            'file_type': source.file_extension,
+            'record_path': record_path,
+            'plan': self.schemas.lookup(fingerprint)
+        }
+    
+    def _remember_schema(self, schema, record_path, result, columns):
+        # Registers the columns of a flat conversion under its layout; with
+        # declared columns the data holds only some of them
+        if schema is None or columns is not None:
+            return
+        self.schemas.record(
+            schema['fingerprint'], schema['file_type'], record_path, ConvertedData(result['data_path']).columns
+        )
+        result['schema'] = schema['fingerprint']
+    
+    def _iter_json_document(self, f, read_size=1 << 20):
+        """
+        Yield records from a JSON document without loading it all at once
+        
+        Elements of a top-level array are decoded one at a time from a
+        sliding buffer. Any other top-level value is decoded whole.
+        
+        Args:
+            f: Text file object positioned at the start of the document
+            read_size (int, optional): Characters to read per buffer refill
+        
+        Yields:
+            Parsed JSON values
+        
+        Raises:
+            json.JSONDecodeError: If the document is malformed
+            ValueError: If the top-level value is not an array or object
+        """
+        decoder = json.JSONDecoder()
+        buffer = f.read(read_size)
+        index = self._skip_whitespace(buffer, 0)
+        while index >= len(buffer):
+            chunk = f.read(read_size)
+            if not chunk:
+                break
+            buffer = chunk
+            index = self._skip_whitespace(buffer, 0)
+        
+        if buffer[index:index + 1] != '[':
+            # Not an array, decode the whole document as one value
+            document = json.loads(buffer + f.read())
+            if not isinstance(document, dict):
+                raise ValueError("JSON document must be an array or an object")
+            yield document
+            return
+        
+        index += 1
+        eof = False
+        expecting = 'first'
+        while True:
+            index = self._skip_whitespace(buffer, index)
+            needs_more = index >= len(buffer)
             
-            # Parse XML to dict
-            parsed_data = xmltodict.parse(xml_content)
+            if not needs_more and expecting == 'delimiter':
+                char = buffer[index]
+                if char == ']':
+                    index += 1
+                    break
+                if char != ',':
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buffer, index)
+                index += 1
+                expecting = 'value'
+                continue
             
-            # Find the root element and get the list of records
-            # Assuming structure like <RootElement><Record>...</Record><Record>...</Record></RootElement>
-            root_key = list(parsed_data.keys())[0]
-            records = []
-            
-            # Handle different possible structures
-            if isinstance(parsed_data[root_key], dict):
-                # Find child elements that are lists
-                for key, value in parsed_data[root_key].items():
-                    if isinstance(value, list):
-                        # Found a list of records
-                        records = value
+            if not needs_more:
+                if expecting == 'first' and buffer[index] == ']':
+                    index += 1
+                    break
+                try:
+                    value, end = decoder.raw_decode(buffer, index)
+                    # A value touching the end of the buffer may be truncated,
+                    # and a number cut at e.g. "1." decodes as the part before
+                    needs_more = not eof and (end >= len(buffer) or (
+                        buffer[index] in JSON_NUMBER_START and buffer[end] in JSON_NUMBER_CHARS
+                    ))
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    needs_more = True
+            
+            if needs_more:
+                if eof:
+                    raise json.JSONDecodeError("Unterminated array", buffer, index)
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer = buffer[index:] + chunk
+                index = 0
+                continue
+            
+            yield value
+            index = end
+            expecting = 'delimiter'
+        
+        trailing = buffer[index:] + f.read()
+        if trailing.strip():
+            raise json.JSONDecodeError("Extra data", trailing, 0)
+    
+    def _iter_json_lines(self, f, first_line=1):
+        """
+        Yield records from a JSON Lines file, skipping blank lines
+        
+        Args:
+            f: Text file object, or any iterable of lines
+            first_line (int or callable, optional): Number of the first line,
+                                                    or a function computing it,
+                                                    only called to report an error
+        
+        Yields:
+            Parsed JSON values, one per line
+        
+        Raises:
+            ValueError: If a line is not valid JSON
+        """
+        for index, line in enumerate(f):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                line_number = index + (first_line() if callable(first_line) else first_line)
+                raise ValueError(f"Invalid JSON on line {line_number}: {e.msg} (column {e.colno})")
+    
+    def _plan_line_ranges(self, filepath):
+        """
+        Split a large line-oriented file into byte ranges of whole lines
+        
+        Args:
+            filepath (str): Path to the file
+        
+        Returns:
+            list: ``(start, end)`` byte offsets in file order, or None if the
+                  file is not worth converting in parallel
+        """
+        chunk_bytes = self._get_config('PARALLEL_CHUNK_BYTES', 16 * 1024 ** 2)
+        if self._parallel_workers() < 2:
+            return None
+        size = os.path.getsize(filepath)
+        if size < 2 * chunk_bytes:
+            return None
+        
+        starts = [0]
+        with open(filepath, 'rb') as f:
+            while starts[-1] + chunk_bytes < size:
+                # Move on to the start of the next line
+                f.seek(starts[-1] + chunk_bytes)
+                f.readline()
+                if f.tell() >= size:
+                    break
+                starts.append(f.tell())
+        
+        if len(starts) < 2:
+            return None
+        return list(zip(starts, starts[1:] + [size]))
+    
+    def _convert_json_lines_range(self, filepath, start, end, base_path, columns=None):
+        """
+        Convert the lines in one byte range of a JSON Lines file
+        
+        Args:
+            filepath (str): Path to the JSON Lines file
+            start (int): Offset of the first line
+            end (int): Offset just past the last line
+            base_path (str): Output path of the partial converted data
+            columns (list, optional): Declared columns, the only ones kept
+        
+        Returns:
+            dict: Result as from RecordWriter.close
+        """
+        def count_lines():
+            # Only needed for error messages, so counted lazily
+            lines = 1
+            with open(filepath, 'rb') as f:
+                remaining = start
+                while remaining > 0:
+                    chunk = f.read(min(remaining, 1 << 20))
+                    if not chunk:
                         break
-                
-                # If no list found, maybe there's only one record or we need to search deeper
-                if not records:
-                    # Check if the root itself is a container for a single record
-                    records = [parsed_data[root_key]]
-            elif isinstance(parsed_data[root_key], list):
-                # Root directly contains a list of records
-                records = parsed_data[root_key]
-            
-            # Process each record into a flat dictionary
-            flattened_records = []
-            for record in records:
-                flat_record = {}
-                
-                def flatten_element(element, prefix=""):
-                    if isinstance(element, dict):
-                        for k, v in element.items():
-                            # Handle special case for attributes and text content
-                            if k.startswith('@'):
-                                # This is an attribute
-                                attr_name = k[1:]  # Remove the @ symbol
-                                flatten_element({attr_name: v}, prefix)
-                            elif k == '#text':
-                                # This is text content of an element with attributes
-                                if prefix:
-                                    # Use the parent element name
-                                    flat_record[prefix.rstrip('.')] = v
-                            else:
-                                # Regular nested element
-                                new_prefix = f"{prefix}{k}." if prefix else f"{k}."
-                                flatten_element(v, new_prefix)
-                    elif isinstance(element, list):
-                        # Handle lists by creating indexed entries
-                        for i, item in enumerate(element):
-                            item_prefix = f"{prefix}[{i}]"
-                            if isinstance(item, (dict, list)):
-                                flatten_element(item, item_prefix + ".")
-                            else:
-                                flat_record[item_prefix] = item
-                    else:
-                        # Simple value
-                        if prefix:
-                            flat_record[prefix.rstrip('.')] = element
-                        else:
-                            flat_record["value"] = element
-                
-                flatten_element(record)
-                flattened_records.append(flat_record)
+                    remaining -= len(chunk)
+                    lines += chunk.count(b'\n')
+            return lines
+        
+        def read_lines(f):
+            position = start
+            f.seek(start)
+            while position < end:
+                line = f.readline()
+                if not line:
+                    break
+                position += len(line)
+                yield line.decode('utf-8')
+        
+        with open(filepath, 'rb') as f:
+            return self._write_json_records(
+                base_path, self._iter_json_lines(read_lines(f), count_lines), columns=columns
+            )
+    
+    def _normalize_json_chunk(self, chunk):
+        """
+        Flatten a chunk of JSON records the way pd.json_normalize(sep='_') does
+        
+        Nested objects become ``parent_child`` columns and lists are kept as
+        single cell values. Non-object records produce empty rows. Keys come
+        in json_normalize's order: a record's own scalar fields first, then
+        its nested objects' fields. Values are kept as they are, so unlike
+        json_normalize's DataFrame, an integer column with missing values
+        does not turn into floats.
+        
+        Args:
+            chunk (list): Parsed JSON records
+        
+        Returns:
+            list: Flat dictionaries, one per record
+        """
+        normalized = []
+        for record in chunk:
+            flat_record = {}
+            if isinstance(record, dict):
+                self._flatten_json_object(record, '', flat_record)
+            normalized.append(flat_record)
+        return normalized
+    
+    def _flatten_json_object(self, element, prefix, flat_record):
+        nested = []
+        for key, value in element.items():
+            new_key = f"{prefix}_{key}" if prefix else str(key)
+            if not isinstance(value, dict):
+                flat_record[new_key] = value
+            elif prefix:
+                self._flatten_json_object(value, new_key, flat_record)
+            else:
+                # json_normalize appends the top level's nested objects last
+                nested.append((new_key, value))
+        for new_key, value in nested:
+            self._flatten_json_object(value, new_key, flat_record)
+    
+    @staticmethod
+    def _chunked(iterable, size):
+        chunk = []
+        for item in iterable:
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    @staticmethod
+    def _skip_whitespace(buffer, index):
+        length = len(buffer)
+        while index < length and buffer[index] in ' \t\n\r':
+            index += 1
+        return index
+    
+    def _convert_xml(self, source, progress=None, layout='flat', columns=None):
+        """
+        Convert XML file to the intermediate converted data, streaming one
+        record at a time
+        
+        The repeating record element is located with a lightweight pre-scan,
+        then each record is parsed, flattened and handed to the writer on its
+        own, so memory is bounded by a single record rather than the file size.
+        
+        Large uncompressed files in the flat layout are converted in parallel
+        when they can be split at record boundaries (see _convert_xml_parallel).
+        
+        In the relational layout the pre-scan also finds the elements that
+        repeat within a record, and those go to child tables even where a
+        record holds only one of them.
+        
+        In the flat layout the pre-scan is skipped for layouts registered in
+        the schema registry: the registered record element is used and
+        checked against the element counts of the conversion, which is
+        redone with the pre-scan if another element turns out to be the
+        record element.
+        
+        Args:
+            source (str or InputSource): Path to the XML file, possibly
+                                         compressed, or a zip member
+            progress (callable, optional): Called as progress(stage, records_processed)
+            layout (str, optional): Table layout, one of LAYOUTS
+            columns (list, optional): Declared columns, the only ones kept
+        
+        Returns:
+            dict: Paths of converted files
+        """
+        try:
+            source = InputSource.of(source)
+            # Find the repeating record element
+            # Assuming structure like <RootElement><Record>...</Record><Record>...</Record></RootElement>
+            if progress:
+                progress('scanning', 0)
+            
+            # Large files are split at record boundaries and converted in parallel
+            if layout == 'flat' and source.seekable:
+                result = self._convert_xml_parallel(source.path, progress, columns)
+                if result:
+                    return result
             
-            # Convert to DataFrame
-            df = pd.DataFrame(flattened_records)
+            # Only the single pass has a pre-scan for a registered plan to skip
+            schema = self._match_schema(source) if layout == 'flat' else None
+            plan = schema and schema['plan']
+            if plan and plan['record_path']:
+                result = self._write_xml_records(source, plan['record_path'], progress, columns, validate=True)
+                if result:
+                    self._remember_schema(schema, plan['record_path'], result, columns)
+                    return result
+                self.logger.info("Registered XML record element not found, scanning the document")
             
-            # Generate output filenames
-            base_path = filepath.rsplit('.', 1)[0]
-            csv_output = f"{base_path}_converted.csv"
-            excel_output = f"{base_path}_converted.xlsx"
+            repeated_paths = set() if layout == 'relational' else None
+            record_tag = self._find_xml_record_tag(source, repeated_paths)
             
-            # Save conversions
-            df.to_csv(csv_output, index=False, encoding='utf-8')
-            df.to_excel(excel_output, index=False)
+            if layout == 'relational':
+                with RelationalWriter(source.base_path, progress) as writer:
+                    flattener = RelationalFlattener(writer.add_table)
+                    
+                    def write_record(record):
+                        for table, row in flattener.flatten(record):
+                            writer.write_row(table, row)
+                    
+                    self._stream_xml_records(source, record_tag, write_record, repeated_paths)
+                    return writer.close()
             
-            return {
-                'csv_path': csv_output,
-                'excel_path': excel_output,
-                'total_rows': len(df),
-                'total_columns': len(df.columns)
-            }
+            result = self._write_xml_records(source, record_tag, progress, columns)
+            if schema and record_tag == schema['record_path']:
+                # Otherwise the start of the document does not show its layout
+                self._remember_schema(schema, record_tag, result, columns)
+            return result
         
         except Exception as e:
             self.logger.error(f"XML conversion error: {str(e)}")
             raise ValueError(f"XML conversion failed: {str(e)}")
+    
+    def _write_xml_records(self, source, record_tag, progress=None, columns=None, validate=False):
+        """
+        Convert the records of an XML file to the flat layout
+        
+        Args:
+            source (InputSource): XML input
+            record_tag (str): Name of the record element, None for the root
+            progress (callable, optional): Called as progress(stage, records_processed)
+            columns (list, optional): Declared columns, the only ones kept
+            validate (bool, optional): Check that record_tag is the record
+                                       element _find_xml_record_tag would find
+        
+        Returns:
+            dict: Paths of converted files, or None if the check failed, in
+                  which case nothing is written
+        """
+        counts = {} if validate else None
+        with RecordWriter(source.base_path, progress, columns, self._writes_csv(source, columns)) as writer:
+            # Flatten each record straight into a row of the writer's columns
+            flattener = XMLFlattener(writer.columns)
+            self._stream_xml_records(
+                source, record_tag,
+                lambda record: writer.write_row(flattener.flatten(record)), counts=counts
+            )
+            if validate and next((name for name, count in counts.items() if count > 1), None) != record_tag:
+                return None
+            return writer.close()
+    
+    def _find_xml_record_tag(self, source, repeated_paths=None):
+        """
+        Find the repeating child element of the document root
+        
+        Only element names are tracked, so the pass is cheap and uses
+        constant memory regardless of document size.
+        
+        Args:
+            source (str or InputSource): Path to the XML file or input source
+            repeated_paths (set, optional): Filled with the element paths below
+                                            the root's children that occur more
+                                            than once within one parent, as
+                                            tuples of names
+        
+        Returns:
+            str: Name of the first root child that occurs more than once,
+                 or None if the root has no repeating children
+        """
+        counts = {}
+        depth = 0
+        names = []
+        sibling_counts = [{}]
+        
+        def start_element(name, attrs):
+            nonlocal depth
+            depth += 1
+            if depth == 2:
+                counts[name] = counts.get(name, 0) + 1
+            if repeated_paths is not None:
+                names.append(name)
+                siblings = sibling_counts[-1]
+                siblings[name] = siblings.get(name, 0) + 1
+                if siblings[name] == 2 and depth > 2:
+                    repeated_paths.add(tuple(names[1:]))
+                sibling_counts.append({})
+        
+        def end_element(name):
+            nonlocal depth
+            depth -= 1
+            if repeated_paths is not None:
+                names.pop()
+                sibling_counts.pop()
+        
+        parser = expat.ParserCreate()
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        with InputSource.of(source).open() as f:
+            parser.ParseFile(f)
+        
+        for name, count in counts.items():
+            if count > 1:
+                return name
+        return None
+    
+    def _convert_xml_parallel(self, filepath, progress=None, columns=None):
+        """
+        Convert a large XML file in byte ranges of whole records on a process pool
+        
+        Each range is parsed on its own, wrapped in the document's prolog and
+        root element. The record element is guessed from the start of the
+        document and checked against the element counts of all ranges.
+        
+        Args:
+            filepath (str): Path to the XML file
+            progress (callable, optional): Called as progress(stage, records_processed)
+            columns (list, optional): Declared columns, the only ones kept
+        
+        Returns:
+            dict: Paths of converted files, or None if the file is too small
+                  or cannot be split, in which case it is converted in one pass
+        """
+        plan = self._plan_xml_ranges(filepath)
+        if plan is None:
+            return None
+        
+        def validate(results):
+            # The record element must be the one a full scan would pick
+            counts = {}
+            for result in results:
+                for name, count in result['counts'].items():
+                    counts[name] = counts.get(name, 0) + count
+            record_tag = next((name for name, count in counts.items() if count > 1), None)
+            return record_tag == plan['record_tag']
+        
+        try:
+            result = self._convert_ranges(
+                filepath, '_convert_xml_range', plan['ranges'],
+                (plan['prolog_end'], plan['root'], plan['record_tag'], columns), progress, validate, columns
+            )
+        except expat.ExpatError as e:
+            # A boundary was not a record start; the single pass reports real errors
+            self.logger.info(f"Parallel XML conversion not possible: {str(e)}")
+            return None
+        
+        if result is None:
+            self.logger.info("Parallel XML conversion not possible: record element guessed wrong")
+        return result
+    
+    def _plan_xml_ranges(self, filepath):
+        """
+        Split a large XML file into byte ranges of whole record elements
+        
+        Only the start of the document is parsed, to find the root element,
+        the end of its start tag and the first repeating child element.
+        Boundaries are found by searching for that element's start tag; one
+        that is not a real record start (e.g. inside a comment or nested
+        deeper) makes its ranges fail to parse on their own.
+        
+        Args:
+            filepath (str): Path to the XML file
+        
+        Returns:
+            dict: ``root``, ``record_tag``, ``prolog_end`` and ``ranges`` of
+                  ``(start, end)`` byte offsets, or None if the file is not
+                  worth or not possible to split
+        """
+        chunk_bytes = self._get_config('PARALLEL_CHUNK_BYTES', 16 * 1024 ** 2)
+        if self._parallel_workers() < 2:
+            return None
+        if os.path.getsize(filepath) < 2 * chunk_bytes:
+            return None
+        
+        plan = {'root': None, 'record_tag': None, 'prolog_end': None}
+        counts = {}
+        depth = 0
+        parser = expat.ParserCreate()
+        
+        def mark_prolog_end(*args):
+            # The first event inside the root ends its start tag
+            if plan['root'] is not None and plan['prolog_end'] is None:
+                plan['prolog_end'] = parser.CurrentByteIndex
+        
+        def start_element(name, attrs):
+            nonlocal depth
+            mark_prolog_end()
+            depth += 1
+            if depth == 1:
+                plan['root'] = name
+            elif depth == 2:
+                counts[name] = counts.get(name, 0) + 1
+                if counts[name] == 2 and plan['record_tag'] is None:
+                    plan['record_tag'] = name
+        
+        def end_element(name):
+            nonlocal depth
+            mark_prolog_end()
+            depth -= 1
+        
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        parser.CharacterDataHandler = mark_prolog_end
+        parser.CommentHandler = mark_prolog_end
+        parser.ProcessingInstructionHandler = mark_prolog_end
+        
+        with open(filepath, 'rb') as f:
+            try:
+                while plan['record_tag'] is None:
+                    # The record element must repeat within the first range
+                    chunk = f.read(1 << 16)
+                    if not chunk or f.tell() - len(chunk) > chunk_bytes:
+                        return None
+                    parser.Parse(chunk, False)
+            except expat.ExpatError:
+                return None
+            
+            root = plan['root'].encode('utf-8')
+            record_start = f"<{plan['record_tag']}".encode('utf-8')
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                root_end = data.rfind(b'</' + root)
+                if root_end < plan['prolog_end']:
+                    return None
+                
+                # Whatever follows the last record must close the document
+                try:
+                    expat.ParserCreate().Parse(data[:plan['prolog_end']] + data[root_end:], True)
+                except expat.ExpatError:
+                    return None
+                
+                starts = [plan['prolog_end']]
+                while starts[-1] + chunk_bytes < root_end:
+                    start = data.find(record_start, starts[-1] + chunk_bytes, root_end)
+                    name_end = start + len(record_start)
+                    while start >= 0 and data[name_end:name_end + 1] not in XML_NAME_END:
+                        start = data.find(record_start, start + 1, root_end)
+                        name_end = start + len(record_start)
+                    if start < 0:
+                        break
+                    starts.append(start)
+        
+        if len(starts) < 2:
+            return None
+        plan['ranges'] = list(zip(starts, starts[1:] + [root_end]))
+        return plan
+    
+    def _convert_xml_range(self, filepath, start, end, base_path, prolog_end, root, record_tag, columns=None):
+        """
+        Convert the records in one byte range of an XML file
+        
+        Args:
+            filepath (str): Path to the XML file
+            start (int): Offset of the first element in the range
+            end (int): Offset just past the range
+            base_path (str): Output path of the partial converted data
+            prolog_end (int): Offset just past the root's start tag
+            root (str): Name of the root element
+            record_tag (str): Name of the record element
+            columns (list, optional): Declared columns, the only ones kept
+        
+        Returns:
+            dict: Result as from RecordWriter.close, plus ``counts`` of the
+                  root's child elements in the range by name
+        """
+        def document():
+            # The range wrapped in the document's prolog and root element
+            with open(filepath, 'rb') as f:
+                yield f.read(prolog_end)
+                f.seek(start)
+                remaining = end - start
+                while remaining > 0:
+                    chunk = f.read(min(remaining, 1 << 20))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+            yield f"</{root}>".encode('utf-8')
+        
+        counts = {}
+        with RecordWriter(base_path, columns=columns) as writer:
+            flattener = XMLFlattener(writer.columns)
+            self._parse_xml_items(
+                document(), record_tag,
+                lambda record: writer.write_row(flattener.flatten(record)), counts=counts
+            )
+            result = writer.close()
+        result['counts'] = counts
+        return result
+    
+    def _stream_xml_records(self, source, record_tag, callback, repeated_paths=None, counts=None):
+        """
+        Parse an XML file and pass each record to a callback
+        
+        Args:
+            source (str or InputSource): Path to the XML file or input source
+            record_tag (str): Name of the repeating record element. If None,
+                              the root element is treated as a single record.
+            callback (callable): Called with each parsed record
+            repeated_paths (set, optional): Element paths, as found by
+                                            _find_xml_record_tag, to parse as
+                                            lists even when they occur once
+            counts (dict, optional): Filled with the number of root children
+                                     by name, see _parse_xml_items
+        """
+        import xmltodict
+
+        force_list = None
+        if repeated_paths:
+            def force_list(path, key, value):
+                return (*(name for name, _ in path[1:]), key) in repeated_paths
+        
+        with InputSource.of(source).open() as f:
+            if record_tag is None:
+                # No repeating element, the root itself is the only record
+                parsed_data = xmltodict.parse(f, force_list=force_list)
+                root_key = list(parsed_data.keys())[0]
+                if isinstance(parsed_data[root_key], dict):
+                    callback(parsed_data[root_key])
+                return
+            
+            self._parse_xml_items(f, record_tag, callback, force_list, counts)
+    
+    def _parse_xml_items(self, xml_input, record_tag, callback, force_list=None, counts=None):
+        """
+        Parse the root's child elements one at a time and pass each record
+        to a callback
+        
+        Args:
+            xml_input: File object or generator of bytes, as for xmltodict.parse
+            record_tag (str): Name of the repeating record element
+            callback (callable): Called with each parsed record
+            force_list (callable, optional): xmltodict force_list argument
+            counts (dict, optional): Filled with the number of child elements
+                                     by name, in order of first occurrence
+        """
+        import xmltodict
+
+        def handle_item(path, item):
+            name, attrs = path[-1]
+            if counts is not None:
+                counts[name] = counts.get(name, 0) + 1
+            if name == record_tag:
+                callback(self._build_xml_record(attrs, item))
+            return True
+        
+        xmltodict.parse(xml_input, item_depth=2, item_callback=handle_item, force_list=force_list)
+    
+    def _parse_xml_head(self, xml_input, count, records, single_root=True):
+        """
+        Parse the first records of an XML document and stop
+        
+        Args:
+            xml_input: Seekable binary file object
+            count (int): Records to parse
+            records (list): Filled with the parsed records, also when parsing
+                            fails part way
+            single_root (bool, optional): See _parse_xml_guessing
+        
+        Returns:
+            str: Name of the guessed record element, None if nothing repeats
+        """
+        def collect(record):
+            records.append(record)
+            return len(records) < count
+        
+        return self._parse_xml_guessing(xml_input, collect, single_root, records.clear)
+    
+    def _parse_xml_guessing(self, xml_input, callback, single_root=True, restart=None):
+        """
+        Parse the records of an XML document without a pre-scan
+        
+        The record element is the first child of the root, in document order,
+        that repeats, as _find_xml_record_tag picks it. Records are handed
+        over as soon as a child repeats; should a child that came before it
+        repeat later on, that one is the record element and parsing restarts
+        on it. Children before the guess are held, one record each, until
+        they repeat or the document ends.
+        
+        Args:
+            xml_input: Binary file object
+            callback (callable): Called with each record, returns False to
+                                 stop parsing
+            single_root (bool, optional): Pass the root as the one record if
+                                          no element repeats; False to skip it
+            restart (callable, optional): Called when the guess changes, the
+                                          records handed over so far were not
+                                          records after all
+        
+        Returns:
+            str: Name of the guessed record element, None if nothing repeats
+        """
+        import xmltodict
+
+        order = {}
+        singles = {}
+        record_tag = None
+        root_attrs = None
+        
+        def handle_item(path, item):
+            nonlocal record_tag, root_attrs
+            name, attrs = path[-1]
+            root_attrs = path[0][1]
+            if name == record_tag:
+                return callback(self._build_xml_record(attrs, item))
+            if name not in order:
+                order[name] = len(order)
+                if record_tag is None or order[name] < order[record_tag]:
+                    singles[name] = self._build_xml_record(attrs, item)
+                return True
+            if name not in singles:
+                # Came after the guess, or was given up as the guess
+                return True
+            if record_tag is not None and restart is not None:
+                restart()
+            record_tag = name
+            first = singles.pop(name)
+            for other in [other for other in singles if order[other] > order[name]]:
+                del singles[other]
+            return callback(first) and callback(self._build_xml_record(attrs, item))
+        
+        try:
+            xmltodict.parse(xml_input, item_depth=2, item_callback=handle_item)
+        except xmltodict.ParsingInterrupted:
+            return record_tag
+        
+        if record_tag is None and single_root and singles:
+            # No repeating element, the root itself is the only record. Its
+            # children were each seen once, so it is rebuilt from them rather
+            # than parsed again, which a decompressing stream cannot rewind for.
+            root = {f"@{key}": value for key, value in (root_attrs or {}).items()}
+            root.update(singles)
+            callback(root)
+        return record_tag
+    
+    def _iter_xml_batches(self, xml_input, batch_size, restart):
+        """
+        Yield batches of records while an XML document is parsed
+        
+        xmltodict hands records to a callback, so the document is parsed on a
+        thread of its own that passes batches over a small bounded queue. The
+        parser waits while the consumer is behind, which bounds memory to a
+        few batches, and stops once the generator is closed.
+        
+        Args:
+            xml_input: Binary file object
+            batch_size (int): Records per batch
+            restart (callable): Called before the next batch when the record
+                                element was guessed wrong, the batches so far
+                                were not records
+        
+        Yields:
+            list: Parsed records
+        """
+        batches = queue.Queue(maxsize=STREAM_QUEUE_BATCHES)
+        stopped = threading.Event()
+        batch = []
+        
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        
+        def handle_record(record):
+            nonlocal batch
+            batch.append(record)
+            if len(batch) < batch_size:
+                return True
+            full, batch = batch, []
+            return put(full)
+        
+        def handle_restart():
+            batch.clear()
+            put(XML_RESTART)
+        
+        def parse():
+            try:
+                self._parse_xml_guessing(xml_input, handle_record, restart=handle_restart)
+                if batch:
+                    put(batch)
+                put(None)
+            except Exception as e:
+                put(e)
+        
+        parser = threading.Thread(target=parse, name='xml-stream', daemon=True)
+        parser.start()
+        try:
+            while True:
+                item = batches.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                if item is XML_RESTART:
+                    restart()
+                    continue
+                yield item
+        finally:
+            stopped.set()
+            parser.join()
+    
+    def _build_xml_record(self, attrs, item):
+        """
+        Rebuild a streamed record the way a full xmltodict parse represents it
+        
+        Args:
+            attrs (dict): Attributes of the record element
+            item: Children dict or text content delivered by xmltodict
+        
+        Returns:
+            Record as a dict, or its text content for leaf records
+        """
+        record = {f"@{key}": value for key, value in (attrs or {}).items()}
+        if isinstance(item, dict):
+            record.update(item)
+            return record
+        
+        text = item.strip() if item else None
+        if not record:
+            return text or None
+        if text:
+            record['#text'] = text
+        return record
@@ -0,0 +1,140 @@
+import os
+import logging
+import threading
+from urllib.parse import quote
+from typing import List, Optional
+from flask import current_app
+from app.services.data_converter import DataConverterService
+from app.services.job_service import JobService
+from app.services.record_writer import ConvertedData, OUTPUT_FORMATS, DATA_SUFFIX
+
+class DownloadService:
+    """
+    Resolve download requests to the converted files a user may fetch.
+
+    Only outputs of the user's own conversion jobs inside the upload folder
+    are served. Formats that compress well are also offered precompressed:
+    a CSV's ``csv.zst`` and ``csv.gz`` outputs are produced once, in the
+    background on the first download, and reused for every client that
+    accepts their encoding.
+    """
+
+    def __init__(self, converter_service: DataConverterService = None, job_service: JobService = None):
+        self.converter_service = converter_service or DataConverterService()
+        self.job_service = job_service or JobService(self.converter_service)
+        self.logger = logging.getLogger(__name__)
+        self._producing = set()
+        self._lock = threading.Lock()
+
+    def resolve(self, file_path: str, user_id: str) -> str:
+        """
+        Find an output the user may download, writing it first if it was
+        not requested up front
+
+        Args:
+            file_path (str): Output path, absolute or relative to the upload
+                             folder
+            user_id (str): Identity of the requesting user
+
+        Returns:
+            str: Absolute path of the output file
+
+        Raises:
+            FileNotFoundError: If the path is not an output of one of the
+                               user's conversions
+        """
+        upload_folder = os.path.realpath(self.converter_service.file_handler.upload_folder)
+        path = os.path.realpath(os.path.join(upload_folder, file_path))
+        fmt = ConvertedData.format_for(path)
+        if fmt is None or os.path.commonpath([upload_folder, path]) != upload_folder:
+            raise FileNotFoundError(file_path)
+
+        data_path = path[:-len(OUTPUT_FORMATS[fmt]['suffix'])] + DATA_SUFFIX
+        if not self.job_service.store.owns_artifact(user_id, data_path) or not os.path.exists(data_path):
+            # Not the user's, or evicted since
+            raise FileNotFoundError(file_path)
+        if self.converter_service.artifacts:
+            self.converter_service.artifacts.touch(path)
+
+        if not os.path.exists(path):
+            self.converter_service.materialize_output(ConvertedData(data_path), fmt)
+        return path
+
+    @staticmethod
+    def encodings(file_path: str) -> List[str]:
+        """
+        Content encodings an output can be served with
+
+        Args:
+            file_path (str): Output path
+
+        Returns:
+            list: Encoding names in order of preference, empty if the format
+                  is not served precompressed
+        """
+        fmt = ConvertedData.format_for(file_path)
+        return list(OUTPUT_FORMATS[fmt].get('encodings', {})) if fmt else []
+
+    def variant(self, file_path: str, encoding: str) -> Optional[str]:
+        """
+        Find the precompressed variant of an output
+
+        A variant that does not exist yet is produced in the background, so
+        this download is served uncompressed instead of waiting for it.
+
+        Args:
+            file_path (str): Output path as returned by resolve
+            encoding (str): Content encoding from ``encodings``
+
+        Returns:
+            str: Path of the compressed file, or None if it is not ready
+        """
+        fmt = OUTPUT_FORMATS[ConvertedData.format_for(file_path)]['encodings'][encoding]
+        data = ConvertedData.for_output(file_path)
+        if data is None:
+            return None
+
+        variant_path = data.output_path(fmt)
+        if os.path.exists(variant_path):
+            return variant_path
+        if current_app.config.get('PRECOMPRESS_DOWNLOADS', True):
+            self._produce(data, fmt)
+        return None
+
+    def internal_uri(self, file_path: str) -> str:
+        """
+        URI of an output under the front proxy's internal location, for
+        X-Accel-Redirect
+
+        Args:
+            file_path (str): Output path as returned by resolve
+
+        Returns:
+            str: DOWNLOAD_ACCEL_PREFIX followed by the path within the upload
+                 folder
+        """
+        upload_folder = os.path.realpath(self.converter_service.file_handler.upload_folder)
+        relative = os.path.relpath(file_path, upload_folder).replace(os.sep, '/')
+        prefix = current_app.config.get('DOWNLOAD_ACCEL_PREFIX', '/protected-uploads/')
+        return f"{prefix.rstrip('/')}/{quote(relative)}"
+
+    def _produce(self, data: ConvertedData, fmt: str):
+        output_path = data.output_path(fmt)
+        with self._lock:
+            if output_path in self._producing:
+                return
+            self._producing.add(output_path)
+
+        app = current_app._get_current_object()
+
+        def produce():
+            try:
+                with app.app_context():
+                    self.converter_service.materialize_output(data, fmt)
+            except Exception as e:
+                self.logger.error(f"Error precompressing {output_path}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._producing.discard(output_path)
+
+        threading.Thread(target=produce, name=f"precompress-{fmt}", daemon=True).start()
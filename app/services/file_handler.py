@@ -1,18 +1,27 @@
 import os
 import uuid
+import hashlib
 from werkzeug.utils import secure_filename
 from flask import current_app, has_request_context
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Optional
+from app.services.compressed_input import COMPRESSED_EXTENSIONS, ARCHIVE_EXTENSIONS, split_extension
+from app.services.artifact_store import ArtifactStore, shard_directory
 
 class FileHandler:
-    def __init__(self, upload_folder=None):
+    # Bytes read per iteration when streaming uploads to disk
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, upload_folder=None, artifacts: ArtifactStore = None):
         """
         Initialize FileHandler with custom or default upload folder
         
         Args:
             upload_folder (str, optional): Custom upload folder path. 
                                            Defaults to app config upload folder.
+            artifacts (ArtifactStore, optional): Index of the files in the
+                                                 upload folder, for listing
         """
+        self.artifacts = artifacts
         # If no upload_folder is provided, use a default path
         if upload_folder:
             self.upload_folder = upload_folder
@@ -34,6 +43,10 @@ class FileHandler:
         """
         Check if the file extension is allowed
         
+        Data files may also be gzip or zstd compressed (``report.xml.gz``),
+        or bundled in an archive (``reports.zip``), as set by
+        COMPRESSED_EXTENSIONS and ARCHIVE_EXTENSIONS.
+        
         Args:
             filename (str): Name of the file to check
             allowed_extensions (List[str], optional): List of allowed extensions. 
@@ -46,13 +59,38 @@ class FileHandler:
         try:
             allowed_extensions = allowed_extensions or current_app.config.get(
                 'ALLOWED_EXTENSIONS', 
-                {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'csv', 'xml', 'json'}
+                {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'csv', 'xml', 'json', 'jsonl', 'ndjson'}
             )
         except RuntimeError:
-            allowed_extensions = allowed_extensions or {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'csv', 'xml', 'json'}
+            allowed_extensions = allowed_extensions or {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'csv', 'xml', 'json', 'jsonl', 'ndjson'}
+        
+        file_extension, compression = self.split_extension(filename)
+        if compression:
+            return compression in self._config('COMPRESSED_EXTENSIONS', COMPRESSED_EXTENSIONS) and \
+                   file_extension in allowed_extensions
+        return file_extension in allowed_extensions or \
+               file_extension in self._config('ARCHIVE_EXTENSIONS', ARCHIVE_EXTENSIONS)
+    
+    @staticmethod
+    def split_extension(filename: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Split a filename's data type from its compression
+        
+        Args:
+            filename (str): Name of the file, e.g. ``report.xml.gz``
         
-        return '.' in filename and \
-               filename.rsplit('.', 1)[1].lower() in allowed_extensions
+        Returns:
+            tuple: Data type extension, e.g. ``xml`` or ``zip``, and
+                   compression extension, ``gz``, ``zst`` or None
+        """
+        return split_extension(filename)
+    
+    @staticmethod
+    def _config(key: str, default):
+        try:
+            return current_app.config.get(key, default)
+        except RuntimeError:
+            return default
     
     def generate_unique_filename(self, original_filename: str) -> str:
         """
@@ -64,8 +102,10 @@ class FileHandler:
         Returns:
             str: Unique filename
         """
-        # Get file extension
-        file_ext = original_filename.rsplit('.', 1)[1].lower()
+        # Get file extension, keeping the compression's
+        file_ext, compression = self.split_extension(original_filename)
+        if compression:
+            file_ext = f"{file_ext}.{compression}"
         
         # Generate unique filename
         unique_filename = f"{uuid.uuid4().hex}.{file_ext}"
@@ -102,19 +142,51 @@ class FileHandler:
             filename = self.generate_unique_filename(original_filename)
         
         # Full path for saving
-        filepath = os.path.join(self.upload_folder, filename)
+        filepath = self.shard_path(filename)
         
-        # Save the file
-        file.save(filepath)
+        # Stream the file to disk, hashing the bytes as they are written
+        content_hash = hashlib.sha256()
+        file_size = 0
+        with open(filepath, 'wb') as destination:
+            while True:
+                chunk = file.stream.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                content_hash.update(chunk)
+                destination.write(chunk)
+                file_size += len(chunk)
         
+        file_extension, compression = self.split_extension(filename)
         return {
             'original_filename': original_filename,
             'saved_filename': filename,
             'filepath': filepath,
-            'file_extension': filename.rsplit('.', 1)[1].lower(),
-            'file_size': os.path.getsize(filepath)
+            'file_extension': file_extension,
+            'compression': compression,
+            'file_size': file_size,
+            'content_hash': content_hash.hexdigest()
         }
     
+    def shard_path(self, filename: str) -> str:
+        """
+        Path to store a new file at, in a hash-sharded subdirectory of the
+        upload folder
+        
+        Files derived from it, such as its conversion outputs, are written
+        next to it.
+        
+        Args:
+            filename (str): Name of the file
+        
+        Returns:
+            str: Full path of the file; its directory exists
+        """
+        directory = shard_directory(
+            self.upload_folder, filename, self._config('ARTIFACT_SHARD_DEPTH', 2)
+        )
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, filename)
+    
     def delete_file(self, filepath: str) -> bool:
         """
         Delete a file from the filesystem
@@ -134,34 +206,52 @@ class FileHandler:
             current_app.logger.error(f"Error deleting file {filepath}: {str(e)}")
             return False
     
-    def list_files(self, extension: str = None) -> List[Dict[str, Any]]:
+    def list_files(self, extension: str = None, owner: str = None, limit: int = 1000) -> List[Dict[str, Any]]:
         """
-        List files in the upload directory
+        List files in the upload directory, newest first
+        
+        Files are listed from the artifact index, without touching the
+        directory. Without an index the upload folder and its shards are
+        scanned.
         
         Args:
-            extension (str, optional): Filter by file extension
+            extension (str, optional): Filter by file extension, e.g. ``csv``
+                                       or ``xml.gz``
+            owner (str, optional): Only files of this user; needs the index
+            limit (int, optional): Most files to return
         
         Returns:
             List of file details
         """
+        if self.artifacts is not None:
+            return [
+                {
+                    'filename': os.path.basename(artifact['path']),
+                    'filepath': artifact['path'],
+                    'file_extension': artifact['format'],
+                    'file_size': artifact['size_bytes'],
+                    'created_at': artifact['created_at'],
+                    'owner': artifact['owner']
+                }
+                for artifact in self.artifacts.list_files(owner, extension, limit)
+            ]
+        
         files = []
-        for filename in os.listdir(self.upload_folder):
-            filepath = os.path.join(self.upload_folder, filename)
-            
-            # Skip if not a file
-            if not os.path.isfile(filepath):
-                continue
-            
-            # Filter by extension if provided
-            if extension and not filename.lower().endswith(extension.lower()):
-                continue
-            
-            files.append({
-                'filename': filename,
-                'filepath': filepath,
-                'file_extension': filename.rsplit('.', 1)[1].lower(),
-                'file_size': os.path.getsize(filepath),
-                'created_at': os.path.getctime(filepath)
-            })
-        
-        return files
\ No newline at end of file
+        for directory, _, filenames in os.walk(self.upload_folder):
+            for filename in filenames:
+                # Filter by extension if provided
+                if extension and not filename.lower().endswith(f".{extension.lower().lstrip('.')}"):
+                    continue
+                
+                filepath = os.path.join(directory, filename)
+                stat = os.stat(filepath)
+                files.append({
+                    'filename': filename,
+                    'filepath': filepath,
+                    'file_extension': ArtifactStore.format_of(filename),
+                    'file_size': stat.st_size,
+                    'created_at': stat.st_ctime
+                })
+        
+        files.sort(key=lambda file: file['created_at'], reverse=True)
+        return files[:limit]
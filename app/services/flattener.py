@@ -0,0 +1,322 @@
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+# Marks a child path that has not been compiled yet
+_UNRESOLVED = object()
+
+# Key columns of the relational layout's tables
+_KEY_COLUMNS = ('_id', '_parent_id')
+
+class _PathNode:
+    """
+    One path of the record shape, e.g. ``Amount.`` or ``Tags.Tag.[0].``
+
+    Children are resolved from the raw xmltodict key (or list index) once
+    and cached, and the output column is resolved on the first value, so
+    flattening a record only costs a dict lookup per element.
+    """
+
+    __slots__ = ('prefix', 'is_root', 'column', 'children')
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.is_root = not prefix
+        self.column: Optional[int] = None
+        self.children: Dict[Any, Optional['_PathNode']] = {}
+
+    def child(self, key) -> Optional['_PathNode']:
+        try:
+            return self.children[key]
+        except KeyError:
+            pass
+
+        if isinstance(key, int):
+            # List item
+            node = _PathNode(f"{self.prefix}[{key}].")
+        else:
+            # Attributes are flattened like child elements
+            name = key.lstrip('@')
+            if name == '#text':
+                # Text of an element with attributes goes to the element itself
+                node = None if self.is_root else self
+            else:
+                node = _PathNode(f"{self.prefix}{name}.")
+
+        self.children[key] = node
+        return node
+
+    def column_name(self) -> str:
+        return self.prefix.rstrip('.') if self.prefix else 'value'
+
+
+class XMLFlattener:
+    """
+    Flatten parsed XML records into rows using a compiled path plan.
+
+    The plan is a tree of paths learned from the records themselves: the
+    first record that contains a path compiles it to a column index, and
+    every later record reuses it. Records are walked iteratively into a
+    preallocated row instead of recursing and building key strings per
+    node. Column names and order match the dictionary flattening of
+    ``DataConverterService`` (``parent.child``, ``@attr`` as a child,
+    ``#text`` on the element itself and ``[i]`` for repeated elements).
+    """
+
+    def __init__(self, columns: Dict[str, int] = None):
+        """
+        Initialize XMLFlattener
+
+        Args:
+            columns (dict, optional): Column name to index registry to extend,
+                                      e.g. a RecordWriter's columns
+        """
+        self.columns = columns if columns is not None else {}
+        self._root = _PathNode('')
+
+    def flatten(self, record) -> List[Any]:
+        """
+        Flatten a parsed record into a row
+
+        Args:
+            record: Parsed record from xmltodict
+
+        Returns:
+            list: Cell values indexed by column; shorter than the column
+                  registry when trailing columns are absent
+        """
+        columns = self.columns
+        row = [None] * len(columns)
+
+        if isinstance(record, dict):
+            stack = [(iter(record.items()), self._root)]
+        elif isinstance(record, list):
+            stack = [(enumerate(record), self._root)]
+        else:
+            self._assign(row, self._root, record)
+            return row
+
+        # Depth-first walk with one iterator per open container, so values
+        # are visited in document order without recursion
+        while stack:
+            items, node = stack[-1]
+            children = node.children
+            for key, value in items:
+                child = children.get(key, _UNRESOLVED)
+                if child is _UNRESOLVED:
+                    child = node.child(key)
+                if child is None:
+                    continue
+
+                if isinstance(value, dict):
+                    stack.append((iter(value.items()), child))
+                    break
+                if isinstance(value, list):
+                    stack.append((enumerate(value), child))
+                    break
+
+                column = child.column
+                if column is None:
+                    column = child.column = columns.setdefault(child.column_name(), len(columns))
+                if column >= len(row):
+                    row.extend([None] * (column + 1 - len(row)))
+                row[column] = value
+            else:
+                stack.pop()
+
+        return row
+
+    def _assign(self, row, node, value):
+        if node.column is None:
+            node.column = self.columns.setdefault(node.column_name(), len(self.columns))
+        if node.column >= len(row):
+            row.extend([None] * (node.column + 1 - len(row)))
+        row[node.column] = value
+
+
+class _TableNode:
+    """
+    One path of the record shape within a table of the relational layout.
+
+    ``prefix`` names the column relative to the table, ``path`` the location
+    from the record root, which names child tables created for lists found
+    here.
+    """
+
+    __slots__ = ('prefix', 'path', 'column', 'children', 'table')
+
+    def __init__(self, prefix: str, path: str):
+        self.prefix = prefix
+        self.path = path
+        self.column: Optional[int] = None
+        self.children: Dict[Any, Optional['_TableNode']] = {}
+        self.table: Optional['_Table'] = None
+
+    def column_name(self) -> str:
+        return self.prefix or 'value'
+
+
+class _Table:
+    __slots__ = ('name', 'columns', 'root', 'is_root', 'last_id')
+
+    def __init__(self, name: str, columns: Dict[str, int], path: str, is_root: bool):
+        self.name = name
+        self.columns = columns
+        self.root = _TableNode('', path)
+        self.is_root = is_root
+        self.last_id = 0
+
+
+class RelationalFlattener:
+    """
+    Split records into a root table and one child table per repeated path.
+
+    Nested objects are flattened into columns of the table they belong to,
+    as in the flat layout. Every list becomes a child table instead of
+    ``[i]``-indexed columns: each item is one child row carrying its own
+    ``_id`` and the ``_parent_id`` of the row that holds the list, and lists
+    within items nest further. Scalar items go to a ``value`` column.
+
+    Tables are created on first sight through ``add_table``, which returns
+    the column registry the table's rows are laid out against.
+    """
+
+    ROOT_TABLE = 'records'
+
+    def __init__(self, add_table: Callable[[str, Optional[str], Optional[str]], Dict[str, int]],
+                 sep: str = '.', attr_prefix: Optional[str] = '@', text_key: Optional[str] = '#text'):
+        """
+        Initialize RelationalFlattener
+
+        Args:
+            add_table (callable): Called as add_table(name, parent, path) for
+                                  each new table; returns its column registry
+            sep (str, optional): Separator of nested column names
+            attr_prefix (str, optional): Key prefix stripped from attribute
+                                         names, None to keep keys as they are
+            text_key (str, optional): Key holding an element's own text, None
+                                      if records have no such key
+        """
+        self.sep = sep
+        self.attr_prefix = attr_prefix
+        self.text_key = text_key
+        self._add_table = add_table
+        self._names = set()
+        self._root_table = self._create_table(self.ROOT_TABLE, None, '')
+
+    def flatten(self, record) -> List[Tuple[str, List[Any]]]:
+        """
+        Flatten a parsed record into rows of the root and child tables
+
+        Args:
+            record: Parsed record
+
+        Returns:
+            list: ``(table name, row)`` pairs, the record's root row first
+        """
+        table = self._root_table
+        row = self._new_row(table, None)
+        rows = [(table.name, row)]
+
+        if isinstance(record, dict):
+            stack = [(iter(record.items()), table.root, row, table)]
+        else:
+            if record is not None:
+                self._assign(row, table.root, table, record)
+            return rows
+
+        while stack:
+            items, node, row, table = stack[-1]
+
+            if node is None:
+                # Items of a list, one row each in the child table
+                item = next(items, _UNRESOLVED)
+                if item is _UNRESOLVED:
+                    stack.pop()
+                    continue
+                child_row = self._new_row(table, row[0])
+                rows.append((table.name, child_row))
+                if isinstance(item, dict):
+                    stack.append((iter(item.items()), table.root, child_row, table))
+                elif isinstance(item, list):
+                    stack.append((iter((('value', item),)), table.root, child_row, table))
+                elif item is not None:
+                    self._assign(child_row, table.root, table, item)
+                continue
+
+            children = node.children
+            for key, value in items:
+                child = children.get(key, _UNRESOLVED)
+                if child is _UNRESOLVED:
+                    child = self._resolve(node, key, table)
+                if child is None:
+                    continue
+
+                if isinstance(value, dict):
+                    stack.append((iter(value.items()), child, row, table))
+                    break
+                if isinstance(value, list):
+                    child_table = child.table or self._child_table(child, table)
+                    stack.append((iter(value), None, row, child_table))
+                    break
+
+                self._assign(row, child, table, value)
+            else:
+                stack.pop()
+
+        return rows
+
+    def _resolve(self, node: _TableNode, key, table: _Table) -> Optional[_TableNode]:
+        name = str(key)
+        if self.text_key is not None and name == self.text_key:
+            # Text of an element with attributes goes to the element itself;
+            # a child table keeps its items' text in the value column
+            child = None if node is table.root and table.is_root else node
+        else:
+            if self.attr_prefix:
+                name = name.lstrip(self.attr_prefix)
+            child = _TableNode(
+                f"{node.prefix}{self.sep}{name}" if node.prefix else name,
+                f"{node.path}{self.sep}{name}" if node.path else name
+            )
+        node.children[key] = child
+        return child
+
+    def _child_table(self, node: _TableNode, parent: _Table) -> _Table:
+        node.table = self._create_table(node.path, parent.name, node.path)
+        return node.table
+
+    def _create_table(self, name: str, parent: Optional[str], path: str) -> _Table:
+        unique_name = name
+        suffix = 1
+        while unique_name in self._names:
+            suffix += 1
+            unique_name = f"{name}_{suffix}"
+        self._names.add(unique_name)
+
+        columns = self._add_table(unique_name, parent, path or None)
+        columns.setdefault(_KEY_COLUMNS[0], len(columns))
+        if parent is not None:
+            columns.setdefault(_KEY_COLUMNS[1], len(columns))
+        return _Table(unique_name, columns, path, parent is None)
+
+    @staticmethod
+    def _new_row(table: _Table, parent_id: Optional[int]) -> List[Any]:
+        table.last_id += 1
+        row = [None] * len(table.columns)
+        row[0] = table.last_id
+        if parent_id is not None:
+            row[1] = parent_id
+        return row
+
+    @staticmethod
+    def _assign(row: List[Any], node: _TableNode, table: _Table, value):
+        column = node.column
+        if column is None:
+            name = node.column_name()
+            while name in _KEY_COLUMNS:
+                # A field named like a key column must not overwrite the key
+                name += '_'
+            columns = table.columns
+            column = node.column = columns.setdefault(name, len(columns))
+        if column >= len(row):
+            row.extend([None] * (column + 1 - len(row)))
+        row[column] = value
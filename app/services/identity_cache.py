@@ -0,0 +1,82 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+class IdentityCache:
+    """
+    Thread-safe LRU cache whose entries expire after a fixed time to live.
+
+    Used to resolve JWT identities without a database round trip per
+    request. Each process has its own cache, so a change made through
+    another process is seen once the entry expires.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60):
+        """
+        Initialize IdentityCache
+
+        Args:
+            max_size (int, optional): Entries kept before the least recently
+                                      used one is evicted
+            ttl (float, optional): Seconds an entry stays valid; 0 disables
+                                   caching
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Any]:
+        """
+        Look up a live entry
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """
+        Store an entry, evicting the least recently used one if full
+
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        if not self.ttl or not self.max_size:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """
+        Drop an entry if present
+
+        Args:
+            key: Cache key
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Drop all entries
+        """
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,418 @@
+import os
+import json
+import time
+import atexit
+import uuid
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, List, Callable
+from flask import current_app
+from app.services.data_converter import DataConverterService
+from app.services.record_writer import ConvertedData
+from app.services.audit_log import ConversionAuditWriter
+from app.services.auth_service import AuthService
+from app.services.sqlite_store import SQLiteStore
+
+# Job lifecycle states
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+
+class JobStore(SQLiteStore):
+    """
+    SQLite-backed store for conversion job state, shared by the web process
+    and the pool's worker processes without a broker.
+    """
+
+    def _create_schema(self, conn):
+        conn.execute(
+            '''CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                records_processed INTEGER NOT NULL DEFAULT 0,
+                original_file TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )'''
+        )
+        # Converted data produced for each user, which downloads are limited to
+        conn.execute(
+            '''CREATE TABLE IF NOT EXISTS job_artifacts (
+                data_path TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                job_id TEXT NOT NULL,
+                PRIMARY KEY (data_path, user_id)
+            )'''
+        )
+
+    def create(self, user_id: str, original_file: Dict[str, Any]) -> str:
+        """
+        Register a new queued job
+
+        Args:
+            user_id (str): Owner of the job
+            original_file (dict): Saved upload details
+
+        Returns:
+            str: New job id
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (job_id, user_id, status, stage, original_file, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, user_id, JOB_QUEUED, JOB_QUEUED, json.dumps(original_file), now, now)
+            )
+        return job_id
+
+    def update(self, job_id: str, **fields):
+        """
+        Update job columns
+
+        Args:
+            job_id (str): Job to update
+            **fields: Column values; ``result`` is stored as JSON
+        """
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'])
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f"{column} = ?" for column in fields)
+        with self._connect() as conn:
+            conn.execute(
+                f'UPDATE jobs SET {assignments} WHERE job_id = ?',
+                (*fields.values(), job_id)
+            )
+
+    def add_artifacts(self, job_id: str, data_paths: List[str], user_id: str = None):
+        """
+        Record converted data produced by a job as belonging to its owner
+
+        Args:
+            job_id (str): Job that produced the data, or the batch that merged it
+            data_paths (list): Paths of the ``_converted.rows`` files
+            user_id (str, optional): Owner, if the producer is not in the jobs table
+        """
+        with self._connect() as conn:
+            if user_id is not None:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO job_artifacts (data_path, user_id, job_id) VALUES (?, ?, ?)',
+                    [(os.path.realpath(data_path), user_id, job_id) for data_path in data_paths]
+                )
+                return
+            conn.executemany(
+                'INSERT OR IGNORE INTO job_artifacts (data_path, user_id, job_id) '
+                'SELECT ?, user_id, job_id FROM jobs WHERE job_id = ?',
+                [(os.path.realpath(data_path), job_id) for data_path in data_paths]
+            )
+
+    def owns_artifact(self, user_id: str, data_path: str) -> bool:
+        """
+        Check whether one of the user's jobs produced the converted data
+
+        Args:
+            user_id (str): Identity of the user
+            data_path (str): Path of a ``_converted.rows`` file
+
+        Returns:
+            bool: True if the user may download outputs of the data
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                'SELECT 1 FROM job_artifacts WHERE data_path = ? AND user_id = ?',
+                (os.path.realpath(data_path), user_id)
+            ).fetchone() is not None
+
+    def count_statuses(self, job_ids: List[str]) -> Dict[str, int]:
+        """
+        Count jobs by status without loading their results
+
+        Args:
+            job_ids (list): Jobs to count
+
+        Returns:
+            dict: Number of jobs per status
+        """
+        counts = {}
+        with self._connect() as conn:
+            for start in range(0, len(job_ids), 500):
+                chunk = job_ids[start:start + 500]
+                for status, count in conn.execute(
+                    f"SELECT status, COUNT(*) FROM jobs WHERE job_id IN ({', '.join('?' * len(chunk))}) "
+                    "GROUP BY status", chunk
+                ):
+                    counts[status] = counts.get(status, 0) + count
+        return counts
+
+    def get_many(self, job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch several jobs in one query
+
+        Args:
+            job_ids (list): Jobs to fetch
+
+        Returns:
+            dict: Job details by job id, for the jobs that exist
+        """
+        jobs = {}
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            # Stay under SQLite's limit on bound parameters
+            for start in range(0, len(job_ids), 500):
+                chunk = job_ids[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT * FROM jobs WHERE job_id IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for row in rows:
+                    jobs[row['job_id']] = self._job(row)
+        return jobs
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a job
+
+        Args:
+            job_id (str): Job to fetch
+
+        Returns:
+            dict: Job details, or None if the job does not exist
+        """
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return self._job(row) if row is not None else None
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for key in ('original_file', 'result'):
+            job[key] = json.loads(job[key]) if job[key] else None
+        return job
+
+
+def run_conversion_job(db_path: str, job_id: str, file_info: Dict[str, Any], config: Dict[str, Any],
+                       options: Dict[str, Any] = None):
+    """
+    Run a conversion job inside a pool worker
+
+    Args:
+        db_path (str): Path to the job store database
+        job_id (str): Job being processed
+        file_info (dict): Saved upload details
+        config (dict): Converter settings from the submitting app
+        options (dict, optional): Converter options for this conversion
+    """
+    store = JobStore(db_path)
+    store.update(job_id, status=JOB_RUNNING, stage='starting')
+
+    def progress(stage, records_processed):
+        store.update(job_id, stage=stage, records_processed=records_processed)
+
+    try:
+        result = DataConverterService(config).convert_saved_file(file_info, progress, options)
+    except Exception as e:
+        store.update(job_id, status=JOB_FAILED, stage=JOB_FAILED, error=str(e))
+        return
+
+    # Cached results are shared, so every job owning them is recorded
+    data = ConvertedData(result['conversion_result']['data_path'])
+    store.add_artifacts(job_id, [table.data_path for _, table in data.tables()])
+    store.update(
+        job_id,
+        status=JOB_COMPLETED,
+        stage=JOB_COMPLETED,
+        records_processed=result['conversion_result']['total_rows'],
+        result=result
+    )
+
+
+class JobService:
+    """
+    Run conversions asynchronously on a process pool and track their progress
+    """
+
+    def __init__(self, converter_service: DataConverterService = None):
+        self.converter_service = converter_service or DataConverterService()
+        self.logger = logging.getLogger(__name__)
+        self._store = None
+        self._executor = None
+        self._audit_writer = None
+        self._lock = threading.Lock()
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = JobStore(current_app.config['JOB_DATABASE'])
+        return self._store
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=current_app.config.get('CONVERSION_WORKERS', 2)
+                )
+            return self._executor
+
+    @property
+    def audit_writer(self) -> Optional[ConversionAuditWriter]:
+        with self._lock:
+            if self._audit_writer is None and current_app.config.get('AUDIT_LOG_ENABLED', False):
+                self._audit_writer = ConversionAuditWriter(
+                    current_app.config.get('AUDIT_DATABASE_URI') or current_app.config['SQLALCHEMY_DATABASE_URI'],
+                    batch_size=current_app.config.get('AUDIT_BATCH_SIZE', 500),
+                    flush_interval=current_app.config.get('AUDIT_FLUSH_INTERVAL', 2.0)
+                )
+                # Buffered rows are written before the process exits
+                atexit.register(self._audit_writer.close)
+            return self._audit_writer
+
+    def submit(self, file, user_id: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Save an upload and queue its conversion
+
+        Args:
+            file: File object from Flask request
+            user_id (str): Identity of the requesting user
+            options (dict, optional): Converter options, e.g. ``formats``
+
+        Returns:
+            dict: Queued job details
+
+        Raises:
+            ValueError: If the file is invalid or over the user's quota
+        """
+        file_info = self.converter_service.save_file(file, user_id)
+        return self.submit_saved_file(file_info, user_id, options)
+
+    def submit_saved_file(self, file_info: Dict[str, Any], user_id: str,
+                          options: Dict[str, Any] = None,
+                          on_done: Callable[[str], None] = None, job_id: str = None) -> Dict[str, Any]:
+        """
+        Queue the conversion of a file already in the upload folder
+
+        Args:
+            file_info (dict): File details as returned by FileHandler.save_file
+            user_id (str): Identity of the requesting user
+            options (dict, optional): Converter options, e.g. ``formats``
+            on_done (callable, optional): Called with the job id once the job
+                                          has finished and been recorded
+            job_id (str, optional): Job already registered with the store
+                                    for this file, instead of a new one
+
+        Returns:
+            dict: Queued job details
+        """
+        store = self.store
+        audit_writer = self.audit_writer
+        audit_user_id = self._audit_user_id(user_id) if audit_writer else None
+        formats = (options or {}).get('formats') or current_app.config.get('DEFAULT_OUTPUT_FORMATS', ['csv'])
+        job_id = job_id or store.create(user_id, file_info)
+        config = self.pool_config()
+
+        future = self.executor.submit(
+            run_conversion_job, store.db_path, job_id, file_info, config, options
+        )
+        future.add_done_callback(
+            lambda f: self._on_job_done(job_id, f, audit_writer, formats, on_done, audit_user_id)
+        )
+
+        return store.get(job_id)
+
+    @staticmethod
+    def pool_config() -> Dict[str, Any]:
+        """
+        Settings of the current app that can be sent to pool workers
+
+        Returns:
+            dict: Config values of plain types
+        """
+        return {
+            key: value for key, value in current_app.config.items()
+            if isinstance(value, (str, int, float, bool, type(None)))
+        }
+
+    def get_job(self, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a job owned by the given user
+
+        Args:
+            job_id (str): Job to fetch
+            user_id (str): Identity of the requesting user
+
+        Returns:
+            dict: Job details, or None if not found or owned by another user
+        """
+        job = self.store.get(job_id)
+        if not job or job['user_id'] != user_id:
+            return None
+        return job
+
+    def _audit_user_id(self, username: str) -> Optional[str]:
+        # Audit rows name users by id; resolved on the request path, where
+        # the main database is at hand, as the audit database may be another
+        try:
+            return AuthService().get_user_by_username(username).user_id
+        except ValueError:
+            self.logger.error(f"Conversion by unknown user {username} will not be audited")
+            return None
+
+    def _on_job_done(self, job_id: str, future, audit_writer: ConversionAuditWriter = None,
+                     formats: List[str] = None, on_done: Callable[[str], None] = None,
+                     audit_user_id: str = None):
+        # A worker that dies (e.g. killed for memory) never records its failure
+        error = future.exception()
+        if error is not None:
+            self.logger.error(f"Conversion job {job_id} crashed: {str(error)}")
+            self.store.update(job_id, status=JOB_FAILED, stage=JOB_FAILED, error=str(error))
+            if isinstance(error, BrokenProcessPool):
+                with self._lock:
+                    self._executor = None
+        
+        if audit_writer and audit_user_id:
+            try:
+                self._audit_job(audit_writer, self.store.get(job_id), formats, audit_user_id)
+            except Exception as e:
+                self.logger.error(f"Error auditing conversion job {job_id}: {str(e)}")
+        
+        if on_done:
+            try:
+                on_done(job_id)
+            except Exception as e:
+                self.logger.error(f"Error finishing conversion job {job_id}: {str(e)}")
+    
+    @staticmethod
+    def _audit_job(audit_writer: ConversionAuditWriter, job: Dict[str, Any], formats: List[str], user_id: str):
+        result = job['result'] or {}
+        conversion_result = result.get('conversion_result') or {}
+        
+        bytes_out = None
+        if conversion_result:
+            data = ConvertedData(conversion_result['data_path'])
+            paths = {path for fmt in formats for path in data.output_paths(fmt)}
+            bytes_out = sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+        
+        status = job['status']
+        if result.get('cached'):
+            status = 'cached'
+        audit_writer.record(
+            user_id,
+            job_id=job['job_id'],
+            original_filename=job['original_file']['original_filename'],
+            converted_format=','.join(formats),
+            status=status,
+            duration_seconds=job['updated_at'] - job['created_at'],
+            bytes_in=job['original_file'].get('file_size'),
+            bytes_out=bytes_out,
+            total_rows=conversion_result.get('total_rows'),
+            total_columns=conversion_result.get('total_columns'),
+            error=job['error']
+        )
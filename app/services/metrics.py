@@ -0,0 +1,355 @@
+import sys
+import json
+import math
+import time
+from typing import Dict, Optional, Callable, List, Tuple
+from app.services.sqlite_store import SQLiteStore
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MB = 1024 ** 2
+
+# Upper bounds of the input size buckets used as a label
+SIZE_BUCKETS = ((MB, '<1MB'), (10 * MB, '1-10MB'), (100 * MB, '10-100MB'), (1024 * MB, '100MB-1GB'))
+SIZE_BUCKET_MAX = '>1GB'
+
+# Histograms recorded per conversion: name -> (help text, bucket upper bounds)
+HISTOGRAMS = {
+    'conversion_duration_seconds': (
+        'Time to convert an upload, from the start of the job to its last output',
+        (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900, 1800)
+    ),
+    'conversion_stage_duration_seconds': (
+        'Time spent in each conversion stage',
+        (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+    ),
+    'conversion_stage_bytes': (
+        'Bytes written by each conversion stage',
+        tuple(MB * 4 ** power // 16 for power in range(10))  # 64 KB to 16 GB
+    ),
+    'conversion_peak_rss_bytes': (
+        'Peak resident memory of the process running a conversion',
+        tuple(MB * 2 ** power for power in range(5, 15))  # 32 MB to 16 GB
+    ),
+    'conversion_memory_saved_bytes': (
+        'Memory the inferred column types save over object columns',
+        tuple(MB * 4 ** power // 16 for power in range(10))  # 64 KB to 16 GB
+    )
+}
+
+COUNTERS = {
+    'conversions_total': 'Conversions finished, by outcome'
+}
+
+
+def size_bucket(file_size: int) -> str:
+    """
+    Label for the size range an input file falls in
+
+    Args:
+        file_size (int): Size of the input in bytes
+
+    Returns:
+        str: Size bucket label, e.g. ``10-100MB``
+    """
+    for limit, label in SIZE_BUCKETS:
+        if file_size < limit:
+            return label
+    return SIZE_BUCKET_MAX
+
+
+def conversion_labels(file_type: str, file_size: int, **labels) -> Dict[str, str]:
+    """
+    Labels identifying the kind of input a measurement belongs to
+
+    Args:
+        file_type (str): Extension of the input file
+        file_size (int): Size of the input file in bytes
+        **labels: Further labels, e.g. ``stage``
+
+    Returns:
+        dict: Label names and values
+    """
+    return dict(labels, file_type=file_type, size_bucket=size_bucket(file_size))
+
+
+def reset_peak_rss():
+    """
+    Start a new peak memory measurement for the current process
+
+    Pool workers run many jobs, so the peak since process start would mix
+    jobs. Linux can reset the high-water mark; elsewhere the process
+    lifetime peak is reported.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss() -> Optional[int]:
+    """
+    Peak resident memory of the current process since the last reset
+
+    Returns:
+        int: Peak RSS in bytes, or None where it cannot be measured
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MetricsStore(SQLiteStore):
+    """
+    Prometheus-style histograms and counters kept in SQLite.
+
+    Conversions run in the job pool's worker processes, so their
+    observations are aggregated here rather than in the memory of the web
+    process that serves ``/metrics``. Each histogram bucket is stored
+    cumulatively, as Prometheus exposes it.
+    """
+
+    def _create_schema(self, conn):
+        conn.execute(
+            '''CREATE TABLE IF NOT EXISTS histogram_buckets (
+                name TEXT NOT NULL,
+                labels TEXT NOT NULL,
+                le REAL NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (name, labels, le)
+            )'''
+        )
+        conn.execute(
+            '''CREATE TABLE IF NOT EXISTS histogram_totals (
+                name TEXT NOT NULL,
+                labels TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                sum REAL NOT NULL,
+                PRIMARY KEY (name, labels)
+            )'''
+        )
+        conn.execute(
+            '''CREATE TABLE IF NOT EXISTS counters (
+                name TEXT NOT NULL,
+                labels TEXT NOT NULL,
+                value INTEGER NOT NULL,
+                PRIMARY KEY (name, labels)
+            )'''
+        )
+
+    def record(self, observations: List[Tuple[str, Dict[str, str], float]],
+               counters: List[Tuple[str, Dict[str, str]]] = ()):
+        """
+        Add histogram observations and counter increments in one transaction
+
+        Args:
+            observations (list): ``(histogram name, labels, value)`` triples
+            counters (list, optional): ``(counter name, labels)`` pairs, each
+                                       incremented by one
+        """
+        bucket_rows = []
+        total_rows = []
+        for name, labels, value in observations:
+            labels_key = json.dumps(labels, sort_keys=True)
+            bounds = HISTOGRAMS[name][1] + (math.inf,)
+            bucket_rows.extend((name, labels_key, le) for le in bounds if value <= le)
+            total_rows.append((name, labels_key, value))
+
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT INTO histogram_buckets (name, labels, le, count) VALUES (?, ?, ?, 1) '
+                'ON CONFLICT(name, labels, le) DO UPDATE SET count = count + 1',
+                bucket_rows
+            )
+            conn.executemany(
+                'INSERT INTO histogram_totals (name, labels, count, sum) VALUES (?, ?, 1, ?) '
+                'ON CONFLICT(name, labels) DO UPDATE SET count = count + 1, sum = sum + excluded.sum',
+                total_rows
+            )
+            conn.executemany(
+                'INSERT INTO counters (name, labels, value) VALUES (?, ?, 1) '
+                'ON CONFLICT(name, labels) DO UPDATE SET value = value + 1',
+                [(name, json.dumps(labels, sort_keys=True)) for name, labels in counters]
+            )
+
+    def render(self) -> str:
+        """
+        Format all metrics in the Prometheus text exposition format
+
+        Returns:
+            str: Metrics page body
+        """
+        with self._connect() as conn:
+            buckets = conn.execute(
+                'SELECT name, labels, le, count FROM histogram_buckets ORDER BY name, labels, le'
+            ).fetchall()
+            totals = conn.execute('SELECT name, labels, count, sum FROM histogram_totals').fetchall()
+            counters = conn.execute('SELECT name, labels, value FROM counters ORDER BY name, labels').fetchall()
+
+        series = {}
+        for name, labels, le, count in buckets:
+            series.setdefault(name, {}).setdefault(labels, {})[le] = count
+        sums = {(name, labels): (count, total) for name, labels, count, total in totals}
+
+        lines = []
+        for name, (help_text, bounds) in HISTOGRAMS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels_key, counts in series.get(name, {}).items():
+                labels = json.loads(labels_key)
+                # Buckets no observation reached were never stored
+                cumulative = 0
+                for le in bounds + (math.inf,):
+                    cumulative = counts.get(le, cumulative)
+                    le_label = '+Inf' if math.isinf(le) else repr(float(le))
+                    lines.append(f"{name}_bucket{self._labels(dict(labels, le=le_label))} {cumulative}")
+                count, total = sums.get((name, labels_key), (0, 0.0))
+                lines.append(f"{name}_sum{self._labels(labels)} {repr(float(total))}")
+                lines.append(f"{name}_count{self._labels(labels)} {count}")
+
+        for name, help_text in COUNTERS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for counter_name, labels_key, value in counters:
+                if counter_name == name:
+                    lines.append(f"{name}{self._labels(json.loads(labels_key))} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _labels(labels: Dict[str, str]) -> str:
+        if not labels:
+            return ''
+        escaped = (
+            (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for key, value in labels.items()
+        )
+        return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+class ConversionMetrics:
+    """
+    Time the stages of one conversion and record them when it finishes.
+
+    Stages are the ones the converter already reports through its progress
+    callback (``scanning``, ``parsing``, ``merging``, ``writing csv`` ...):
+    a stage lasts until the callback names a different one. Observations
+    are kept in memory and written to the store in one transaction at the
+    end, labelled by input file type and size bucket.
+    """
+
+    def __init__(self, store: MetricsStore, file_type: str, file_size: int):
+        """
+        Initialize ConversionMetrics and start measuring peak memory
+
+        Args:
+            store (MetricsStore): Store to record the observations in
+            file_type (str): Extension of the input file
+            file_size (int): Size of the input file in bytes
+        """
+        self.store = store
+        self.labels = conversion_labels(file_type, file_size)
+        self.observations: List[Tuple[str, Dict[str, str], float]] = []
+        self._started = time.perf_counter()
+        self._stage = None
+        self._stage_started = None
+        self._stage_bytes = None
+        reset_peak_rss()
+
+    def track(self, progress: Optional[Callable[[str, int], None]] = None) -> Callable[[str, int], None]:
+        """
+        Wrap a progress callback so that stage changes are timed
+
+        Args:
+            progress (callable, optional): Callback to forward progress to
+
+        Returns:
+            callable: Progress callback for the converter
+        """
+        def tracked(stage, records_processed):
+            self.stage(stage)
+            if progress:
+                progress(stage, records_processed)
+        return tracked
+
+    def stage(self, stage: str):
+        """
+        Enter a stage, ending the current one if it is different
+
+        Args:
+            stage (str): Stage name
+        """
+        if stage == self._stage:
+            return
+        now = time.perf_counter()
+        if self._stage is not None:
+            self.observe_stage(self._stage, now - self._stage_started, self._stage_bytes)
+        self._stage = stage
+        self._stage_started = now
+        self._stage_bytes = None
+
+    def add_bytes(self, size_bytes: int):
+        """
+        Count bytes written by the current stage
+
+        Args:
+            size_bytes (int): Bytes written
+        """
+        self._stage_bytes = (self._stage_bytes or 0) + size_bytes
+
+    def observe_stage(self, stage: str, seconds: float, size_bytes: int = None):
+        """
+        Record a stage measured by the caller
+
+        Args:
+            stage (str): Stage name
+            seconds (float): Time spent in the stage
+            size_bytes (int, optional): Bytes the stage wrote
+        """
+        labels = dict(self.labels, stage=stage)
+        self.observations.append(('conversion_stage_duration_seconds', labels, seconds))
+        if size_bytes is not None:
+            self.observations.append(('conversion_stage_bytes', labels, size_bytes))
+
+    def observe(self, name: str, value: float):
+        """
+        Record a value of a histogram for this conversion
+
+        Args:
+            name (str): Histogram name from HISTOGRAMS
+            value (float): Observed value
+        """
+        self.observations.append((name, dict(self.labels), value))
+
+    def finish(self, status: str):
+        """
+        End the current stage and record everything observed
+
+        Args:
+            status (str): Outcome of the conversion, e.g. ``completed``,
+                          ``cached`` or ``failed``
+        """
+        self.stage(None)
+        labels = dict(self.labels, status=status)
+        observations = self.observations + [
+            ('conversion_duration_seconds', labels, time.perf_counter() - self._started)
+        ]
+        peak = peak_rss()
+        if peak is not None:
+            observations.append(('conversion_peak_rss_bytes', labels, peak))
+        self.store.record(observations, [('conversions_total', labels)])
+        self.observations = []
@@ -0,0 +1,859 @@
+import io
+import os
+import re
+import csv
+import gzip
+import json
+import shutil
+import tempfile
+import itertools
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+# Records written between progress callbacks
+PROGRESS_INTERVAL = 1000
+
+# Intermediate converted data, stored once per conversion
+DATA_SUFFIX = '_converted.rows'
+
+# Table relationships of the relational layout, next to the root table's data
+MANIFEST_SUFFIX = '_manifest.json'
+
+# Column types inferred for the typed output formats, next to the data
+TYPES_SUFFIX = '_converted.types.json'
+
+# Encodes spilled rows; built once, json.dumps builds an encoder per call
+# when given options
+ROW_ENCODER = json.JSONEncoder(default=str)
+
+# Line ending of CSV outputs, as DataFrame.to_csv wrote them
+CSV_LINE_TERMINATOR = '\n'
+
+# Rows per Excel worksheet including the header row
+EXCEL_MAX_ROWS = 1048576
+
+# Worksheet titles are limited in length and may not contain these characters
+EXCEL_MAX_TITLE = 31
+EXCEL_INVALID_TITLE = re.compile(r'[\\/?*\[\]:]')
+
+# Output formats that can be materialized from converted data
+OUTPUT_FORMATS = {
+    # Downloads of a CSV are served from its compressed outputs to clients
+    # accepting their encoding, in order of preference
+    'csv': {
+        'suffix': '_converted.csv', 'result_key': 'csv_path',
+        'writer': '_write_csv', 'mimetype': 'text/csv',
+        'encodings': {'zstd': 'csv.zst', 'gzip': 'csv.gz'}
+    },
+    # One workbook holds every table of the relational layout, one sheet each;
+    # the other formats write a file per table. Typed formats store values in
+    # the column types inferred from the data instead of as they were parsed.
+    'xlsx': {
+        'suffix': '_converted.xlsx', 'result_key': 'excel_path', 'writer': '_write_xlsx',
+        'mimetype': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        'all_tables': True, 'typed': True
+    },
+    'csv.gz': {
+        'suffix': '_converted.csv.gz', 'result_key': 'csv_gz_path',
+        'writer': '_write_csv_gz', 'mimetype': 'application/gzip'
+    },
+    'csv.zst': {
+        'suffix': '_converted.csv.zst', 'result_key': 'csv_zst_path',
+        'writer': '_write_csv_zst', 'mimetype': 'application/zstd'
+    },
+    'parquet': {
+        'suffix': '_converted.parquet', 'result_key': 'parquet_path',
+        'writer': '_write_parquet', 'mimetype': 'application/vnd.apache.parquet', 'typed': True
+    },
+    'feather': {
+        'suffix': '_converted.feather', 'result_key': 'feather_path',
+        'writer': '_write_feather', 'mimetype': 'application/vnd.apache.arrow.file', 'typed': True
+    }
+}
+
+# Defaults for output writer settings, overridable per materialization
+OUTPUT_SETTINGS = {
+    'csv_gzip_level': 6,
+    'parquet_row_group_size': 100000,
+    'parquet_compression': 'snappy',
+    'feather_compression': 'lz4',
+    'type_sample_rows': 1000,
+    'type_batch_rows': 10000,
+    'category_max_distinct': 1000
+}
+
+def excel_sheet_layout(total_rows: int) -> List[Dict[str, Any]]:
+    """
+    Split data rows across worksheets so none exceeds Excel's row limit
+
+    Args:
+        total_rows (int): Number of data rows
+
+    Returns:
+        list: ``{'name', 'rows'}`` per worksheet, at least one
+    """
+    rows_per_sheet = EXCEL_MAX_ROWS - 1
+    sheets = []
+    remaining = total_rows
+    while True:
+        rows = min(remaining, rows_per_sheet)
+        sheets.append({'name': f"Sheet{len(sheets) + 1}", 'rows': rows})
+        remaining -= rows
+        if remaining <= 0:
+            return sheets
+
+
+def converted_result(base_path: str, total_rows: int, total_columns: int) -> Dict[str, Any]:
+    """
+    Describe converted data and the outputs that can be materialized from it
+
+    Args:
+        base_path (str): Output path without extension
+        total_rows (int): Number of data rows
+        total_columns (int): Number of columns
+
+    Returns:
+        dict: Paths of the converted data and of its outputs, which only
+              exist once materialized, plus row/column counts
+    """
+    result = {'data_path': f"{base_path}{DATA_SUFFIX}", 'types_path': f"{base_path}{TYPES_SUFFIX}"}
+    for output in OUTPUT_FORMATS.values():
+        result[output['result_key']] = f"{base_path}{output['suffix']}"
+    result['total_rows'] = total_rows
+    result['total_columns'] = total_columns
+    result['excel_sheets'] = excel_sheet_layout(total_rows)
+    return result
+
+
+def excel_workbook_layout(tables: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    """
+    Lay out several tables in one workbook, each on its own sheets
+
+    Args:
+        tables (list): ``(table name, data rows)`` pairs in sheet order
+
+    Returns:
+        list: ``{'name', 'rows', 'table'}`` per worksheet
+    """
+    sheets = []
+    titles = set()
+    for table, total_rows in tables:
+        for index, layout in enumerate(excel_sheet_layout(total_rows)):
+            # Keep the end of long table paths, it is the distinctive part
+            base = EXCEL_INVALID_TITLE.sub('_', table) or 'Sheet'
+            suffix = f" ({index + 1})" if index else ''
+            title = base[-(EXCEL_MAX_TITLE - len(suffix)):] + suffix
+            duplicate = 1
+            while title.lower() in titles:
+                # Titles are unique ignoring case, shortening can collide
+                duplicate += 1
+                tag = f"{suffix}~{duplicate}"
+                title = base[-(EXCEL_MAX_TITLE - len(tag)):] + tag
+            titles.add(title.lower())
+            sheets.append({'name': title, 'rows': layout['rows'], 'table': table})
+    return sheets
+
+
+class RecordWriter:
+    """
+    Write flattened records to the intermediate converted data file one
+    record at a time.
+
+    Records are spilled to a temporary JSON lines file while the column set
+    is learned, so memory stays bounded by a single record instead of the
+    whole document. On close the column header is prepended and the result
+    becomes the converted data file, from which the CSV and Excel outputs
+    are materialized when they are needed (see ConvertedData).
+
+    Declared columns fix the column set up front: other fields are dropped,
+    and since the header is known the CSV output can be written in the same
+    pass instead of being rendered from the converted data afterwards.
+    """
+
+    def __init__(self, base_path: str, progress: Optional[Callable[[str, int], None]] = None,
+                 columns: Optional[List[str]] = None, write_csv: bool = False):
+        """
+        Initialize RecordWriter for the given output base path
+
+        Args:
+            base_path (str): Output path without extension; converted data is
+                             written to ``<base_path>_converted.rows``
+            progress (callable, optional): Called as progress(stage, records_processed)
+            columns (list, optional): Declared columns, the only ones kept
+            write_csv (bool, optional): Write the CSV output while rows are
+                                        written; needs declared columns
+        """
+        if write_csv and columns is None:
+            raise ValueError("Writing the CSV directly needs declared columns")
+        self.base_path = base_path
+        self.progress = progress
+        self.data_path = f"{base_path}{DATA_SUFFIX}"
+        self.columns: Dict[str, int] = {column: index for index, column in enumerate(columns or [])}
+        self.declared = list(columns) if columns is not None else None
+        self.total_rows = 0
+        # Extra fields for the data file header
+        self.header: Dict[str, Any] = {}
+
+        spill = tempfile.NamedTemporaryFile(
+            mode='w', encoding='utf-8', suffix='.spill',
+            dir=os.path.dirname(base_path) or None, delete=False
+        )
+        self._spill = spill
+        self._spill_path = spill.name
+
+        self._csv = self._csv_writer = None
+        if write_csv:
+            csv_path = f"{base_path}{OUTPUT_FORMATS['csv']['suffix']}"
+            self._csv = tempfile.NamedTemporaryFile(
+                mode='w', encoding='utf-8', newline='', prefix=f".{os.path.basename(csv_path)}.",
+                dir=os.path.dirname(base_path) or None, delete=False
+            )
+            self._csv_writer = csv.writer(self._csv, lineterminator=CSV_LINE_TERMINATOR)
+            self._csv_writer.writerow(self.declared)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
+        return False
+
+    def write(self, record: Dict[str, Any]):
+        """
+        Append a flattened record
+
+        Args:
+            record (dict): Mapping of column name to cell value
+        """
+        row = [None] * len(self.columns)
+        for key, value in record.items():
+            index = self.columns.get(key)
+            if index is None:
+                if self.declared is not None:
+                    continue
+                index = self.columns[key] = len(self.columns)
+                row.append(None)
+            row[index] = value
+        self.write_row(row)
+
+    def write_row(self, row: List[Any]):
+        """
+        Append a record already laid out by column index
+
+        Args:
+            row (list): Cell values indexed by ``self.columns``; may be shorter
+                        than the column registry
+        """
+        if self.declared is not None:
+            # Flatteners register every field they meet, only declared ones are kept
+            width = len(self.declared)
+            if len(row) > width:
+                del row[width:]
+            if self._csv_writer:
+                self._csv_writer.writerow(row + [None] * (width - len(row)) if len(row) < width else row)
+        self._spill.write(ROW_ENCODER.encode(row))
+        self._spill.write('\n')
+        self.total_rows += 1
+        if self.progress and self.total_rows % PROGRESS_INTERVAL == 0:
+            self.progress('parsing', self.total_rows)
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Finish the converted data file
+
+        Returns:
+            dict: Paths of the converted data and of its outputs, which only
+                  exist once materialized, plus row/column counts
+        """
+        self._spill.close()
+        columns = self.declared if self.declared is not None else list(self.columns)
+        header = dict(self.header, columns=columns, total_rows=self.total_rows)
+
+        with open(self.data_path, 'w', encoding='utf-8') as data_file:
+            data_file.write(json.dumps(header))
+            data_file.write('\n')
+            with open(self._spill_path, 'r', encoding='utf-8') as spill:
+                shutil.copyfileobj(spill, data_file)
+        if self._csv:
+            self._csv.close()
+            os.replace(self._csv.name, f"{self.base_path}{OUTPUT_FORMATS['csv']['suffix']}")
+        self.cleanup()
+        return converted_result(self.base_path, self.total_rows, len(columns))
+
+    def cleanup(self):
+        """
+        Remove the temporary spill file, and the CSV output if unfinished
+        """
+        if not self._spill.closed:
+            self._spill.close()
+        if os.path.exists(self._spill_path):
+            os.remove(self._spill_path)
+        if self._csv:
+            self._csv.close()
+            if os.path.exists(self._csv.name):
+                os.remove(self._csv.name)
+
+
+class RelationalWriter:
+    """
+    Write the relational layout: a root table with one row per record and
+    a child table per repeated path, each stored as its own converted data.
+
+    Child rows carry an ``_id`` and the ``_parent_id`` of the row holding
+    them. On close a manifest describing the tables and how they relate is
+    written next to the root table's data and referenced from its header,
+    which is how the root's outputs find the child tables.
+    """
+
+    def __init__(self, base_path: str, progress: Optional[Callable[[str, int], None]] = None):
+        """
+        Initialize RelationalWriter for the given output base path
+
+        Args:
+            base_path (str): Output path without extension; the root table is
+                             written like RecordWriter's output and child
+                             tables to ``<base_path>_<table>_converted.rows``
+            progress (callable, optional): Called as progress(stage, records_processed)
+        """
+        self.base_path = base_path
+        self.progress = progress
+        self.manifest_path = f"{base_path}{MANIFEST_SUFFIX}"
+        self.tables: Dict[str, Dict[str, Any]] = {}
+        self._file_names = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
+        return False
+
+    def add_table(self, name: str, parent: Optional[str] = None, path: Optional[str] = None) -> Dict[str, int]:
+        """
+        Start a table
+
+        Args:
+            name (str): Unique table name
+            parent (str, optional): Name of the parent table, None for the root
+            path (str, optional): Record path the table's rows come from
+
+        Returns:
+            dict: Column registry of the table
+        """
+        if parent is None:
+            writer = RecordWriter(self.base_path, self.progress)
+        else:
+            file_name = re.sub(r'[^\w.-]', '_', name)
+            while file_name in self._file_names:
+                file_name += '_'
+            self._file_names.add(file_name)
+            writer = RecordWriter(f"{self.base_path}_{file_name}")
+
+        self.tables[name] = {'writer': writer, 'parent': parent, 'path': path}
+        return writer.columns
+
+    def write_row(self, table: str, row: List[Any]):
+        """
+        Append a row to a table
+
+        Args:
+            table (str): Table name
+            row (list): Cell values indexed by the table's columns
+        """
+        self.tables[table]['writer'].write_row(row)
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Finish every table and write the manifest
+
+        Returns:
+            dict: The root table's result as from RecordWriter.close, plus
+                  the manifest path and the details of each table
+        """
+        # Child tables live on the root workbook's sheets, not in own files
+        per_table_keys = ['data_path', 'types_path'] + [
+            output['result_key'] for output in OUTPUT_FORMATS.values() if not output.get('all_tables')
+        ]
+
+        result = None
+        tables = []
+        for name, table in self.tables.items():
+            if table['parent'] is None:
+                table['writer'].header['manifest'] = os.path.basename(self.manifest_path)
+            table_result = table['writer'].close()
+            if table['parent'] is None:
+                result = table_result
+            tables.append(dict(
+                {
+                    'name': name,
+                    'path': table['path'],
+                    'parent': table['parent'],
+                    'key': '_id',
+                    'parent_key': '_parent_id' if table['parent'] else None,
+                    'columns': list(table['writer'].columns),
+                    'total_rows': table_result['total_rows']
+                },
+                **{key: table_result[key] for key in per_table_keys}
+            ))
+
+        excel_sheets = excel_workbook_layout([(table['name'], table['total_rows']) for table in tables])
+        manifest = {
+            'layout': 'relational',
+            'tables': [
+                dict(
+                    {key: value for key, value in table.items() if key not in per_table_keys},
+                    files={
+                        key[:-len('_path')]: os.path.basename(table[key]) for key in per_table_keys
+                    }
+                )
+                for table in tables
+            ],
+            'workbook': {
+                'file': os.path.basename(result['excel_path']),
+                'sheets': excel_sheets
+            }
+        }
+        with open(self.manifest_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+
+        result['layout'] = 'relational'
+        result['manifest_path'] = self.manifest_path
+        result['excel_sheets'] = excel_sheets
+        result['tables'] = [
+            dict(
+                {key: value for key, value in table.items() if key != 'columns'},
+                total_columns=len(table['columns'])
+            )
+            for table in tables
+        ]
+        return result
+
+    def cleanup(self):
+        """
+        Remove the temporary spill files of every table
+        """
+        for table in self.tables.values():
+            table['writer'].cleanup()
+
+
+class ConvertedData:
+    """
+    Converted records stored once in the intermediate rows format.
+
+    Each output format is written from this data the first time it is asked
+    for and reused afterwards.
+    """
+
+    def __init__(self, data_path: str):
+        """
+        Open converted data
+
+        Args:
+            data_path (str): Path to a ``_converted.rows`` file
+
+        Raises:
+            FileNotFoundError: If the data file does not exist
+        """
+        self.data_path = data_path
+        self.base_path = data_path[:-len(DATA_SUFFIX)]
+        with open(data_path, 'r', encoding='utf-8') as data_file:
+            header = json.loads(data_file.readline())
+        self.columns: List[str] = header['columns']
+        self.total_rows: int = header['total_rows']
+        # Runs of rows laid out against other column orders, see concat
+        self.segments: Optional[List[Dict[str, Any]]] = header.get('segments')
+        self.manifest_path: Optional[str] = (
+            os.path.join(os.path.dirname(data_path), header['manifest']) if header.get('manifest') else None
+        )
+
+    @classmethod
+    def for_output(cls, output_path: str) -> Optional['ConvertedData']:
+        """
+        Find the converted data an output file is materialized from
+
+        Args:
+            output_path (str): Path of a CSV/Excel output
+
+        Returns:
+            ConvertedData: Source data, or None if the path is not an output
+                           of converted data
+        """
+        for output in OUTPUT_FORMATS.values():
+            if output_path.endswith(output['suffix']):
+                data_path = output_path[:-len(output['suffix'])] + DATA_SUFFIX
+                if os.path.exists(data_path):
+                    return cls(data_path)
+        return None
+
+    @classmethod
+    def concat(cls, parts: List['ConvertedData'], columns: List[str], base_path: str) -> Dict[str, Any]:
+        """
+        Join partial converted data, in order, into one converted data file
+
+        Rows are copied as they are. Parts whose columns are not a prefix of
+        ``columns`` are recorded as segments with their own column mapping,
+        which is applied when the rows are read.
+
+        Args:
+            parts (list): Partial converted data in record order
+            columns (list): Column names of the joined data, a superset of
+                            every part's columns
+            base_path (str): Output path without extension
+
+        Returns:
+            dict: Result as from RecordWriter.close
+        """
+        total_rows = sum(part.total_rows for part in parts)
+        header = {'columns': columns, 'total_rows': total_rows}
+        index = {column: position for position, column in enumerate(columns)}
+        segments = [
+            {
+                'rows': part.total_rows,
+                'columns': None if columns[:len(part.columns)] == part.columns
+                else [index[column] for column in part.columns]
+            }
+            for part in parts
+        ]
+        if any(segment['columns'] for segment in segments):
+            header['segments'] = segments
+
+        result = converted_result(base_path, total_rows, len(columns))
+        with open(result['data_path'], 'w', encoding='utf-8') as data_file:
+            data_file.write(json.dumps(header))
+            data_file.write('\n')
+            for part in parts:
+                with open(part.data_path, 'r', encoding='utf-8') as part_file:
+                    part_file.readline()
+                    shutil.copyfileobj(part_file, data_file)
+        return result
+
+    @staticmethod
+    def format_for(output_path: str) -> Optional[str]:
+        for fmt, output in OUTPUT_FORMATS.items():
+            if output_path.endswith(output['suffix']):
+                return fmt
+        return None
+
+    def output_path(self, fmt: str) -> str:
+        return f"{self.base_path}{OUTPUT_FORMATS[fmt]['suffix']}"
+
+    def tables(self) -> List[Tuple[Optional[str], 'ConvertedData']]:
+        """
+        Tables stored with this data
+
+        Returns:
+            list: ``(table name, data)`` pairs, the root table first; a single
+                  unnamed table unless the data has the relational layout
+        """
+        if self.manifest_path is None:
+            return [(None, self)]
+
+        with open(self.manifest_path, 'r', encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+        directory = os.path.dirname(self.data_path)
+        return [
+            (table['name'], self if table['parent'] is None
+             else ConvertedData(os.path.join(directory, table['files']['data'])))
+            for table in manifest['tables']
+        ]
+
+    def output_paths(self, fmt: str) -> List[str]:
+        """
+        Files an output format is written to, one per table unless the
+        format holds every table in one file
+
+        Args:
+            fmt (str): Output format name
+
+        Returns:
+            list: Output paths, the root table's first
+        """
+        if OUTPUT_FORMATS[fmt].get('all_tables'):
+            return [self.output_path(fmt)]
+        return [data.output_path(fmt) for _, data in self.tables()]
+
+    def available_formats(self) -> List[str]:
+        """
+        Formats that have already been materialized
+
+        Returns:
+            list: Format names
+        """
+        return [fmt for fmt in OUTPUT_FORMATS if os.path.exists(self.output_path(fmt))]
+
+    def materialize(self, fmt: str, settings: Dict[str, Any] = None) -> str:
+        """
+        Write an output format unless it already exists
+
+        The output is written to a temporary file and moved into place, so
+        concurrent requests never see a partial file. For the relational
+        layout the child tables' files are written as well.
+
+        Args:
+            fmt (str): Output format name
+            settings (dict, optional): Writer settings overriding OUTPUT_SETTINGS
+
+        Returns:
+            str: Path of the root table's output file
+
+        Raises:
+            ValueError: If the format is unknown
+        """
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {fmt}")
+
+        if OUTPUT_FORMATS[fmt].get('all_tables'):
+            return self._materialize_file(fmt, settings)
+
+        for _, data in self.tables():
+            data._materialize_file(fmt, settings)
+        return self.output_path(fmt)
+
+    def _materialize_file(self, fmt: str, settings: Dict[str, Any] = None) -> str:
+        output_path = self.output_path(fmt)
+        if os.path.exists(output_path):
+            return output_path
+
+        directory, filename = os.path.split(output_path)
+        fd, temp_path = tempfile.mkstemp(dir=directory or None, prefix=f".{filename}.")
+        os.close(fd)
+        try:
+            writer = getattr(self, OUTPUT_FORMATS[fmt]['writer'])
+            writer(temp_path, dict(OUTPUT_SETTINGS, **(settings or {})))
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return output_path
+
+    def rows(self):
+        """
+        Iterate over rows padded to the full column width
+
+        Yields:
+            list: Cell values in column order
+        """
+        width = len(self.columns)
+        with open(self.data_path, 'r', encoding='utf-8') as data_file:
+            data_file.readline()
+            if self.segments is None:
+                for line in data_file:
+                    row: List[Any] = json.loads(line)
+                    if len(row) < width:
+                        row.extend([None] * (width - len(row)))
+                    yield row
+                return
+
+            for segment in self.segments:
+                mapping = segment['columns']
+                for _ in range(segment['rows']):
+                    row = json.loads(data_file.readline())
+                    if mapping is not None:
+                        aligned = [None] * width
+                        for position, value in enumerate(row):
+                            aligned[mapping[position]] = value
+                        row = aligned
+                    elif len(row) < width:
+                        row.extend([None] * (width - len(row)))
+                    yield row
+
+    def frames(self, batch_rows: int, first_rows: int = None):
+        """
+        Iterate over the rows in batches, as DataFrames of object columns
+
+        Args:
+            batch_rows (int): Rows per batch
+            first_rows (int, optional): Rows of the first batch, if different
+
+        Yields:
+            pd.DataFrame: Rows of a batch, columns numbered in order
+        """
+        import pandas as pd
+
+        rows = self.rows()
+        size = first_rows or batch_rows
+        while True:
+            batch = list(itertools.islice(rows, size))
+            if not batch:
+                return
+            yield pd.DataFrame(batch, columns=range(len(self.columns)), dtype=object)
+            size = batch_rows
+
+    def column_types(self, settings: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Compact column types of the data, inferred on first use and stored
+        next to it (see ColumnTypeInference)
+
+        Args:
+            settings (dict, optional): Settings overriding OUTPUT_SETTINGS
+
+        Returns:
+            dict: ``types``, one ``{'dtype': ...}`` entry per column, and the
+                  estimated ``memory`` of the data as objects and typed
+        """
+        types_path = f"{self.base_path}{TYPES_SUFFIX}"
+        if os.path.exists(types_path):
+            with open(types_path, 'r', encoding='utf-8') as types_file:
+                return json.load(types_file)
+
+        from app.services.column_types import ColumnTypeInference
+
+        settings = dict(OUTPUT_SETTINGS, **(settings or {}))
+        inference = ColumnTypeInference(len(self.columns), settings['category_max_distinct'])
+        for frame in self.frames(settings['type_batch_rows'], settings['type_sample_rows']):
+            inference.update(frame)
+        column_types = inference.result()
+
+        directory, filename = os.path.split(types_path)
+        fd, temp_path = tempfile.mkstemp(dir=directory or None, prefix=f".{filename}.")
+        with os.fdopen(fd, 'w', encoding='utf-8') as types_file:
+            json.dump(column_types, types_file)
+        os.replace(temp_path, types_path)
+        return column_types
+
+    def typed_frames(self, batch_rows: int, settings: Dict[str, Any] = None):
+        """
+        Iterate over the rows in batches with values cast to the column types
+
+        Args:
+            batch_rows (int): Rows per batch
+            settings (dict, optional): Settings overriding OUTPUT_SETTINGS
+
+        Yields:
+            list: Typed pd.Series per column, one list per batch
+        """
+        from app.services.column_types import cast_column
+
+        types = self.column_types(settings)['types']
+        for frame in self.frames(batch_rows):
+            yield [cast_column(frame.iloc[:, index], column_type) for index, column_type in enumerate(types)]
+
+    def typed_rows(self, settings: Dict[str, Any] = None):
+        """
+        Iterate over rows with values cast to the column types
+
+        Args:
+            settings (dict, optional): Settings overriding OUTPUT_SETTINGS
+
+        Yields:
+            list: Cell values as Python objects in column order
+        """
+        from app.services.column_types import python_values
+
+        batch_rows = dict(OUTPUT_SETTINGS, **(settings or {}))['type_batch_rows']
+        if not self.columns:
+            yield from ([] for _ in range(self.total_rows))
+            return
+        for columns in self.typed_frames(batch_rows, settings):
+            yield from (list(row) for row in zip(*(python_values(values) for values in columns)))
+
+    def _write_csv(self, path: str, settings: Dict[str, Any]):
+        with open(path, 'w', encoding='utf-8', newline='') as csv_file:
+            self._write_csv_rows(csv_file)
+
+    def _write_csv_gz(self, path: str, settings: Dict[str, Any]):
+        with gzip.open(path, 'wb', compresslevel=settings['csv_gzip_level']) as compressed:
+            self._write_compressed_csv(compressed)
+
+    def _write_csv_zst(self, path: str, settings: Dict[str, Any]):
+        pa = self._import_pyarrow()
+        with pa.CompressedOutputStream(path, 'zstd') as compressed:
+            self._write_compressed_csv(compressed)
+
+    def _write_compressed_csv(self, compressed):
+        # Compressing a CSV already written is much cheaper than rendering
+        # the rows again, and gives the same bytes
+        csv_path = self.output_path('csv')
+        if os.path.exists(csv_path):
+            with open(csv_path, 'rb') as csv_file:
+                shutil.copyfileobj(csv_file, compressed, 1024 * 1024)
+            return
+
+        csv_file = io.TextIOWrapper(compressed, encoding='utf-8', newline='')
+        self._write_csv_rows(csv_file)
+        csv_file.flush()
+        csv_file.detach()
+
+    def _write_csv_rows(self, csv_file):
+        csv_writer = csv.writer(csv_file, lineterminator=CSV_LINE_TERMINATOR)
+        csv_writer.writerow(self.columns)
+        csv_writer.writerows(self.rows())
+
+    def _write_xlsx(self, path: str, settings: Dict[str, Any]):
+        from openpyxl import Workbook
+
+        # Write-only worksheets stream rows to disk, so memory stays flat;
+        # a new sheet is started whenever the row limit is reached, and each
+        # table of the relational layout gets sheets of its own
+        tables = self.tables()
+        if tables[0][0] is None:
+            sheets = excel_sheet_layout(self.total_rows)
+        else:
+            sheets = excel_workbook_layout([(name, data.total_rows) for name, data in tables])
+        sources = dict(tables)
+
+        workbook = Workbook(write_only=True)
+        data = rows = None
+        for layout in sheets:
+            if sources[layout.get('table')] is not data:
+                data = sources[layout.get('table')]
+                rows = data.typed_rows(settings)
+            sheet = workbook.create_sheet(title=layout['name'])
+            sheet.append(data.columns)
+            for _ in range(layout['rows']):
+                sheet.append(next(rows))
+        workbook.save(path)
+
+    def _write_parquet(self, path: str, settings: Dict[str, Any]):
+        pa = self._import_pyarrow()
+        import pyarrow.parquet as pq
+
+        schema = self._arrow_schema(pa, settings)
+        batch_size = settings['parquet_row_group_size']
+        with pq.ParquetWriter(path, schema, compression=settings['parquet_compression']) as writer:
+            # One batch per row group keeps memory bounded by the row group size
+            for batch in self._arrow_batches(pa, schema, batch_size, settings):
+                writer.write_table(pa.Table.from_batches([batch]), row_group_size=batch_size)
+
+    def _write_feather(self, path: str, settings: Dict[str, Any]):
+        pa = self._import_pyarrow()
+
+        schema = self._arrow_schema(pa, settings)
+        options = pa.ipc.IpcWriteOptions(compression=settings['feather_compression'])
+        with pa.ipc.new_file(path, schema, options=options) as writer:
+            for batch in self._arrow_batches(pa, schema, settings['parquet_row_group_size'], settings):
+                writer.write_batch(batch)
+
+    @staticmethod
+    def _import_pyarrow():
+        try:
+            import pyarrow
+        except ImportError:
+            raise ValueError("Parquet, Feather and zstd output require the pyarrow package")
+        return pyarrow
+
+    def _arrow_schema(self, pa, settings: Dict[str, Any]):
+        # Low-cardinality strings are dictionary encoded, like categoricals
+        fields = []
+        for column, column_type in zip(self.columns, self.column_types(settings)['types']):
+            dtype = column_type['dtype']
+            if dtype == 'category':
+                categories = len(column_type['categories'])
+                index_type = pa.int8() if categories < 128 else pa.int16() if categories < 32768 else pa.int32()
+                arrow_type = pa.dictionary(index_type, pa.string())
+            elif dtype == 'datetime':
+                arrow_type = pa.timestamp('us')
+            elif dtype == 'boolean':
+                arrow_type = pa.bool_()
+            else:
+                arrow_type = getattr(pa, dtype)()
+            fields.append(pa.field(column, arrow_type))
+        return pa.schema(fields)
+
+    def _arrow_batches(self, pa, schema, batch_size: int, settings: Dict[str, Any]):
+        for columns in self.typed_frames(batch_size, settings):
+            yield pa.RecordBatch.from_arrays([
+                pa.array(values, type=field.type, from_pandas=True, safe=False)
+                for values, field in zip(columns, schema)
+            ], schema=schema)
+        if self.total_rows == 0:
+            yield pa.RecordBatch.from_arrays([pa.array([], type=field.type) for field in schema], schema=schema)
@@ -0,0 +1,220 @@
+import json
+import time
+import sqlite3
+import hashlib
+from typing import Dict, Any, Optional, List
+from app.services.sqlite_store import SQLiteStore
+
+class SchemaRegistry(SQLiteStore):
+    """
+    Conversion plans of the document layouts seen so far.
+
+    A layout is identified by a fingerprint of its structure, taken from the
+    first records of a document: the file type, the element holding the
+    records and the columns those records flatten to, not their values. For
+    each layout the registry keeps what conversions learned about it: the
+    record element, every column in the order conversions found them and
+    the column types inferred for typed outputs. Conversions of a known XML
+    layout use the registered record element instead of scanning for it.
+
+    Layouts are evicted least recently used first beyond the configured
+    count; pinned layouts are kept.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = None):
+        """
+        Initialize SchemaRegistry and create its tables if needed
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            max_entries (int, optional): Unpinned layouts kept, 0 or None for no limit
+        """
+        self.max_entries = max_entries
+        super().__init__(db_path)
+
+    def _create_schema(self, conn):
+        conn.execute(
+            '''CREATE TABLE IF NOT EXISTS schemas (
+                fingerprint TEXT PRIMARY KEY,
+                file_type TEXT NOT NULL,
+                record_path TEXT,
+                columns TEXT NOT NULL,
+                types TEXT,
+                pinned INTEGER NOT NULL DEFAULT 0,
+                conversions INTEGER NOT NULL DEFAULT 0,
+                hits INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )'''
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_schemas_last_used ON schemas (last_used)')
+
+    @staticmethod
+    def fingerprint(file_type: str, record_path: Optional[str], columns: List[str]) -> str:
+        """
+        Fingerprint of a document layout
+
+        Args:
+            file_type (str): Data type extension, e.g. ``xml``
+            record_path (str): Element holding the records
+            columns (list): Columns of the document's first records
+
+        Returns:
+            str: Hex digest; the same columns in another order give the same
+                 fingerprint
+        """
+        structure = json.dumps([file_type, record_path, sorted(columns)])
+        return hashlib.sha256(structure.encode('utf-8')).hexdigest()[:32]
+
+    def get(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Registered plan of a layout
+
+        Args:
+            fingerprint (str): Layout fingerprint
+
+        Returns:
+            dict: The layout's plan, or None if it is not registered
+        """
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM schemas WHERE fingerprint = ?', (fingerprint,)).fetchone()
+        return self._entry(dict(row)) if row else None
+
+    def lookup(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Registered plan of a layout, for a conversion about to use it
+
+        Args:
+            fingerprint (str): Layout fingerprint
+
+        Returns:
+            dict: The layout's plan, or None if it is not registered
+        """
+        with self._connect() as conn:
+            updated = conn.execute(
+                'UPDATE schemas SET hits = hits + 1, last_used = ? WHERE fingerprint = ?',
+                (time.time(), fingerprint)
+            ).rowcount
+        return self.get(fingerprint) if updated else None
+
+    def record(self, fingerprint: str, file_type: str, record_path: Optional[str], columns: List[str]):
+        """
+        Register a conversion of a layout
+
+        Columns not registered yet are appended to the layout's columns.
+
+        Args:
+            fingerprint (str): Layout fingerprint
+            file_type (str): Data type extension
+            record_path (str): Element holding the records
+            columns (list): Columns of the converted data, in order
+        """
+        now = time.time()
+        with self._connect() as conn:
+            # Inserted before the columns are read, so the write lock is held
+            # and conversions of the same layout in other processes wait
+            created = conn.execute(
+                'INSERT OR IGNORE INTO schemas (fingerprint, file_type, record_path, columns, conversions, '
+                'created_at, last_used) VALUES (?, ?, ?, ?, 0, ?, ?)',
+                (fingerprint, file_type, record_path, json.dumps([]), now, now)
+            ).rowcount
+            registered = json.loads(conn.execute(
+                'SELECT columns FROM schemas WHERE fingerprint = ?', (fingerprint,)
+            ).fetchone()[0])
+            known = set(registered)
+            registered.extend(column for column in columns if column not in known)
+            conn.execute(
+                'UPDATE schemas SET record_path = ?, columns = ?, conversions = conversions + 1, '
+                'last_used = ? WHERE fingerprint = ?',
+                (record_path, json.dumps(registered), now, fingerprint)
+            )
+            if created:
+                self._trim(conn)
+
+    def record_types(self, fingerprint: str, types: Dict[str, Dict[str, Any]]):
+        """
+        Register the column types inferred for a conversion of a layout
+
+        Args:
+            fingerprint (str): Layout fingerprint
+            types (dict): Column name to ``{'dtype': ...}``, as inferred for
+                          typed outputs; replaces the registered type of
+                          each column it holds
+        """
+        with self._connect() as conn:
+            row = conn.execute('SELECT types FROM schemas WHERE fingerprint = ?', (fingerprint,)).fetchone()
+            if row:
+                registered = json.loads(row[0]) if row[0] else {}
+                registered.update(types)
+                conn.execute(
+                    'UPDATE schemas SET types = ? WHERE fingerprint = ?', (json.dumps(registered), fingerprint)
+                )
+
+    def list_schemas(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Registered layouts, most recently used first
+
+        Args:
+            limit (int, optional): Most layouts to return
+
+        Returns:
+            list: Plans of the layouts, without their column types
+        """
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                'SELECT fingerprint, file_type, record_path, columns, pinned, conversions, hits, '
+                'created_at, last_used FROM schemas ORDER BY last_used DESC LIMIT ?',
+                (limit,)
+            ).fetchall()
+        return [self._entry(dict(row)) for row in rows]
+
+    def pin(self, fingerprint: str, pinned: bool = True) -> bool:
+        """
+        Keep a layout from being evicted, or let it be evicted again
+
+        Args:
+            fingerprint (str): Layout fingerprint
+            pinned (bool, optional): False to unpin
+
+        Returns:
+            bool: True if the layout is registered
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                'UPDATE schemas SET pinned = ? WHERE fingerprint = ?', (int(pinned), fingerprint)
+            ).rowcount > 0
+
+    def evict(self, fingerprint: str = None) -> int:
+        """
+        Forget a layout, pinned or not, or every unpinned layout
+
+        Args:
+            fingerprint (str, optional): Layout to forget; all unpinned
+                                         layouts if None
+
+        Returns:
+            int: Number of layouts evicted
+        """
+        with self._connect() as conn:
+            if fingerprint is None:
+                return conn.execute('DELETE FROM schemas WHERE pinned = 0').rowcount
+            return conn.execute('DELETE FROM schemas WHERE fingerprint = ?', (fingerprint,)).rowcount
+
+    def _trim(self, conn):
+        if not self.max_entries:
+            return
+        conn.execute(
+            'DELETE FROM schemas WHERE fingerprint IN ('
+            'SELECT fingerprint FROM schemas WHERE pinned = 0 ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    @staticmethod
+    def _entry(row: Dict[str, Any]) -> Dict[str, Any]:
+        row['columns'] = json.loads(row['columns'])
+        if 'types' in row:
+            row['types'] = json.loads(row['types']) if row['types'] else None
+        row['pinned'] = bool(row['pinned'])
+        return row
@@ -0,0 +1,37 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+class SQLiteStore:
+    """
+    Base class for small SQLite-backed stores shared between processes.
+
+    Every operation opens its own short-lived connection, so a store can be
+    used from the web process and from pool worker processes alike.
+    Subclasses create their tables in ``_create_schema``.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the store and create its schema if needed
+
+        Args:
+            db_path (str): Path to the SQLite database file
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._create_schema(conn)
+
+    def _create_schema(self, conn):
+        raise NotImplementedError
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
@@ -0,0 +1,394 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Dict, Any, Optional
+from flask import current_app
+from werkzeug.exceptions import ClientDisconnected
+from werkzeug.utils import secure_filename
+from app.services.data_converter import DataConverterService
+from app.services.sqlite_store import SQLiteStore
+
+# Suffix of an upload's file until it is finalized
+PART_SUFFIX = '.part'
+
+class UploadOffsetError(ValueError):
+    """
+    A chunk does not start where the upload currently ends
+    """
+
+    def __init__(self, offset: int):
+        super().__init__(f"Chunk must start at offset {offset}")
+        self.offset = offset
+
+
+class UploadStore(SQLiteStore):
+    """
+    SQLite-backed state of resumable uploads, shared by all web processes
+    """
+
+    def _create_schema(self, conn):
+        conn.execute(
+            '''CREATE TABLE IF NOT EXISTS uploads (
+                upload_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                original_filename TEXT NOT NULL,
+                saved_filename TEXT NOT NULL,
+                filepath TEXT NOT NULL,
+                file_extension TEXT NOT NULL,
+                total_size INTEGER,
+                received_bytes INTEGER NOT NULL DEFAULT 0,
+                write_seconds REAL NOT NULL DEFAULT 0,
+                options TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )'''
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_uploads_updated_at ON uploads (updated_at)')
+
+    def create(self, upload: Dict[str, Any]):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO uploads (upload_id, user_id, original_filename, saved_filename, filepath, '
+                'file_extension, total_size, options, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (upload['upload_id'], upload['user_id'], upload['original_filename'], upload['saved_filename'],
+                 upload['filepath'], upload['file_extension'], upload['total_size'],
+                 json.dumps(upload['options']), now, now)
+            )
+
+    def get(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM uploads WHERE upload_id = ?', (upload_id,)).fetchone()
+        if row is None:
+            return None
+        upload = dict(row)
+        upload['options'] = json.loads(upload['options']) if upload['options'] else None
+        return upload
+
+    def advance(self, upload_id: str, offset: int, new_offset: int, seconds: float) -> bool:
+        """
+        Move the received offset forward if no other request did first
+
+        Returns:
+            bool: True if the offset was still ``offset`` and was advanced
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'UPDATE uploads SET received_bytes = ?, write_seconds = write_seconds + ?, updated_at = ? '
+                'WHERE upload_id = ? AND received_bytes = ?',
+                (new_offset, seconds, time.time(), upload_id, offset)
+            )
+            return cursor.rowcount == 1
+
+    def delete(self, upload_id: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute('DELETE FROM uploads WHERE upload_id = ?', (upload_id,)).rowcount == 1
+
+    def expired(self, max_age: float):
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(
+                'SELECT upload_id, filepath FROM uploads WHERE updated_at < ?', (time.time() - max_age,)
+            ).fetchall()]
+
+
+class UploadService:
+    """
+    Resumable uploads: a session is opened, the file arrives in chunks
+    addressed by byte offset, and finalizing it hands the file to the
+    conversion jobs.
+
+    Each chunk is streamed to the upload's part file and into a running
+    SHA-256, so finalizing neither copies nor re-reads the file. The hash
+    state lives in the process that received the previous chunk; a chunk
+    landing on another process, e.g. after a restart, rebuilds it from the
+    bytes already on disk.
+    """
+
+    def __init__(self, converter_service: DataConverterService = None):
+        self.converter_service = converter_service or DataConverterService()
+        self.logger = logging.getLogger(__name__)
+        self._store = None
+        self._hashers = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @property
+    def store(self) -> UploadStore:
+        if self._store is None:
+            self._store = UploadStore(current_app.config['UPLOAD_DATABASE'])
+        return self._store
+
+    def create(self, user_id: str, filename: str, total_size: int = None,
+               options: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Open an upload session
+
+        Args:
+            user_id (str): Identity of the uploading user
+            filename (str): Name of the file being uploaded
+            total_size (int, optional): Size of the whole file, checked on
+                                        every chunk and on finalize
+            options (dict, optional): Converter options for the job started
+                                      on finalize
+
+        Returns:
+            dict: Upload session details
+
+        Raises:
+            ValueError: If the filename or size is invalid, or the size is
+                        over the user's quota
+        """
+        file_handler = self.converter_service.file_handler
+        original_filename = secure_filename(filename or '')
+        if not file_handler.allowed_file(original_filename):
+            raise ValueError(f"File type not allowed: {original_filename}")
+        if total_size is not None and (not isinstance(total_size, int) or total_size < 0):
+            raise ValueError('Upload size must be a non-negative integer')
+        if total_size and self.converter_service.artifacts:
+            self.converter_service.artifacts.check_quota(user_id, total_size)
+
+        self._expire_sessions()
+
+        saved_filename = file_handler.generate_unique_filename(original_filename)
+        file_extension = file_handler.split_extension(saved_filename)[0]
+        upload = {
+            'upload_id': uuid.uuid4().hex,
+            'user_id': user_id,
+            'original_filename': original_filename,
+            'saved_filename': saved_filename,
+            'filepath': file_handler.shard_path(saved_filename),
+            'file_extension': file_extension,
+            'total_size': total_size,
+            'options': options or {}
+        }
+        open(upload['filepath'] + PART_SUFFIX, 'wb').close()
+        self.store.create(upload)
+        self._hashers[upload['upload_id']] = (0, hashlib.sha256())
+        return self.store.get(upload['upload_id'])
+
+    def get(self, upload_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch an upload session owned by the given user
+
+        Args:
+            upload_id (str): Upload to fetch
+            user_id (str): Identity of the requesting user
+
+        Returns:
+            dict: Upload session details, or None if not found or owned by
+                  another user
+        """
+        upload = self.store.get(upload_id)
+        if not upload or upload['user_id'] != user_id:
+            return None
+        return upload
+
+    def write_chunk(self, upload_id: str, user_id: str, offset: int, stream,
+                    length: int = None) -> Optional[Dict[str, Any]]:
+        """
+        Append a chunk at the given offset
+
+        A chunk is applied whole or not at all: if the client disconnects,
+        sends fewer bytes than announced or the write fails, the file is cut
+        back to the offset and the chunk can be sent again. Without a
+        declared upload size, each chunk is checked against the user's quota.
+
+        Args:
+            upload_id (str): Upload to append to
+            user_id (str): Identity of the requesting user
+            offset (int): Byte offset the chunk starts at
+            stream: Readable binary stream of the chunk's bytes
+            length (int, optional): Announced chunk size, e.g. Content-Length
+
+        Returns:
+            dict: Updated upload session details, or None if not found
+
+        Raises:
+            UploadOffsetError: If the offset is not where the upload ends
+            ValueError: If the chunk is incomplete, exceeds the upload size or
+                        the user's quota
+        """
+        with self._upload_lock(upload_id):
+            upload = self.get(upload_id, user_id)
+            if upload is None:
+                return None
+            if offset != upload['received_bytes']:
+                raise UploadOffsetError(upload['received_bytes'])
+
+            hasher = self._hasher(upload)
+            part_path = upload['filepath'] + PART_SUFFIX
+            limit = upload['total_size']
+            artifacts = self.converter_service.artifacts if limit is None else None
+            if artifacts and length is not None:
+                artifacts.check_quota(user_id, offset + length)
+            chunk_size = self.converter_service.file_handler.CHUNK_SIZE
+            written = 0
+            started = time.perf_counter()
+            with open(part_path, 'r+b') as destination:
+                destination.seek(offset)
+                destination.truncate()
+                try:
+                    while True:
+                        chunk = stream.read(chunk_size)
+                        if not chunk:
+                            break
+                        if limit is not None and offset + written + len(chunk) > limit:
+                            raise ValueError(f"Chunk exceeds the upload size of {limit} bytes")
+                        destination.write(chunk)
+                        hasher.update(chunk)
+                        written += len(chunk)
+                    if length is not None and written != length:
+                        raise ValueError(f"Chunk incomplete: received {written} of {length} bytes")
+                    if artifacts:
+                        # The size was not declared up front, the quota holds the upload
+                        artifacts.check_quota(user_id, offset + written)
+                except ClientDisconnected:
+                    destination.truncate(offset)
+                    raise ValueError(f"Chunk incomplete: connection lost after {written} bytes")
+                except BaseException:
+                    # Any failure, e.g. a full disk, leaves the upload as it was;
+                    # the running hash is a copy and is dropped with the chunk
+                    destination.truncate(offset)
+                    raise
+
+            if not self.store.advance(upload_id, offset, offset + written, time.perf_counter() - started):
+                raise UploadOffsetError(self.store.get(upload_id)['received_bytes'])
+            self._hashers[upload_id] = (offset + written, hasher)
+            return self.store.get(upload_id)
+
+    def finalize(self, upload_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Complete an upload and move it into place for conversion
+
+        Args:
+            upload_id (str): Upload to complete
+            user_id (str): Identity of the requesting user
+
+        Returns:
+            dict: File details as returned by FileHandler.save_file, or None
+                  if not found
+
+        Raises:
+            ValueError: If fewer bytes than the announced size arrived, or
+                        the file is over the user's quota
+        """
+        with self._upload_lock(upload_id):
+            upload = self.get(upload_id, user_id)
+            if upload is None:
+                return None
+            received = upload['received_bytes']
+            if upload['total_size'] is not None and received != upload['total_size']:
+                raise ValueError(f"Upload incomplete: received {received} of {upload['total_size']} bytes")
+
+            content_hash = self._hasher(upload).hexdigest()
+            os.replace(upload['filepath'] + PART_SUFFIX, upload['filepath'])
+            self.store.delete(upload_id)
+            self._forget(upload_id)
+
+        file_info = {
+            'original_filename': upload['original_filename'],
+            'saved_filename': upload['saved_filename'],
+            'filepath': upload['filepath'],
+            'file_extension': upload['file_extension'],
+            'compression': self.converter_service.file_handler.split_extension(upload['filepath'])[1],
+            'file_size': received,
+            'content_hash': content_hash
+        }
+        self.converter_service.record_save(file_info, upload['write_seconds'])
+        self.converter_service.register_upload(file_info, user_id)
+        return file_info
+
+    def preview(self, upload_id: str, user_id: str, limit: int = None) -> Optional[Dict[str, Any]]:
+        """
+        Preview the first records of an upload from the bytes received so
+        far, so it can be checked before it is finalized
+
+        Args:
+            upload_id (str): Upload to preview
+            user_id (str): Identity of the requesting user
+            limit (int, optional): Records to return
+
+        Returns:
+            dict: Preview as returned by DataConverterService.preview, or None
+                  if not found
+
+        Raises:
+            ValueError: If no record could be parsed
+        """
+        with self._upload_lock(upload_id):
+            upload = self.get(upload_id, user_id)
+            if upload is None:
+                return None
+            with open(upload['filepath'] + PART_SUFFIX, 'rb') as f:
+                compression = self.converter_service.file_handler.split_extension(upload['filepath'])[1]
+                return self.converter_service.preview(f, upload['file_extension'], limit, compression)
+
+    def abort(self, upload_id: str, user_id: str) -> bool:
+        """
+        Cancel an upload and remove its partial file
+
+        Args:
+            upload_id (str): Upload to cancel
+            user_id (str): Identity of the requesting user
+
+        Returns:
+            bool: False if the upload was not found
+        """
+        with self._upload_lock(upload_id):
+            upload = self.get(upload_id, user_id)
+            if upload is None:
+                return False
+            self._remove(upload)
+            return True
+
+    def _hasher(self, upload):
+        # Copied, so a failed chunk leaves the running hash untouched
+        offset = upload['received_bytes']
+        entry = self._hashers.get(upload['upload_id'])
+        if entry and entry[0] == offset:
+            return entry[1].copy()
+
+        hasher = hashlib.sha256()
+        with open(upload['filepath'] + PART_SUFFIX, 'rb') as f:
+            remaining = offset
+            while remaining:
+                chunk = f.read(min(remaining, self.converter_service.file_handler.CHUNK_SIZE))
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                remaining -= len(chunk)
+        return hasher
+
+    def _upload_lock(self, upload_id):
+        with self._lock:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def _forget(self, upload_id):
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+            self._locks.pop(upload_id, None)
+
+    def _remove(self, upload):
+        self.store.delete(upload['upload_id'])
+        self._forget(upload['upload_id'])
+        part_path = upload['filepath'] + PART_SUFFIX
+        try:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        except OSError as e:
+            self.logger.error(f"Error removing abandoned upload {part_path}: {str(e)}")
+
+    def _expire_sessions(self):
+        max_age = current_app.config.get('UPLOAD_SESSION_MAX_AGE')
+        if not max_age:
+            return
+        for upload in self.store.expired(max_age):
+            self._remove(upload)
@@ -12,7 +12,7 @@ document.addEventListener('DOMContentLoaded', () => {
     // Display conversion details
     if (conversionResult.original_file) {
         const { original_filename, file_size } = conversionResult.original_file;
-        const { total_rows, total_columns } = conversionResult.conversion_result || {};
+        const { total_rows, total_columns, excel_sheets, tables } = conversionResult.conversion_result || {};
         
         const fileSizeKB = Math.round(file_size / 1024);
         
@@ -22,6 +22,18 @@ document.addEventListener('DOMContentLoaded', () => {
             Rows: <strong>${total_rows || 'N/A'}</strong><br>
             Columns: <strong>${total_columns || 'N/A'}</strong>
         `;
+        
+        // Excel output is split across sheets above the worksheet row limit
+        if (excel_sheets && excel_sheets.length > 1) {
+            const sheets = excel_sheets.map(sheet => `${sheet.name}: ${sheet.rows}`).join(', ');
+            conversionDetails.innerHTML += `<br>Excel sheets: <strong>${sheets}</strong>`;
+        }
+        
+        // Relational layout: nested lists were written to child tables
+        if (tables && tables.length > 1) {
+            const childTables = tables.slice(1).map(table => `${table.name}: ${table.total_rows}`).join(', ');
+            conversionDetails.innerHTML += `<br>Child tables: <strong>${childTables}</strong>`;
+        }
     }
     
     // Set up download buttons
@@ -5,8 +5,19 @@ document.addEventListener('DOMContentLoaded', () => {
     const filePreview = document.getElementById('filePreview');
     const previewTable = document.getElementById('previewTable');
     const convertBtn = document.getElementById('convertBtn');
+    const layoutSelect = document.getElementById('layoutSelect');
     const logoutBtn = document.getElementById('logoutBtn');
 
+    // Files above this size are sent in resumable chunks
+    const CHUNKED_UPLOAD_THRESHOLD = 64 * 1024 * 1024;
+    const CHUNK_RETRIES = 5;
+
+    // Head of the file sent for a preview, grown up to the maximum when no
+    // whole record fits in it
+    const PREVIEW_BYTES = 1024 * 1024;
+    const PREVIEW_MAX_BYTES = 16 * 1024 * 1024;
+    const PREVIEW_RECORDS = 3;
+
     // Add event listener for the browse files button
     browseFiles.addEventListener('click', () => {
         fileInput.click();
@@ -65,79 +76,59 @@ document.addEventListener('DOMContentLoaded', () => {
     function handleFiles(files) {
         if (files.length > 0) {
             const file = files[0];
-            if (['application/json', 'text/xml', 'application/xml'].includes(file.type)) {
+            if (isArchive(file)) {
+                // The member list sits at the end of a zip, its head cannot be previewed
+                renderPreview([]);
+            } else if (['application/json', 'text/xml', 'application/xml'].includes(file.type) || isJsonLines(file)
+                       || isCompressed(file)) {
                 previewFile(file);
             } else {
-                alert('Please upload a JSON or XML file');
+                alert('Please upload a JSON, JSON Lines or XML file');
             }
         }
     }
 
-    function previewFile(file) {
-        const reader = new FileReader();
-        reader.onload = (e) => {
-            const content = e.target.result;
-            try {
-                let data;
-                if (file.type.includes('json')) {
-                    data = JSON.parse(content);
-                } else {
-                    const parser = new DOMParser();
-                    const xmlDoc = parser.parseFromString(content, "text/xml");
-                    data = xmlToJson(xmlDoc);
-                }
+    function isJsonLines(file) {
+        return /\.(jsonl|ndjson)$/i.test(file.name);
+    }
 
-                // Limit to 10 records
-                const limitedData = Array.isArray(data) ? data.slice(0, 3) : [data];
-                renderPreview(limitedData);
-            } catch (error) {
-                console.error('Preview error:', error);
-                alert('Error parsing file');
-            }
-        };
-        reader.readAsText(file);
+    function isCompressed(file) {
+        return /\.(json|jsonl|ndjson|xml)\.(gz|zst)$/i.test(file.name);
     }
 
-    function xmlToJson(xml) {
-        // Get the root element name
-        const rootName = xml.documentElement.nodeName;
-        
-        // Find repeated elements that form a collection
-        const childElements = Array.from(xml.documentElement.children);
-        
-        // Check if we have repeating elements (like CTR elements in your file)
-        if (childElements.length > 0) {
-            const firstChildName = childElements[0].nodeName;
-            
-            // If we have multiple elements with the same name, treat as collection
-            if (childElements.filter(el => el.nodeName === firstChildName).length > 1) {
-                return childElements.map(item => {
-                    const obj = {};
-                    // Extract all child elements of the item
-                    Array.from(item.children).forEach(child => {
-                        obj[child.nodeName] = child.textContent;
-                        
-                        // Handle attributes if they exist
-                        if (child.attributes.length > 0) {
-                            for (let i = 0; i < child.attributes.length; i++) {
-                                const attr = child.attributes[i];
-                                obj[`${child.nodeName}_${attr.name}`] = attr.value;
-                            }
-                        }
-                    });
-                    return obj;
-                });
+    function isArchive(file) {
+        return /\.zip$/i.test(file.name);
+    }
+
+    // Only the head of the file is sent, the server stops after the first records
+    function previewFile(file, bytes = PREVIEW_BYTES) {
+        const formData = new FormData();
+        formData.append('file', file.slice(0, bytes), file.name);
+        formData.append('limit', PREVIEW_RECORDS);
+
+        fetch('/api/converter/preview', {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${localStorage.getItem('token')}`
+            },
+            body: formData
+        })
+        .then(response => response.json().then(data => ({ ok: response.ok, data })))
+        .then(({ ok, data }) => {
+            if (!ok) {
+                if (bytes < file.size && bytes < PREVIEW_MAX_BYTES) {
+                    return previewFile(file, bytes * 4);
+                }
+                throw new Error(data.error || 'Error parsing file');
             }
-        }
-        
-        // Fallback for simpler structures
-        const obj = {};
-        for (let child of xml.documentElement.children) {
-            obj[child.nodeName] = Object.fromEntries(
-                Array.from(child.children).map(el => [el.nodeName, el.textContent])
-            );
-        }
-        return [obj];
+            renderPreview(data.rows.map(row =>
+                Object.fromEntries(data.columns.map((column, index) => [column, row[index]]))
+            ));
+        })
+        .catch(error => {
+            console.error('Preview error:', error);
+            alert('Error parsing file');
+        });
     }
 
     function renderPreview(data) {
@@ -169,7 +160,10 @@ document.addEventListener('DOMContentLoaded', () => {
             const tr = document.createElement('tr');
             headers.forEach(header => {
                 const td = document.createElement('td');
-                td.textContent = row[header] || 'N/A';
+                const value = row[header];
+                td.textContent = value === null || value === undefined || value === ''
+                    ? 'N/A'
+                    : typeof value === 'object' ? JSON.stringify(value) : value;
                 td.className = 'border p-2';
                 tr.appendChild(td);
             });
@@ -191,27 +185,16 @@ document.addEventListener('DOMContentLoaded', () => {
         convertBtn.disabled = true;
         convertBtn.innerHTML = '<i class="fas fa-spinner fa-spin mr-2"></i>Converting...';
         
-        // Create form data
-        const formData = new FormData();
-        formData.append('file', fileToUpload);
+        // Send to server for conversion, large files in resumable chunks
+        const submitted = fileToUpload.size > CHUNKED_UPLOAD_THRESHOLD
+            ? uploadInChunks(fileToUpload)
+            : uploadWhole(fileToUpload);
         
-        // Send to server for conversion
-        fetch('/api/converter/convert', {
-            method: 'POST',
-            headers: {
-                'Authorization': `Bearer ${localStorage.getItem('token')}`
-            },
-            body: formData
-        })
-        .then(response => {
-            if (!response.ok) {
-                throw new Error('Conversion failed');
-            }
-            return response.json();
-        })
-        .then(data => {
+        submitted
+        .then(data => waitForJob(data.job.job_id))
+        .then(result => {
             // Save conversion result and preview data to localStorage
-            localStorage.setItem('conversionResult', JSON.stringify(data.result));
+            localStorage.setItem('conversionResult', JSON.stringify(result));
             
             // Get preview data from the previewTable
             const previewData = extractPreviewData();
@@ -232,6 +215,103 @@ document.addEventListener('DOMContentLoaded', () => {
             convertBtn.innerHTML = 'Convert File';
         });
         
+        function uploadWhole(file) {
+            const formData = new FormData();
+            formData.append('file', file);
+            formData.append('layout', layoutSelect.value);
+            
+            return fetch('/api/converter/convert', {
+                method: 'POST',
+                headers: {
+                    'Authorization': `Bearer ${localStorage.getItem('token')}`
+                },
+                body: formData
+            })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Conversion failed');
+                }
+                return response.json();
+            });
+        }
+        
+        // Open an upload session, send the file chunk by chunk and finalize it.
+        // A dropped connection resumes from the offset the server reports.
+        async function uploadInChunks(file) {
+            const headers = {
+                'Authorization': `Bearer ${localStorage.getItem('token')}`
+            };
+            const json = async response => {
+                const body = await response.json();
+                if (!response.ok && response.status !== 409) {
+                    throw new Error(body.error || 'Upload failed');
+                }
+                return body;
+            };
+            
+            const upload = await json(await fetch('/api/converter/uploads', {
+                method: 'POST',
+                headers: { ...headers, 'Content-Type': 'application/json' },
+                body: JSON.stringify({ filename: file.name, size: file.size, layout: layoutSelect.value })
+            }));
+            const uploadUrl = `/api/converter/uploads/${upload.upload_id}`;
+            
+            // A null offset means it has to be asked from the server first
+            let offset = upload.offset;
+            let failures = 0;
+            while (offset === null || offset < file.size) {
+                try {
+                    if (offset === null) {
+                        offset = (await json(await fetch(uploadUrl, { headers }))).offset;
+                        continue;
+                    }
+                    convertBtn.innerHTML = `<i class="fas fa-spinner fa-spin mr-2"></i>Uploading... ${Math.floor(offset * 100 / file.size)}%`;
+                    const status = await json(await fetch(uploadUrl, {
+                        method: 'PUT',
+                        headers: { ...headers, 'Upload-Offset': String(offset) },
+                        body: file.slice(offset, offset + upload.chunk_size)
+                    }));
+                    offset = status.offset;
+                    failures = 0;
+                } catch (error) {
+                    // Only network failures are retried
+                    if (!(error instanceof TypeError) || ++failures > CHUNK_RETRIES) {
+                        throw error;
+                    }
+                    await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+                    offset = null;
+                }
+            }
+            
+            return json(await fetch(`${uploadUrl}/finalize`, { method: 'POST', headers }));
+        }
+        
+        // Poll the conversion job until it finishes
+        function waitForJob(jobId) {
+            return fetch(`/api/converter/jobs/${jobId}`, {
+                headers: {
+                    'Authorization': `Bearer ${localStorage.getItem('token')}`
+                }
+            })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Job status check failed');
+                }
+                return response.json();
+            })
+            .then(job => {
+                if (job.status === 'completed') {
+                    return job.result;
+                }
+                if (job.status === 'failed') {
+                    throw new Error(job.error || 'Conversion failed');
+                }
+                convertBtn.innerHTML = `<i class="fas fa-spinner fa-spin mr-2"></i>Converting... (${job.stage}, ${job.records_processed} records)`;
+                return new Promise(resolve => setTimeout(resolve, 1000))
+                    .then(() => waitForJob(jobId));
+            });
+        }
+        
         // Function to extract preview data from the table
         function extractPreviewData() {
             const table = previewTable.querySelector('table');
@@ -0,0 +1,67 @@
+"""
+Benchmark listing one user's files and looking a file up, scanning the
+upload folder against querying the artifact index.
+
+Usage:
+    python -m benchmarks.artifact_benchmark --files 100000 --users 100
+"""
+import os
+import time
+import uuid
+import shutil
+import argparse
+import tempfile
+from app.services.artifact_store import ArtifactStore
+from app.services.file_handler import FileHandler
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=20000, help='Files in the upload folder')
+    parser.add_argument('--users', type=int, default=100, help='Owners the files are spread over')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs of each operation')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        upload_folder = os.path.join(directory, 'uploads')
+        artifacts = ArtifactStore(os.path.join(directory, 'artifacts.db'))
+        scanning = FileHandler(upload_folder)
+        indexed = FileHandler(upload_folder, artifacts)
+
+        paths = {}
+        for index in range(args.files):
+            path = indexed.shard_path(f"{uuid.uuid4().hex}.xml")
+            with open(path, 'wb') as f:
+                f.write(b'<r/>')
+            paths.setdefault(f"user{index % args.users}", []).append(path)
+        for owner, owned in paths.items():
+            artifacts.register(owned, owner)
+
+        owner = 'user0'
+        path = paths[owner][len(paths[owner]) // 2]
+        for label, scan, index in (
+            # Without the index there is no owner to filter on, every file is listed
+            (f"list {owner}'s files", lambda: scanning.list_files(limit=args.files),
+             lambda: indexed.list_files(owner=owner, limit=args.files)),
+            ('look up a file', lambda: next(
+                file for file in scanning.list_files(limit=args.files) if file['filepath'] == path
+            ), lambda: artifacts.get(path))
+        ):
+            scan_seconds, _ = timed(scan, args.repeat)
+            index_seconds, _ = timed(index, args.repeat)
+            print(f"{label:<22} scan {scan_seconds * 1000:>9.1f} ms  index {index_seconds * 1000:>7.2f} ms  "
+                  f"{scan_seconds / index_seconds:>8.0f}x")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark requests/sec and SQL queries per request on the auth endpoints,
+with the identity cache on and off.
+
+Runs against a temporary SQLite database unless --database-uri points at
+a real server, where each saved query is a network round trip.
+
+Usage:
+    python -m benchmarks.auth_benchmark --requests 5000
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from sqlalchemy import event
+from app.app import create_app
+from app.config import Config
+from app.models import db
+from app.services.auth_service import AuthService
+
+USERNAME = 'Steve'
+PASSWORD = 'Admin@2025!'
+
+
+def make_app(directory, database_uri, cache_ttl):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_uri
+        CACHE_DATABASE = os.path.join(directory, 'cache.db')
+        ARTIFACT_DATABASE = os.path.join(directory, 'artifacts.db')
+        SCHEMA_DATABASE = os.path.join(directory, 'schemas.db')
+        IDENTITY_CACHE_TTL = cache_ttl
+        JWT_SECRET_KEY = 'benchmark-secret-key-of-sufficient-length'
+        AUTO_INIT_DATABASE = True
+        METRICS_ENABLED = False
+
+    # Each run starts from an empty cache with its own settings
+    AuthService._identity_cache = None
+    return create_app(BenchmarkConfig)
+
+
+def measure(client, queries, method, url, requests, **kwargs):
+    counted = len(queries)
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.open(url, method=method, **kwargs)
+        if response.status_code != 200:
+            raise SystemExit(f"{method} {url} returned {response.status_code}: {response.get_data(as_text=True)}")
+    seconds = time.perf_counter() - start
+    return requests / seconds, (len(queries) - counted) / requests
+
+
+def run(directory, database_uri, requests, login_requests):
+    for cache_ttl in (0, 60):
+        app = make_app(directory, database_uri, cache_ttl)
+        queries = []
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', lambda *args: queries.append(args[2]))
+        client = app.test_client()
+
+        login = {'json': {'username': USERNAME, 'password': PASSWORD}}
+        token = client.post('/api/auth/login', **login).json['access_token']
+        headers = {'Authorization': f"Bearer {token}"}
+
+        label = 'cache on ' if cache_ttl else 'cache off'
+        for name, method, url, count, kwargs in (
+            ('GET  /api/auth/profile', 'GET', '/api/auth/profile', requests, {'headers': headers}),
+            ('GET  /api/converter/cache/stats', 'GET', '/api/converter/cache/stats', requests, {'headers': headers}),
+            ('POST /api/auth/login', 'POST', '/api/auth/login', login_requests, login)
+        ):
+            rate, per_request = measure(client, queries, method, url, count, **kwargs)
+            print(f"{label}  {name:<32} {rate:>10,.0f} requests/sec  {per_request:.2f} queries/request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per cached endpoint')
+    parser.add_argument('--login-requests', type=int, default=20,
+                        help='Login requests, dominated by password hashing')
+    parser.add_argument('--database-uri', help='SQLAlchemy URI of a database to run against')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        database_uri = args.database_uri or f"sqlite:///{os.path.join(directory, 'auth.db')}"
+        run(directory, database_uri, args.requests, args.login_requests)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
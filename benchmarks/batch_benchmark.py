@@ -0,0 +1,113 @@
+"""
+Benchmark the wall-clock time to convert many small files, one /convert
+request each against a single /batch request.
+
+Both runs go through the test client with the same conversion pool, so the
+difference is the per-request overhead (JWT check, multipart parsing, job
+polling) and how busy the pool is kept.
+
+Usage:
+    python -m benchmarks.batch_benchmark --files 200 --records 50 --workers 4
+"""
+import io
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from app.app import create_app
+from app.config import Config
+from app.routes.converter import job_service
+from benchmarks.corpus import write_corpus
+
+USERNAME = 'Steve'
+PASSWORD = 'Admin@2025!'
+
+
+def make_app(directory, workers):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(directory, 'auth.db')}"
+        UPLOAD_FOLDER = os.path.join(directory, 'uploads')
+        JOB_DATABASE = os.path.join(directory, 'jobs.db')
+        CACHE_DATABASE = os.path.join(directory, 'cache.db')
+        ARTIFACT_DATABASE = os.path.join(directory, 'artifacts.db')
+        SCHEMA_DATABASE = os.path.join(directory, 'schemas.db')
+        JWT_SECRET_KEY = 'benchmark-secret-key-of-sufficient-length'
+        AUTO_INIT_DATABASE = True
+        CONVERSION_WORKERS = workers
+        CONVERSION_CACHE_ENABLED = False
+        METRICS_ENABLED = False
+        AUDIT_LOG_ENABLED = False
+
+    return create_app(BenchmarkConfig)
+
+
+def poll(client, url, headers):
+    while True:
+        body = client.get(url, headers=headers).json
+        if body['status'] in ('completed', 'failed'):
+            return body
+        time.sleep(0.1)
+
+
+def run_single(client, headers, corpus):
+    # One request per file, then wait for every job
+    job_ids = []
+    for name, data in corpus:
+        response = client.post('/api/converter/convert', headers=headers,
+                               data={'file': (io.BytesIO(data), name)})
+        job_ids.append(response.json['job']['job_id'])
+    return sum(poll(client, f"/api/converter/jobs/{job_id}", headers)['status'] == 'completed' for job_id in job_ids)
+
+
+def run_batch(client, headers, corpus, merge):
+    files = [(io.BytesIO(data), name) for name, data in corpus]
+    response = client.post('/api/converter/batch', headers=headers,
+                           data={'files': files, 'merge': 'true' if merge else 'false'})
+    batch = poll(client, f"/api/converter/batches/{response.json['batch']['batch_id']}", headers)
+    return batch['summary']['completed']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=100, help='Files per run')
+    parser.add_argument('--records', type=int, default=50, help='Records per file')
+    parser.add_argument('--format', choices=['xml', 'json', 'jsonl'], default='xml', help='Input format')
+    parser.add_argument('--workers', type=int, default=4, help='CONVERSION_WORKERS of the pool')
+    parser.add_argument('--merge', action='store_true', help='Merge the batch into one output')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        corpus = []
+        for index in range(args.files):
+            path = os.path.join(directory, f"report{index}.{args.format}")
+            write_corpus(path, args.format, args.records, seed=index)
+            with open(path, 'rb') as f:
+                corpus.append((os.path.basename(path), f.read()))
+            os.remove(path)
+
+        app = make_app(directory, args.workers)
+        client = app.test_client()
+        token = client.post('/api/auth/login', json={'username': USERNAME, 'password': PASSWORD}).json['access_token']
+        headers = {'Authorization': f"Bearer {token}"}
+
+        # Warm the pool up so that both runs start with live workers
+        run_single(client, headers, corpus[:args.workers])
+
+        for label, run in (('/convert per file', lambda: run_single(client, headers, corpus)),
+                           ('/batch', lambda: run_batch(client, headers, corpus, args.merge))):
+            start = time.perf_counter()
+            completed = run()
+            seconds = time.perf_counter() - start
+            print(f"{label:<18} {args.files} files  {seconds:>7.2f} s  {args.files / seconds:>7.1f} files/sec  "
+                  f"{completed} completed")
+
+        # Job callbacks still write to the stores in the directory
+        job_service.executor.shutdown(wait=True)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""
+Benchmark saving and converting synthetic XML, JSON and JSON Lines corpora.
+
+Each case saves a generated corpus through FileHandler.save_file and
+converts it with DataConverterService in a fresh process, recording
+records/sec, MB/sec, time per stage and peak memory. With typed outputs
+(xlsx, parquet, feather) the memory the inferred column types save is
+reported too. Results are written
+as JSON; given a baseline from another commit, the run exits non-zero if
+any case got slower than the threshold allows.
+
+Usage:
+    python -m benchmarks.converter_benchmark --output base.json
+    python -m benchmarks.converter_benchmark --baseline base.json --threshold 0.1
+    python -m benchmarks.converter_benchmark --outputs csv parquet
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.datastructures import FileStorage
+from app.services.data_converter import DataConverterService
+from app.services.file_handler import FileHandler
+from app.services.metrics import reset_peak_rss, peak_rss
+from benchmarks.corpus import write_corpus
+
+MB = 1024 ** 2
+
+# Throughput figures compared against the baseline
+COMPARED = ('records_per_sec', 'save_mb_per_sec')
+
+
+def case_name(file_format, records, depth, attributes, fanout, outputs=('csv',)):
+    name = f"{file_format}-{records}r-d{depth}-a{attributes}-f{fanout}"
+    return name if list(outputs) == ['csv'] else f"{name}-{'+'.join(outputs)}"
+
+
+def measure(source, upload_folder, workers, outputs):
+    """
+    Save and convert one corpus; runs in its own process so that peak
+    memory belongs to this case alone
+    """
+    reset_peak_rss()
+    service = DataConverterService({
+        'DEFAULT_OUTPUT_FORMATS': list(outputs),
+        'CONVERSION_CACHE_ENABLED': False,
+        'METRICS_ENABLED': False,
+        'PARALLEL_CONVERSION_WORKERS': workers
+    })
+
+    with open(source, 'rb') as f:
+        start = time.perf_counter()
+        file_info = FileHandler(upload_folder).save_file(FileStorage(stream=f, filename=os.path.basename(source)))
+        save_seconds = time.perf_counter() - start
+
+    stages = {}
+    current = [None, None]
+
+    def progress(stage, records_processed):
+        now = time.perf_counter()
+        if stage != current[0]:
+            if current[0] is not None:
+                stages[current[0]] = stages.get(current[0], 0) + now - current[1]
+            current[:] = [stage, now]
+
+    start = time.perf_counter()
+    result = service.convert_saved_file(file_info, progress)
+    convert_seconds = time.perf_counter() - start
+    progress(None, 0)
+
+    return {
+        'save_seconds': save_seconds,
+        'convert_seconds': convert_seconds,
+        'stages': stages,
+        'rows': result['conversion_result']['total_rows'],
+        'columns': result['conversion_result']['total_columns'],
+        'peak_rss_bytes': peak_rss(),
+        'memory_saved_bytes': result['conversion_result'].get('memory_saved_bytes')
+    }
+
+
+def run_case(directory, file_format, records, depth, attributes, fanout, seed, repeat, workers, outputs):
+    source = os.path.join(directory, f"corpus.{file_format}")
+    write_corpus(source, file_format, records, depth, attributes, fanout, seed)
+    size_bytes = os.path.getsize(source)
+
+    runs = []
+    for _ in range(repeat):
+        upload_folder = tempfile.mkdtemp(dir=directory)
+        try:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                runs.append(executor.submit(measure, source, upload_folder, workers, outputs).result())
+        finally:
+            shutil.rmtree(upload_folder)
+    os.remove(source)
+
+    # Fastest run of each phase, the others carry more noise than signal
+    best = min(runs, key=lambda run: run['convert_seconds'])
+    best['save_seconds'] = min(run['save_seconds'] for run in runs)
+    return dict(
+        best,
+        format=file_format, records=records, depth=depth, attributes=attributes, fanout=fanout,
+        size_bytes=size_bytes,
+        records_per_sec=records / best['convert_seconds'],
+        mb_per_sec=size_bytes / MB / best['convert_seconds'],
+        save_mb_per_sec=size_bytes / MB / best['save_seconds']
+    )
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare throughput with a baseline run
+
+    Returns:
+        list: Descriptions of the cases slower than the threshold allows
+    """
+    regressions = []
+    for name, case in results['cases'].items():
+        base = baseline['cases'].get(name)
+        if base is None:
+            print(f"{name}: not in baseline, skipped")
+            continue
+        for metric in COMPARED:
+            change = case[metric] / base[metric] - 1
+            flag = '  REGRESSION' if change < -threshold else ''
+            print(f"{name}: {metric} {base[metric]:,.1f} -> {case[metric]:,.1f} ({change:+.1%}){flag}")
+            if flag:
+                regressions.append(f"{name} {metric} {change:+.1%}")
+        memory_change = (case['peak_rss_bytes'] or 0) - (base['peak_rss_bytes'] or 0)
+        print(f"{name}: peak memory {memory_change / MB:+,.1f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--formats', nargs='+', choices=['xml', 'json', 'jsonl'], default=['xml', 'json', 'jsonl'],
+                        help='Input formats to benchmark')
+    parser.add_argument('--records', type=int, nargs='+', default=[20000], help='Record counts to benchmark')
+    parser.add_argument('--depth', type=int, default=2, help='Levels of nested elements per record')
+    parser.add_argument('--attributes', type=int, default=2, help='Attributes per element')
+    parser.add_argument('--fanout', type=int, default=3, help='Items per repeated element')
+    parser.add_argument('--seed', type=int, default=0, help='Corpus random seed')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case, the fastest is kept')
+    parser.add_argument('--workers', type=int, default=1, help='PARALLEL_CONVERSION_WORKERS for the converter')
+    parser.add_argument('--outputs', nargs='+', choices=['csv', 'xlsx', 'parquet', 'feather'], default=['csv'],
+                        help='Output formats written by each conversion')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--baseline', help='Results JSON of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Allowed throughput loss against the baseline, e.g. 0.1 for 10%%')
+    args = parser.parse_args()
+
+    results = {
+        'commit': git_commit(),
+        'created_at': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'cases': {}
+    }
+
+    directory = tempfile.mkdtemp()
+    try:
+        print(f"{'case':<32} {'MB':>7} {'save MB/s':>10} {'records/s':>11} {'MB/s':>7} {'peak MB':>8} {'saved MB':>9}")
+        for file_format in args.formats:
+            for records in args.records:
+                name = case_name(file_format, records, args.depth, args.attributes, args.fanout, args.outputs)
+                case = run_case(directory, file_format, records, args.depth, args.attributes,
+                                args.fanout, args.seed, args.repeat, args.workers, args.outputs)
+                saved = case['memory_saved_bytes']
+                results['cases'][name] = case
+                print(
+                    f"{name:<32} {case['size_bytes'] / MB:>7.1f} {case['save_mb_per_sec']:>10.1f} "
+                    f"{case['records_per_sec']:>11,.0f} {case['mb_per_sec']:>7.1f} "
+                    f"{(case['peak_rss_bytes'] or 0) / MB:>8.1f} "
+                    f"{'-' if saved is None else f'{saved / MB:.1f}':>9}"
+                )
+    finally:
+        shutil.rmtree(directory)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Slower than baseline {baseline.get('commit') or args.baseline}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Deterministic synthetic XML and JSON corpora for the converter benchmarks.
+
+Records are CTR-like reports whose shape is set by three knobs:
+
+- depth: levels of nested ``Detail`` elements below the record
+- attributes: attributes per element (plain fields in JSON)
+- fanout: items in the ``Items`` list found at every level
+
+The same seed always produces byte-identical files, so results taken on
+two commits measure the same input.
+"""
+import json
+import random
+from xml.sax.saxutils import escape, quoteattr
+
+WORDS = ('alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel', 'india', 'juliet')
+AIRPORTS = ('JFK', 'LHR', 'DXB', 'SIN', 'HND', 'CDG', 'FRA', 'AMS')
+
+
+def make_record(rng, index, depth=2, attributes=2, fanout=3):
+    """
+    Build one record shaped the way xmltodict parses it: attributes under
+    ``@`` keys and repeated elements as lists
+
+    Args:
+        rng (random.Random): Seeded generator
+        index (int): Record number
+        depth (int, optional): Levels of nested elements
+        attributes (int, optional): Attributes per element
+        fanout (int, optional): Items per list
+
+    Returns:
+        dict: Record
+    """
+    record = _make_node(rng, 0, depth, attributes, fanout)
+    record['ReportID'] = f"{index:08d}"
+    return record
+
+
+def _make_node(rng, level, depth, attributes, fanout):
+    node = {f"@attr{a}": rng.choice(WORDS) for a in range(attributes)}
+    node['Name'] = f"{rng.choice(WORDS)} {rng.choice(WORDS)}"
+    node['Amount'] = f"{rng.uniform(0, 100000):.2f}"
+    node['Airport'] = rng.choice(AIRPORTS)
+    if fanout:
+        node['Items'] = {'Item': [_make_item(rng, attributes) for _ in range(fanout)]}
+    if level < depth:
+        node['Detail'] = _make_node(rng, level + 1, depth, attributes, fanout)
+    return node
+
+
+def _make_item(rng, attributes):
+    item = {f"@attr{a}": rng.choice(WORDS) for a in range(attributes)}
+    item['Code'] = rng.choice(AIRPORTS)
+    item['Value'] = str(rng.randint(1, 10000))
+    return item
+
+
+def iter_records(records, depth=2, attributes=2, fanout=3, seed=0):
+    """
+    Generate records deterministically
+
+    Args:
+        records (int): Number of records
+        depth (int, optional): Levels of nested elements
+        attributes (int, optional): Attributes per element
+        fanout (int, optional): Items per list
+        seed (int, optional): Random seed
+
+    Yields:
+        dict: Records in xmltodict shape
+    """
+    rng = random.Random(seed)
+    for index in range(records):
+        yield make_record(rng, index, depth, attributes, fanout)
+
+
+def write_xml(path, records, depth=2, attributes=2, fanout=3, seed=0):
+    """
+    Write an XML corpus: one ``<Report>`` element per record under ``<Reports>``
+
+    Args:
+        path (str): Output file path
+        records (int): Number of records
+        depth (int, optional): Levels of nested elements
+        attributes (int, optional): Attributes per element
+        fanout (int, optional): Items per list
+        seed (int, optional): Random seed
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<Reports>\n')
+        for record in iter_records(records, depth, attributes, fanout, seed):
+            parts = []
+            _write_element(parts, 'Report', record)
+            parts.append('\n')
+            f.write(''.join(parts))
+        f.write('</Reports>\n')
+
+
+def _write_element(parts, name, value):
+    if isinstance(value, list):
+        for item in value:
+            _write_element(parts, name, item)
+        return
+    if not isinstance(value, dict):
+        parts.append(f"<{name}>{escape(value)}</{name}>")
+        return
+
+    attrs = ''.join(f" {key[1:]}={quoteattr(item)}" for key, item in value.items() if key.startswith('@'))
+    parts.append(f"<{name}{attrs}>")
+    for key, item in value.items():
+        if not key.startswith('@'):
+            _write_element(parts, key, item)
+    parts.append(f"</{name}>")
+
+
+def to_json(record):
+    """
+    Convert an xmltodict-shaped record to plain JSON: attributes become
+    fields and list wrappers become arrays
+
+    Args:
+        record (dict): Record from make_record
+
+    Returns:
+        dict: JSON record
+    """
+    result = {}
+    for key, value in record.items():
+        if key.startswith('@'):
+            result[key[1:]] = value
+        elif key == 'Items':
+            result[key] = [to_json(item) for item in value['Item']]
+        elif isinstance(value, dict):
+            result[key] = to_json(value)
+        else:
+            result[key] = value
+    return result
+
+
+def write_json(path, records, depth=2, attributes=2, fanout=3, seed=0, lines=False):
+    """
+    Write a JSON corpus, either one top-level array or JSON Lines
+
+    Args:
+        path (str): Output file path
+        records (int): Number of records
+        depth (int, optional): Levels of nested objects
+        attributes (int, optional): Extra fields per object
+        fanout (int, optional): Items per array
+        seed (int, optional): Random seed
+        lines (bool, optional): Write one record per line instead of an array
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        if not lines:
+            f.write('[\n')
+        for index, record in enumerate(iter_records(records, depth, attributes, fanout, seed)):
+            if index and not lines:
+                f.write(',\n')
+            f.write(json.dumps(to_json(record)))
+            if lines:
+                f.write('\n')
+        if not lines:
+            f.write('\n]\n')
+
+
+def write_corpus(path, file_format, records, depth=2, attributes=2, fanout=3, seed=0):
+    """
+    Write a corpus in the given input format
+
+    Args:
+        path (str): Output file path
+        file_format (str): ``xml``, ``json`` or ``jsonl``
+        records (int): Number of records
+        depth (int, optional): Levels of nested elements
+        attributes (int, optional): Attributes per element
+        fanout (int, optional): Items per list
+        seed (int, optional): Random seed
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if file_format == 'xml':
+        write_xml(path, records, depth, attributes, fanout, seed)
+    elif file_format in ('json', 'jsonl'):
+        write_json(path, records, depth, attributes, fanout, seed, lines=file_format == 'jsonl')
+    else:
+        raise ValueError(f"Unsupported corpus format: {file_format}")
@@ -0,0 +1,115 @@
+"""
+Benchmark writing flattened records to CSV: building a pandas DataFrame and
+calling to_csv, as the converters once did, against RecordWriter's spilled
+column union and against RecordWriter with declared columns, which writes
+the CSV in the same pass.
+
+Records are either the nested corpus records flattened, or wide and sparse:
+each record holds a few of many possible fields. Each writer runs in a
+fresh process; its peak memory is reported above the records it is given.
+
+Usage:
+    python -m benchmarks.csv_writer_benchmark --records 100000 --shape sparse
+"""
+import os
+import time
+import random
+import filecmp
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from app.services.record_writer import RecordWriter, ConvertedData, OUTPUT_FORMATS
+from app.services.metrics import reset_peak_rss, peak_rss
+from benchmarks.corpus import iter_records
+from benchmarks.flatten_benchmark import legacy_flatten
+
+MB = 1024 ** 2
+
+
+def flat_records(shape, records, width, fields):
+    if shape == 'nested':
+        yield from (legacy_flatten(record) for record in iter_records(records))
+        return
+    rng = random.Random(0)
+    names = [f"field{index:04d}" for index in range(width)]
+    for index in range(records):
+        yield {name: f"{index}-{rng.randint(0, 9999)}" for name in rng.sample(names, fields)}
+
+
+def write_pandas(records, base_path, columns):
+    import pandas as pd
+
+    pd.DataFrame(list(records)).to_csv(f"{base_path}{OUTPUT_FORMATS['csv']['suffix']}", index=False)
+
+
+def write_spilled(records, base_path, columns):
+    with RecordWriter(base_path) as writer:
+        for record in records:
+            writer.write(record)
+        writer.close()
+    ConvertedData(writer.data_path).materialize('csv')
+
+
+def write_declared(records, base_path, columns):
+    with RecordWriter(base_path, columns=columns, write_csv=True) as writer:
+        for record in records:
+            writer.write(record)
+        writer.close()
+
+
+WRITERS = (
+    ('pandas DataFrame', write_pandas),
+    ('RecordWriter', write_spilled),
+    ('declared columns', write_declared)
+)
+
+
+def measure(writer, base_path, columns, shape, records, width, fields):
+    # Runs in its own process; the records are built first, so that the
+    # time and memory reported are the writer's alone
+    records = list(flat_records(shape, records, width, fields))
+    reset_peak_rss()
+    baseline = peak_rss()
+    start = time.perf_counter()
+    writer(iter(records), base_path, columns)
+    seconds = time.perf_counter() - start
+    peak = peak_rss()
+    return seconds, peak - baseline if peak and baseline else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=50000, help='Records written')
+    parser.add_argument('--shape', choices=['nested', 'sparse'], default='sparse', help='Record shape')
+    parser.add_argument('--width', type=int, default=500, help='Possible fields of sparse records')
+    parser.add_argument('--fields', type=int, default=20, help='Fields per sparse record')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        # Declared in the order the other writers find the columns, so all
+        # three write the same CSV
+        columns = list(dict.fromkeys(
+            column for record in flat_records(args.shape, args.records, args.width, args.fields) for column in record
+        ))
+        print(f"{args.records} {args.shape} records, {len(columns)} columns")
+
+        outputs = []
+        for label, writer in WRITERS:
+            base_path = os.path.join(directory, label.split()[0].lower())
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                seconds, peak = executor.submit(
+                    measure, writer, base_path, columns, args.shape, args.records, args.width, args.fields
+                ).result()
+            outputs.append(f"{base_path}{OUTPUT_FORMATS['csv']['suffix']}")
+            same = filecmp.cmp(outputs[0], outputs[-1], shallow=False)
+            print(f"{label:<18} {seconds:>7.2f} s  {args.records / seconds:>9,.0f} records/s  "
+                  f"peak +{(peak or 0) / MB:>7.1f} MB  {'same CSV' if same else 'different CSV'}")
+    finally:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
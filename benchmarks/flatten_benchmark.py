@@ -0,0 +1,109 @@
+"""
+Benchmark XML record flattening: the original recursive flattener against
+the compiled XMLFlattener.
+
+Usage:
+    python -m benchmarks.flatten_benchmark --records 200000
+"""
+import argparse
+import time
+from app.services.flattener import XMLFlattener
+
+
+def legacy_flatten(record):
+    """
+    Recursive flattener previously inlined in DataConverterService._convert_xml
+    """
+    flat_record = {}
+
+    def flatten_element(element, prefix=""):
+        if isinstance(element, dict):
+            for k, v in element.items():
+                if k.startswith('@'):
+                    attr_name = k[1:]
+                    flatten_element({attr_name: v}, prefix)
+                elif k == '#text':
+                    if prefix:
+                        flat_record[prefix.rstrip('.')] = v
+                else:
+                    new_prefix = f"{prefix}{k}." if prefix else f"{k}."
+                    flatten_element(v, new_prefix)
+        elif isinstance(element, list):
+            for i, item in enumerate(element):
+                item_prefix = f"{prefix}[{i}]"
+                if isinstance(item, (dict, list)):
+                    flatten_element(item, item_prefix + ".")
+                else:
+                    flat_record[item_prefix] = item
+        else:
+            if prefix:
+                flat_record[prefix.rstrip('.')] = element
+            else:
+                flat_record["value"] = element
+
+    flatten_element(record)
+    return flat_record
+
+
+def make_record(i):
+    """
+    Build a CTR-like record shaped the way xmltodict parses it
+    """
+    return {
+        '@id': str(i),
+        'ReportID': f"{i:06d}",
+        'Airline': 'ABC Airlines',
+        'PassengerName': 'John Doe',
+        'Amount': {'@currency': 'USD', '#text': str(12500 + i)},
+        'Route': {'Departure': 'JFK', 'Destination': 'LHR', 'Stops': {'Stop': ['DUB', 'KEF']}},
+        'Payments': {'Payment': [{'@method': 'Cash', 'Value': '100'}, {'@method': 'Card', 'Value': '50'}]},
+        'Notes': None if i % 3 else 'One-way, paid in full'
+    }
+
+
+def rows_from_dicts(flat_records):
+    columns = {}
+    rows = []
+    for record in flat_records:
+        row = [None] * len(columns)
+        for key, value in record.items():
+            index = columns.setdefault(key, len(columns))
+            if index >= len(row):
+                row.append(None)
+            row[index] = value
+        rows.append(row)
+    return columns, rows
+
+
+def run(records):
+    data = [make_record(i) for i in range(records)]
+
+    # The legacy path also had to lay each dict out by column for the writer
+    start = time.perf_counter()
+    expected_columns, expected_rows = rows_from_dicts(legacy_flatten(record) for record in data)
+    legacy_seconds = time.perf_counter() - start
+
+    flattener = XMLFlattener()
+    start = time.perf_counter()
+    compiled = [flattener.flatten(record) for record in data]
+    compiled_seconds = time.perf_counter() - start
+
+    if expected_columns != flattener.columns or expected_rows != compiled:
+        raise SystemExit('Compiled flattener output differs from the legacy flattener')
+
+    print(f"records:  {records}")
+    print(f"columns:  {len(flattener.columns)}")
+    print(f"legacy:   {records / legacy_seconds:,.0f} records/sec")
+    print(f"compiled: {records / compiled_seconds:,.0f} records/sec")
+    print(f"speedup:  {legacy_seconds / compiled_seconds:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=100000, help='Number of records to flatten')
+    args = parser.parse_args()
+    run(args.records)
+
+
+if __name__ == '__main__':
+    main()
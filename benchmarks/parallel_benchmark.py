@@ -0,0 +1,102 @@
+"""
+Benchmark parallel conversion of a single large XML or JSON Lines file
+across worker counts.
+
+Usage:
+    python -m benchmarks.parallel_benchmark --format xml --records 500000 --workers 1 2 4 8 16
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from app.services.data_converter import DataConverterService
+from app.services.record_writer import ConvertedData
+
+
+def write_xml(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<Reports>\n')
+        for i in range(records):
+            extra = f"<Remark{i % 20}>late</Remark{i % 20}>" if i % 7 == 0 else ''
+            f.write(
+                f'  <CTR id="{i}"><ReportID>{i:06d}</ReportID><Airline>ABC Airlines</Airline>'
+                f'<Amount currency="USD">{12500 + i}</Amount>'
+                f'<Route><Departure>JFK</Departure><Destination>LHR</Destination></Route>{extra}'
+                f'<Payments><Payment method="Cash"><Value>100</Value></Payment></Payments></CTR>\n'
+            )
+        f.write('</Reports>\n')
+
+
+def write_json_lines(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(records):
+            record = {
+                'id': i, 'report_id': f"{i:06d}", 'airline': 'ABC Airlines',
+                'amount': {'currency': 'USD', 'value': 12500 + i},
+                'route': {'departure': 'JFK', 'destination': 'LHR'}
+            }
+            if i % 7 == 0:
+                record[f"remark_{i % 20}"] = 'late'
+            f.write(json.dumps(record))
+            f.write('\n')
+
+
+def convert(source, workers, chunk_bytes):
+    directory = tempfile.mkdtemp()
+    try:
+        filepath = os.path.join(directory, os.path.basename(source))
+        shutil.copyfile(source, filepath)
+        service = DataConverterService({
+            'PARALLEL_CONVERSION_WORKERS': workers,
+            'PARALLEL_CHUNK_BYTES': chunk_bytes
+        })
+        convert_method = service._convert_xml if filepath.endswith('.xml') else service._convert_json_lines
+
+        start = time.perf_counter()
+        result = convert_method(filepath)
+        seconds = time.perf_counter() - start
+
+        data = ConvertedData(result['data_path'])
+        return seconds, data.columns, list(data.rows())
+    finally:
+        shutil.rmtree(directory)
+
+
+def run(file_format, records, workers, chunk_bytes):
+    directory = tempfile.mkdtemp()
+    try:
+        source = os.path.join(directory, f"input.{file_format}")
+        (write_xml if file_format == 'xml' else write_json_lines)(source, records)
+        size_mb = os.path.getsize(source) / 1024 ** 2
+        print(f"input:    {file_format}, {records} records, {size_mb:,.1f} MB")
+
+        baseline = None
+        for count in workers:
+            seconds, columns, rows = convert(source, count, chunk_bytes)
+            if baseline is None:
+                baseline = (seconds, columns, rows)
+            elif (columns, rows) != baseline[1:]:
+                raise SystemExit(f"Output with {count} workers differs from {workers[0]} worker(s)")
+            print(
+                f"workers {count:>2}: {size_mb / seconds:8.1f} MB/s  "
+                f"{records / seconds:>10,.0f} records/sec  speedup {baseline[0] / seconds:.2f}x"
+            )
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--format', choices=['xml', 'jsonl'], default='xml', help='Input file format')
+    parser.add_argument('--records', type=int, default=200000, help='Number of records to generate')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1],
+                        help='Worker counts to compare, the first is the baseline')
+    parser.add_argument('--chunk-mb', type=float, default=4, help='Byte range size in MB')
+    args = parser.parse_args()
+    run(args.format, args.records, args.workers, int(args.chunk_mb * 1024 ** 2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark repeated conversions of XML files of one layout, without the
+schema registry against with it, where conversions after the first use the
+registered record element instead of scanning the document for it.
+
+Usage:
+    python -m benchmarks.schema_benchmark --records 100000 --files 5
+"""
+import os
+import time
+import shutil
+import argparse
+import filecmp
+import tempfile
+from app.services.data_converter import DataConverterService
+from benchmarks.corpus import write_corpus
+
+
+def convert_all(converter, paths):
+    start = time.perf_counter()
+    results = [converter._convert_xml(path) for path in paths]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=50000, help='Records per file')
+    parser.add_argument('--files', type=int, default=5, help='Files of the same layout converted')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        paths = []
+        for index in range(args.files):
+            path = os.path.join(directory, f"report{index}.xml")
+            write_corpus(path, 'xml', args.records)
+            paths.append(path)
+        print(f"{args.files} xml files of {args.records} records, "
+              f"{sum(os.path.getsize(path) for path in paths) / 1024 ** 2:.1f} MB in")
+
+        outputs = {}
+        for label, config in (
+            ('no registry', {'SCHEMA_DATABASE': None}),
+            ('schema registry', {'SCHEMA_DATABASE': os.path.join(directory, 'schemas.db')})
+        ):
+            converter = DataConverterService(dict(config, PARALLEL_CONVERSION_WORKERS=1))
+            seconds, results = convert_all(converter, paths)
+            outputs[label] = []
+            for result in results:
+                # Kept aside, the next run writes the same paths
+                kept = f"{result['data_path']}.{label.split()[0]}"
+                os.replace(result['data_path'], kept)
+                outputs[label].append(kept)
+            print(f"{label:<16} {seconds:>7.2f} s  {seconds / args.files:>6.2f} s per file")
+
+        same = all(filecmp.cmp(a, b, shallow=False) for a, b in zip(*outputs.values()))
+        print('same converted data' if same else 'different converted data')
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
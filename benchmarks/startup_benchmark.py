@@ -0,0 +1,82 @@
+"""
+Benchmark the cold start of an app process: importing the app package and
+running create_app, with the database setup deferred to the init-db command
+and with AUTO_INIT_DATABASE on.
+
+Each run is a fresh interpreter, as a prefork worker is. The converter's
+heavy dependencies (pandas, openpyxl, xmltodict) are only imported on first
+use; the time that first use takes is reported separately.
+
+Usage:
+    python -m benchmarks.startup_benchmark --runs 10
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+# Run in the child interpreter; prints its timings as JSON
+CHILD = '''
+import sys, json, time
+start = time.perf_counter()
+from app.app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+heavy = [name for name in ('pandas', 'numpy', 'openpyxl', 'xmltodict', 'pyarrow') if name in sys.modules]
+import pandas, openpyxl, xmltodict
+loaded = time.perf_counter()
+print(json.dumps({
+    'import': imported - start, 'create_app': created - imported,
+    'first_use': loaded - created, 'heavy': heavy
+}))
+'''
+
+MODES = (
+    ('deferred (init-db)', {'AUTO_INIT_DATABASE': 'false'}, False),
+    ('auto init, seeded', {'AUTO_INIT_DATABASE': 'true'}, False),
+    ('auto init, empty db', {'AUTO_INIT_DATABASE': 'true'}, True)
+)
+
+
+def run_child(env):
+    result = subprocess.run([sys.executable, '-c', CHILD], env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Processes started per mode')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        database_path = os.path.join(directory, 'auth.db')
+        env = dict(os.environ, DATABASE_URI=f"sqlite:///{database_path}",
+                   PYTHONPATH=os.pathsep.join(filter(None, (os.getcwd(), os.environ.get('PYTHONPATH')))))
+        # The deferred and seeded modes start from a set-up database
+        run_child(dict(env, AUTO_INIT_DATABASE='true'))
+
+        print(f"{'mode':<22} {'import ms':>10} {'create_app ms':>14} {'total ms':>9} {'first use ms':>13}  heavy modules at start")
+        for label, overrides, empty in MODES:
+            timings = []
+            for _ in range(args.runs):
+                if empty and os.path.exists(database_path):
+                    os.remove(database_path)
+                timings.append(run_child(dict(env, **overrides)))
+
+            median = {key: statistics.median(timing[key] for timing in timings) * 1000
+                      for key in ('import', 'create_app', 'first_use')}
+            print(f"{label:<22} {median['import']:>10.0f} {median['create_app']:>14.0f} "
+                  f"{median['import'] + median['create_app']:>9.0f} {median['first_use']:>13.0f}  "
+                  f"{', '.join(timings[-1]['heavy']) or 'none'}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
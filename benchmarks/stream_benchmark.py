@@ -0,0 +1,102 @@
+"""
+Benchmark time to first byte and total time of a CSV conversion, converting
+with /convert and downloading the CSV against streaming it from
+/convert/stream.
+
+The streamed response is also consumed once under tracemalloc, so the
+reported peak is the memory the streaming conversion held at once.
+
+Usage:
+    python -m benchmarks.stream_benchmark --records 100000 --format xml
+"""
+import io
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from app.routes.converter import job_service
+from benchmarks.batch_benchmark import make_app, poll, USERNAME, PASSWORD
+from benchmarks.corpus import write_corpus
+
+
+def run_convert(client, headers, name, data):
+    # The first byte only comes once the job is done and the download starts
+    start = time.perf_counter()
+    response = client.post('/api/converter/convert', headers=headers, data={'file': (io.BytesIO(data), name)})
+    job = poll(client, f"/api/converter/jobs/{response.json['job']['job_id']}", headers)
+    csv_path = job['result']['conversion_result']['csv_path']
+    upload_folder = client.application.config['UPLOAD_FOLDER']
+    download = client.get(f"/api/converter/download/{os.path.relpath(csv_path, upload_folder)}",
+                          headers=headers, buffered=False)
+    return consume(download, start)
+
+
+def run_stream(client, headers, name, data):
+    start = time.perf_counter()
+    response = client.post('/api/converter/convert/stream', headers=headers,
+                           data={'file': (io.BytesIO(data), name)}, buffered=False)
+    return consume(response, start)
+
+
+def consume(response, start):
+    first_byte = None
+    size = 0
+    for chunk in response.response:
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    response.close()
+    return first_byte, time.perf_counter() - start, size
+
+
+def folder_bytes(folder):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(folder) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=50000, help='Records in the input file')
+    parser.add_argument('--format', choices=['xml', 'json', 'jsonl'], default='xml', help='Input format')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs of each mode')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, f"report.{args.format}")
+        write_corpus(path, args.format, args.records)
+        with open(path, 'rb') as f:
+            data = f.read()
+        os.remove(path)
+        name = os.path.basename(path)
+
+        app = make_app(directory, 1)
+        client = app.test_client()
+        token = client.post('/api/auth/login', json={'username': USERNAME, 'password': PASSWORD}).json['access_token']
+        headers = {'Authorization': f"Bearer {token}"}
+        upload_folder = app.config['UPLOAD_FOLDER']
+
+        print(f"{args.records} {args.format} records, {len(data) / 1024 ** 2:.1f} MB in")
+        for label, run in (('/convert + download', run_convert), ('/convert/stream', run_stream)):
+            written = folder_bytes(upload_folder)
+            timings = [run(client, headers, name, data) for _ in range(args.repeat)]
+            written = (folder_bytes(upload_folder) - written) / args.repeat
+            first_byte = min(timing[0] for timing in timings)
+            total = min(timing[1] for timing in timings)
+            print(f"{label:<20} first byte {first_byte * 1000:>8.1f} ms  total {total:>6.2f} s  "
+                  f"{timings[0][2] / 1024 ** 2:>6.1f} MB out  {written / 1024 ** 2:>6.1f} MB on disk")
+
+        tracemalloc.start()
+        run_stream(client, headers, name, data)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"peak memory while streaming {peak / 1024 ** 2:.1f} MB")
+
+        job_service.executor.shutdown(wait=True)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
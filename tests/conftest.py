@@ -0,0 +1,90 @@
+import io
+import os
+import time
+import pytest
+from app.app import create_app
+from app.config import Config
+from app.services.data_converter import DataConverterService
+
+USERNAME = 'Steve'
+PASSWORD = 'Admin@2025!'
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    # One app per session: the route modules keep their services, and the
+    # stores those open, for the life of the process
+    directory = str(tmp_path_factory.mktemp('app'))
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(directory, 'auth.db')}"
+        UPLOAD_FOLDER = os.path.join(directory, 'uploads')
+        UPLOAD_DATABASE = os.path.join(directory, 'uploads.db')
+        JOB_DATABASE = os.path.join(directory, 'jobs.db')
+        CACHE_DATABASE = os.path.join(directory, 'cache.db')
+        ARTIFACT_DATABASE = os.path.join(directory, 'artifacts.db')
+        SCHEMA_DATABASE = os.path.join(directory, 'schemas.db')
+        METRICS_DATABASE = os.path.join(directory, 'metrics.db')
+        JWT_SECRET_KEY = 'test-secret-key-of-sufficient-length'
+        AUTO_INIT_DATABASE = True
+        AUDIT_LOG_ENABLED = False
+
+    app = create_app(TestConfig)
+    yield app
+
+    from app.routes.converter import job_service
+    if job_service._executor is not None:
+        job_service._executor.shutdown(wait=True)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    def login(username, password):
+        token = client.post('/api/auth/login', json={'username': username, 'password': password}).json['access_token']
+        return {'Authorization': f"Bearer {token}"}
+    return login
+
+
+@pytest.fixture
+def auth_headers(login):
+    return login(USERNAME, PASSWORD)
+
+
+@pytest.fixture
+def converter(tmp_path):
+    # Converter outside the app, with its stores in the test's directory
+    return DataConverterService({
+        'UPLOAD_FOLDER': str(tmp_path),
+        'PARALLEL_CONVERSION_WORKERS': 1
+    })
+
+
+def zstd_compress(data):
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    with pa.CompressedOutputStream(sink, 'zstd') as compressed:
+        compressed.write(data)
+    return sink.getvalue().to_pybytes()
+
+
+def wait_for_job(client, headers, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/converter/jobs/{job_id}", headers=headers).json
+        if job['status'] in ('completed', 'failed') or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def converted_job(client, headers, document, filename='items.xml'):
+    response = client.post(
+        '/api/converter/convert', headers=headers,
+        data={'file': (io.BytesIO(document), filename)}
+    )
+    return wait_for_job(client, headers, response.json['job']['job_id'])
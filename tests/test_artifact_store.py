@@ -0,0 +1,80 @@
+import os
+import time
+import pytest
+from app.services import artifact_store
+from app.services.artifact_store import ArtifactStore, artifact_group, result_paths, shard_directory
+
+
+def write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return str(path)
+
+
+def test_files_of_an_upload_share_a_group(tmp_path):
+    assert artifact_group('/data/ab/cd/f00d.xml') == '/data/ab/cd/f00d'
+    assert artifact_group('/data/ab/cd/f00d_converted.csv') == '/data/ab/cd/f00d'
+    assert artifact_group('/data/ab/cd/f00d.orders.xml_converted.rows') == '/data/ab/cd/f00d'
+    assert shard_directory('/data', 'f00d.xml') == shard_directory('/data', 'f00d.xml')
+    assert len(os.path.relpath(shard_directory('/data', 'f00d.xml'), '/data').split(os.sep)) == 2
+
+
+def test_result_paths_include_relational_tables():
+    result = {'data_path': 'a.rows', 'csv_path': 'a.csv', 'total_rows': 1, 'tables': [{'csv_path': 'b.csv'}]}
+    assert result_paths(result) == ['a.rows', 'a.csv', 'b.csv']
+
+
+def test_group_sizes_follow_registered_files(tmp_path):
+    store = ArtifactStore(str(tmp_path / 'artifacts.db'))
+    upload = write(tmp_path / 'f00d.xml', 100)
+    output = write(tmp_path / 'f00d_converted.csv', 40)
+    assert store.register([upload], owner='u1', content_hash='abc') == 100
+    assert store.register([output]) == 40
+    assert store.get(output)['owner'] == 'u1'
+    assert store.usage('u1') == 140
+
+    write(tmp_path / 'f00d_converted.csv', 50)
+    assert store.register([output]) == 10
+    store.forget([upload])
+    assert store.usage('u1') == 50
+    assert [entry['format'] for entry in store.list_files(owner='u1')] == ['csv']
+
+
+def test_quota_counts_stored_bytes(tmp_path):
+    store = ArtifactStore(str(tmp_path / 'artifacts.db'), user_quota=150)
+    store.register([write(tmp_path / 'f00d.xml', 100)], owner='u1')
+    store.check_quota('u1', 50)
+    store.check_quota('u2', 150)
+    with pytest.raises(ValueError, match='quota'):
+        store.check_quota('u1', 51)
+
+
+def test_least_recently_used_groups_are_evicted_over_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_store, 'EVICTION_GRACE_SECONDS', 0)
+    store = ArtifactStore(str(tmp_path / 'artifacts.db'), max_bytes=150)
+    old = write(tmp_path / 'a1.xml', 100)
+    store.register([old, write(tmp_path / 'a1_converted.csv', 10)], owner='u1')
+    time.sleep(0.01)
+    new = write(tmp_path / 'b2.xml', 100)
+    store.register([new], owner='u1')
+    # Left behind unindexed, evicted with its group
+    leftover = write(tmp_path / 'a1_converted.rows', 5)
+
+    assert store.evict() == 1
+    assert not os.path.exists(old)
+    assert not os.path.exists(leftover)
+    assert os.path.exists(new)
+    assert store.get(old) is None
+    assert store.usage('u1') == 100
+
+
+def test_groups_past_the_age_limit_are_evicted(tmp_path, monkeypatch):
+    store = ArtifactStore(str(tmp_path / 'artifacts.db'), max_age=60)
+    path = write(tmp_path / 'a1.xml', 10)
+    store.register([path], owner='u1')
+    assert store.evict() == 0
+    later = time.time() + 61
+    monkeypatch.setattr(artifact_store.time, 'time', lambda: later)
+    assert store.evict() == 1
+    assert not os.path.exists(path)
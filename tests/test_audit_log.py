@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy import create_engine, text
+from app.services import audit_log
+from app.services.audit_log import ConversionAuditWriter, init_audit_database
+
+OLD_TABLE = """
+CREATE TABLE conversion_logs (
+    id INTEGER PRIMARY KEY,
+    user_id VARCHAR(36) NOT NULL,
+    original_filename VARCHAR(255) NOT NULL,
+    converted_format VARCHAR(20) NOT NULL,
+    created_at DATETIME
+)
+"""
+
+
+@pytest.fixture
+def database_uri(tmp_path):
+    return f"sqlite:///{tmp_path / 'audit.db'}"
+
+
+@pytest.fixture
+def writer(database_uri):
+    writer = ConversionAuditWriter(database_uri, batch_size=100, flush_interval=3600)
+    yield writer
+    writer.close()
+
+
+def logged(database_uri, columns='original_filename'):
+    engine = create_engine(database_uri)
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT {columns} FROM conversion_logs ORDER BY id")).fetchall()
+    engine.dispose()
+    return [tuple(row) for row in rows]
+
+
+def test_rows_are_written_in_batches(database_uri, writer):
+    init_audit_database(database_uri)
+    for index in range(3):
+        writer.record('u1', original_filename=f"{index}.xml", converted_format='csv', total_rows=index)
+    assert writer.flush() == 3
+    assert logged(database_uri, 'original_filename, total_rows') == [('0.xml', 0), ('1.xml', 1), ('2.xml', 2)]
+
+
+def test_rejected_rows_are_dropped_and_do_not_block_later_rows(database_uri, writer):
+    init_audit_database(database_uri)
+    writer.record('u1', original_filename='a.xml', converted_format='csv')
+    # converted_format is NOT NULL, the database rejects the batch
+    writer.record('u1', original_filename='bad.xml', converted_format=None)
+    writer.record('u1', original_filename='b.xml', converted_format='csv')
+    assert writer.flush() == 2
+    writer.record('u1', original_filename='c.xml', converted_format='csv')
+    assert writer.flush() == 1
+    assert logged(database_uri) == [('a.xml',), ('b.xml',), ('c.xml',)]
+
+
+def test_rows_are_kept_until_the_table_exists(database_uri, writer):
+    writer.record('u1', original_filename='a.xml', converted_format='csv')
+    assert writer.flush() == 0
+    init_audit_database(database_uri)
+    assert writer.flush() == 1
+    assert logged(database_uri) == [('a.xml',)]
+
+
+def test_init_adds_missing_columns(database_uri):
+    engine = create_engine(database_uri)
+    with engine.begin() as conn:
+        conn.execute(text(OLD_TABLE))
+    engine.dispose()
+    init_audit_database(database_uri)
+    assert logged(database_uri, 'job_id, status, error') == []
+
+
+def test_strings_are_cut_to_the_column_length(database_uri, writer):
+    engine = create_engine(database_uri)
+    with engine.begin() as conn:
+        conn.execute(text(OLD_TABLE))
+    engine.dispose()
+    writer.record('u1', original_filename='a.xml', converted_format='csv,xlsx,parquet,feather,csv_gz')
+    assert writer.flush() == 1
+    assert logged(database_uri, 'converted_format') == [('csv,xlsx,parquet,fea',)]
+
+
+def test_missing_columns_are_looked_up_again(database_uri, writer, monkeypatch):
+    monkeypatch.setattr(audit_log, 'AUDIT_COLUMNS_RECHECK_INTERVAL', 0)
+    engine = create_engine(database_uri)
+    with engine.begin() as conn:
+        conn.execute(text(OLD_TABLE))
+    engine.dispose()
+    writer.record('u1', original_filename='a.xml', converted_format='csv', total_rows=1)
+    assert writer.flush() == 1
+    init_audit_database(database_uri)
+    writer.record('u1', original_filename='b.xml', converted_format='csv', total_rows=2)
+    assert writer.flush() == 1
+    assert logged(database_uri, 'original_filename, total_rows') == [('a.xml', None), ('b.xml', 2)]
@@ -0,0 +1,70 @@
+import io
+import time
+import zipfile
+
+FIRST = b'<root><item><id>1</id><name>a</name></item><item><id>2</id><name>b</name></item></root>'
+SECOND = b'<root><item><id>3</id><name>c</name></item><item><id>4</id><name>d</name></item></root>'
+OTHER = b'[{"code": "x"}, {"code": "y"}]'
+
+
+def zipped(**members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in members.items():
+            archive.writestr(name.replace('_', '.'), data)
+    return buffer.getvalue()
+
+
+def wait_for_batch(client, headers, batch_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while True:
+        batch = client.get(f"/api/converter/batches/{batch_id}", headers=headers).json
+        if batch['status'] in ('completed', 'failed') or time.monotonic() > deadline:
+            return batch
+        time.sleep(0.05)
+
+
+def test_batch_converts_every_file_and_reports_errors(client, auth_headers):
+    response = client.post('/api/converter/batch', headers=auth_headers, data={'files': [
+        (io.BytesIO(FIRST), 'first.xml'),
+        (io.BytesIO(zipped(second_xml=SECOND, other_json=OTHER)), 'more.zip'),
+        (io.BytesIO(b'text'), 'notes.txt')
+    ]})
+    assert response.status_code == 202
+    batch = wait_for_batch(client, auth_headers, response.json['batch']['batch_id'])
+
+    assert batch['status'] == 'completed'
+    assert [file['name'] for file in batch['files']] == [
+        'first.xml', 'more.zip/second.xml', 'more.zip/other.json', 'notes.txt'
+    ]
+    assert batch['summary'] == {'total': 4, 'completed': 3, 'failed': 1, 'pending': 0}
+    assert batch['files'][3]['error']
+    assert batch['files'][2]['result']['total_rows'] == 2
+
+
+def test_files_of_the_same_columns_are_merged(client, auth_headers):
+    response = client.post('/api/converter/batch', headers=auth_headers, data={'merge': 'true', 'files': [
+        (io.BytesIO(FIRST), 'first.xml'),
+        (io.BytesIO(SECOND), 'second.xml'),
+        (io.BytesIO(OTHER), 'other.json')
+    ]})
+    batch = wait_for_batch(client, auth_headers, response.json['batch']['batch_id'])
+    assert batch['status'] == 'completed'
+    assert [merged['files'] for merged in batch['merged']] == [['first.xml', 'second.xml']]
+    result = batch['merged'][0]['conversion_result']
+    assert result['total_rows'] == 4
+    download = client.get('/api/converter/download', query_string={'file': result['csv_path']}, headers=auth_headers)
+    assert download.data == b'id,name\n1,a\n2,b\n3,c\n4,d\n'
+
+
+def test_batch_of_another_user_is_not_found(client, auth_headers, login):
+    response = client.post('/api/converter/batch', headers=auth_headers, data={
+        'files': [(io.BytesIO(FIRST), 'first.xml')]
+    })
+    batch_id = response.json['batch']['batch_id']
+    other = login('Joe', 'DataUser@2025!')
+    assert client.get(f"/api/converter/batches/{batch_id}", headers=other).status_code == 404
+
+
+def test_empty_batch_is_refused(client, auth_headers):
+    assert client.post('/api/converter/batch', headers=auth_headers).status_code == 400
@@ -0,0 +1,51 @@
+import pandas as pd
+from app.services.column_types import ColumnTypeInference, cast_column, python_values
+
+
+def frame(*columns):
+    return pd.DataFrame({index: list(values) for index, values in enumerate(columns)}, dtype=object)
+
+
+def inferred(*batches):
+    inference = ColumnTypeInference(len(batches[0]))
+    for batch in batches:
+        inference.update(frame(*batch))
+    return [column['dtype'] for column in inference.result()['types']]
+
+
+def test_sample_proposes_the_narrowest_type():
+    assert inferred((
+        ['true', 'false', ''],
+        ['1', '-2', None],
+        ['1.5', '2', '3e2'],
+        ['2024-01-31', '2024-02-01 10:30', '2024-02-02T08:00:00'],
+        ['007', '8', '9'],
+        ['a', 'b', 'c']
+    )) == ['boolean', 'int8', 'float32', 'datetime', 'string', 'string']
+
+
+def test_integer_range_picks_the_dtype():
+    assert inferred((['1', '300'], ['1', '70000'], ['1', str(2 ** 40)])) == ['int16', 'int32', 'int64']
+
+
+def test_later_batches_widen_the_type():
+    assert inferred((['1', '2'], ['true', 'false']), (['2.5', '3'], ['yes', 'no'])) == ['float32', 'string']
+
+
+def test_integers_float64_cannot_hold_fall_back_to_strings():
+    assert inferred(([str(2 ** 53 + 1), '1'],), (['0.5', '2'],)) == ['string']
+    assert inferred(([str(2 ** 64 + 1), '1'],)) == ['string']
+    # Held exactly, so it stays a number
+    assert inferred(([str(2 ** 64), '1'],)) == ['float32']
+
+
+def test_repeated_strings_become_categories():
+    inference = ColumnTypeInference(1)
+    inference.update(frame(['a', 'b', 'a', 'b', 'a']))
+    assert inference.result()['types'] == [{'dtype': 'category', 'categories': ['a', 'b']}]
+
+
+def test_values_are_cast_with_nulls_kept():
+    values = pd.Series(['1', '', None, '4'], dtype=object)
+    assert python_values(cast_column(values, {'dtype': 'int8'})) == [1, None, None, 4]
+    assert python_values(cast_column(pd.Series(['true', None], dtype=object), {'dtype': 'boolean'})) == [True, None]
@@ -0,0 +1,41 @@
+import io
+import gzip
+from app.services.compressed_input import HeadReader, decompress, split_extension
+from tests.conftest import zstd_compress
+
+
+def test_split_extension():
+    assert split_extension('report.xml') == ('xml', None)
+    assert split_extension('report.XML.gz') == ('xml', 'gz')
+    assert split_extension('report.json.zst') == ('json', 'zst')
+
+
+def test_head_reader_ends_at_cut():
+    data = gzip.compress(b'<root>' + b'<item>1</item>' * 10000 + b'</root>')
+    head = HeadReader(decompress(io.BytesIO(data[:len(data) // 2]), 'gz'))
+    content = head.read()
+    assert head.cut_off
+    assert content.startswith(b'<root><item>1</item>')
+
+
+def test_preview_single_record_zstd_xml(client, auth_headers):
+    # No repeating element, the root is the only record, and the
+    # decompressing stream cannot be rewound to parse it again
+    data = zstd_compress(b'<order id="7"><customer>Ann</customer><total>12.5</total></order>')
+    response = client.post(
+        '/api/converter/preview', headers=auth_headers,
+        data={'file': (io.BytesIO(data), 'order.xml.zst')}
+    )
+    assert response.status_code == 200
+    assert response.json['rows'] == [['7', 'Ann', '12.5']]
+    assert response.json['more'] is False
+
+
+def test_stream_single_record_zstd_xml(client, auth_headers):
+    data = zstd_compress(b'<order id="7"><customer>Ann</customer><total>12.5</total></order>')
+    response = client.post(
+        '/api/converter/convert/stream', headers=auth_headers,
+        data={'file': (io.BytesIO(data), 'order.xml.zst')}
+    )
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).splitlines()[1] == '7,Ann,12.5'
@@ -0,0 +1,74 @@
+import io
+import os
+import time
+from werkzeug.datastructures import FileStorage
+from app.services.conversion_cache import ConversionCache
+from app.services.data_converter import DataConverterService
+from app.services.record_writer import RecordWriter
+
+DOCUMENT = b'<root><item><name>a</name></item><item><name>b</name></item></root>'
+
+
+def converted(tmp_path, name):
+    source_path = tmp_path / f"{name}.xml"
+    source_path.write_bytes(DOCUMENT)
+    with RecordWriter(str(tmp_path / name)) as writer:
+        writer.write({'name': name})
+        return str(source_path), writer.close()
+
+
+def test_keys_depend_on_content_type_and_options():
+    key = ConversionCache.make_key('abc', 'xml', {'formats': ['csv']})
+    assert key == ConversionCache.make_key('abc', 'xml', {'formats': ['csv']})
+    assert key != ConversionCache.make_key('abd', 'xml', {'formats': ['csv']})
+    assert key != ConversionCache.make_key('abc', 'json', {'formats': ['csv']})
+    assert key != ConversionCache.make_key('abc', 'xml', {'formats': ['csv'], 'layout': 'relational'})
+
+
+def test_entries_are_counted_as_hits_and_misses(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'cache.db'))
+    source_path, result = converted(tmp_path, 'a')
+    assert cache.get('a') is None
+    cache.put('a', 'hash-a', source_path, result)
+    assert cache.get('a') == {'result': result, 'source_path': source_path}
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['entries'] == 1
+
+
+def test_entry_of_removed_files_is_a_miss(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'cache.db'))
+    source_path, result = converted(tmp_path, 'a')
+    cache.put('a', 'hash-a', source_path, result)
+    os.remove(result['data_path'])
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_entries_are_evicted_over_budget(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'cache.db'))
+    source_path, result = converted(tmp_path, 'a')
+    cache.put('a', 'hash-a', source_path, result)
+    time.sleep(0.01)
+    cache.max_bytes = cache.stats()['size_bytes'] + 1
+    source_path, result = converted(tmp_path, 'b')
+    cache.put('b', 'hash-b', source_path, result)
+
+    assert cache.get('a') is None
+    assert cache.get('b') is not None
+    assert not os.path.exists(tmp_path / 'a.xml')
+    assert cache.stats()['evictions'] == 1
+
+
+def test_same_upload_is_converted_once(tmp_path):
+    converter = DataConverterService({
+        'UPLOAD_FOLDER': str(tmp_path),
+        'CONVERSION_CACHE_ENABLED': True,
+        'CACHE_DATABASE': str(tmp_path / 'cache.db'),
+        'PARALLEL_CONVERSION_WORKERS': 1
+    })
+    first = converter.convert_file(FileStorage(io.BytesIO(DOCUMENT), 'a.xml'), None, {'formats': ['csv']})
+    second = converter.convert_file(FileStorage(io.BytesIO(DOCUMENT), 'b.xml'), None, {'formats': ['csv']})
+    assert not first['cached']
+    assert second['cached']
+    assert second['conversion_result']['data_path'] == first['conversion_result']['data_path']
@@ -0,0 +1,39 @@
+import io
+import pytest
+from werkzeug.datastructures import FileStorage
+
+DOCUMENTS = [
+    b'<root><item id="1"><name>a</name></item><item id="2"><name>b</name><tags><tag>x</tag><tag>y</tag></tags></item></root>',
+    # The record element repeats after another child did
+    b'<root><a><x>1</x></a><b><y>2</y></b><b><y>3</y></b><a><x>4</x></a></root>',
+    b'<root><meta>m</meta><a>1</a><b>2</b><b>3</b><c>4</c><a>5</a><c>6</c></root>',
+    # No repeating element, the root is the record
+    b'<order id="7"><customer>Ann</customer><total>12.5</total></order>',
+]
+
+
+def converted_csv(converter, document):
+    result = converter.convert_file(FileStorage(io.BytesIO(document), 'doc.xml'), None, {'formats': ['csv']})
+    with open(result['conversion_result']['csv_path'], 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+def test_stream_matches_conversion(converter, document):
+    streamed = b''.join(converter.stream_csv(io.BytesIO(document), 'xml'))
+    assert streamed == converted_csv(converter, document)
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+def test_preview_matches_conversion(converter, document):
+    preview = converter.preview(io.BytesIO(document), 'xml')
+    lines = converted_csv(converter, document).decode('utf-8').splitlines()
+    assert ','.join(preview['columns']) == lines[0]
+    assert len(preview['rows']) == len(lines) - 1
+
+
+def test_stream_fails_when_record_element_changes_after_rows_were_sent(converter):
+    converter._config['CSV_STREAM_SAMPLE_RECORDS'] = 1
+    document = b'<root><a>1</a>' + b'<b>2</b>' * 600 + b'<a>3</a></root>'
+    with pytest.raises(ValueError, match='record element changed'):
+        b''.join(converter.stream_csv(io.BytesIO(document), 'xml'))
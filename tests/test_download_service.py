@@ -0,0 +1,66 @@
+import os
+import time
+import pytest
+from tests.conftest import converted_job
+
+DOCUMENT = b'<root>' + b''.join(b'<item><id>%d</id><name>item %d</name></item>' % (i, i) for i in range(200)) + b'</root>'
+
+
+@pytest.fixture
+def job(client, auth_headers):
+    job = converted_job(client, auth_headers, DOCUMENT)
+    assert job['status'] == 'completed'
+    return job
+
+
+def download(client, headers, path, **kwargs):
+    return client.get('/api/converter/download', query_string={'file': path}, headers=headers, **kwargs)
+
+
+def test_output_is_served_with_validators_and_ranges(client, auth_headers, job):
+    csv_path = job['result']['conversion_result']['csv_path']
+    response = download(client, auth_headers, csv_path)
+    assert response.status_code == 200
+    assert response.data.startswith(b'id,name\n0,item 0\n')
+    assert 'attachment' in response.headers['Content-Disposition']
+    etag = response.headers['ETag']
+
+    headers = dict(auth_headers, **{'If-None-Match': etag})
+    assert download(client, headers, csv_path).status_code == 304
+    headers = dict(auth_headers, Range='bytes=0-6')
+    partial = download(client, headers, csv_path)
+    assert partial.status_code == 206
+    assert partial.data == b'id,name'
+
+
+def test_csv_is_served_precompressed_once_produced(client, auth_headers, job):
+    csv_path = job['result']['conversion_result']['csv_path']
+    headers = dict(auth_headers, **{'Accept-Encoding': 'gzip'})
+    # The first download starts writing the variant and is served as is
+    assert 'Content-Encoding' not in download(client, headers, csv_path).headers
+    gz_path = job['result']['conversion_result']['csv_gz_path']
+    deadline = time.monotonic() + 30
+    while not os.path.exists(gz_path) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    response = download(client, headers, csv_path)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+def test_unrequested_format_is_written_on_first_download(client, auth_headers, job):
+    parquet_path = job['result']['conversion_result']['parquet_path']
+    assert not os.path.exists(parquet_path)
+    response = download(client, auth_headers, parquet_path)
+    assert response.status_code == 200
+    assert response.data.startswith(b'PAR1')
+
+
+def test_only_the_owners_outputs_are_served(client, auth_headers, login, job):
+    csv_path = job['result']['conversion_result']['csv_path']
+    assert download(client, login('Joe', 'DataUser@2025!'), csv_path).status_code == 404
+    assert download(client, auth_headers, '../../etc/passwd').status_code == 404
+    assert download(client, auth_headers, job['original_file']['filepath']).status_code == 404
+    assert client.get(
+        f"/api/converter/download/{os.path.basename(csv_path)}x", headers=auth_headers
+    ).status_code == 404
@@ -0,0 +1,76 @@
+from app.services.flattener import RelationalFlattener, XMLFlattener
+
+
+def test_nested_elements_attributes_and_lists_become_columns():
+    flattener = XMLFlattener()
+    row = flattener.flatten({
+        '@id': '1',
+        'name': 'a',
+        'amount': {'@currency': 'EUR', '#text': '12.5'},
+        'tags': {'tag': ['x', 'y']}
+    })
+    assert list(flattener.columns) == ['id', 'name', 'amount.currency', 'amount', 'tags.tag.[0]', 'tags.tag.[1]']
+    assert row == ['1', 'a', 'EUR', '12.5', 'x', 'y']
+
+
+def test_later_records_reuse_and_extend_the_columns():
+    flattener = XMLFlattener()
+    flattener.flatten({'a': '1', 'b': {'c': '2'}})
+    assert flattener.flatten({'b': {'c': '3'}}) == [None, '3']
+    assert flattener.flatten({'d': '4', 'a': '5'}) == ['5', None, '4']
+    assert flattener.columns == {'a': 0, 'b.c': 1, 'd': 2}
+
+
+def test_columns_of_a_shared_registry_are_extended():
+    columns = {'b': 0}
+    flattener = XMLFlattener(columns)
+    assert flattener.flatten({'a': '1', 'b': '2'}) == ['2', '1']
+    assert columns == {'b': 0, 'a': 1}
+
+
+def test_leaf_records_go_to_a_value_column():
+    flattener = XMLFlattener()
+    assert flattener.flatten('text') == ['text']
+    assert flattener.flatten(None) == [None]
+    assert list(flattener.columns) == ['value']
+
+
+def relational_flattener():
+    tables = {}
+
+    def add_table(name, parent, path):
+        tables[name] = {'parent': parent, 'path': path, 'columns': {}}
+        return tables[name]['columns']
+
+    return RelationalFlattener(add_table), tables
+
+
+def test_lists_become_child_tables_keyed_to_their_parent_row():
+    flattener, tables = relational_flattener()
+    rows = flattener.flatten({
+        '@id': '1',
+        'lines': {'line': [{'sku': 'x', 'tags': {'tag': ['p', 'q']}}, {'sku': 'y'}]}
+    })
+    assert rows == [
+        ('records', [1, '1']),
+        ('lines.line', [1, 1, 'x']),
+        ('lines.line.tags.tag', [1, 1, 'p']),
+        ('lines.line.tags.tag', [2, 1, 'q']),
+        ('lines.line', [2, 1, 'y'])
+    ]
+    assert tables['lines.line']['parent'] == 'records'
+    assert tables['lines.line.tags.tag']['parent'] == 'lines.line'
+    assert list(tables['lines.line.tags.tag']['columns']) == ['_id', '_parent_id', 'value']
+
+
+def test_ids_continue_across_records():
+    flattener, tables = relational_flattener()
+    flattener.flatten({'line': [{'sku': 'x'}]})
+    rows = flattener.flatten({'line': [{'sku': 'y'}, {'sku': 'z'}]})
+    assert rows == [('records', [2]), ('line', [2, 2, 'y']), ('line', [3, 2, 'z'])]
+
+
+def test_fields_named_like_key_columns_keep_the_keys():
+    flattener, tables = relational_flattener()
+    assert flattener.flatten({'_id': 'z', 'name': 'a'}) == [('records', [1, 'z', 'a'])]
+    assert list(tables['records']['columns']) == ['_id', '_id_', 'name']
@@ -0,0 +1,70 @@
+import pytest
+from app.models import db, User
+from app.services import identity_cache
+from app.services.auth_service import AuthService
+from app.services.identity_cache import IdentityCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = IdentityCache(max_size=2, ttl=60)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(identity_cache.time, 'monotonic', lambda: now[0])
+    cache = IdentityCache(ttl=60)
+    cache.put('a', 1)
+    now[0] += 59
+    assert cache.get('a') == 1
+    now[0] += 2
+    assert cache.get('a') is None
+
+
+def test_zero_ttl_disables_caching():
+    cache = IdentityCache(ttl=0)
+    cache.put('a', 1)
+    assert cache.get('a') is None
+
+
+@pytest.fixture
+def auth(app):
+    with app.app_context():
+        service = AuthService()
+        service.identity_cache.clear()
+        yield service
+        db.session.rollback()
+
+
+def test_cached_users_leave_out_the_password(auth):
+    user = auth.get_user_by_username('Joe')
+    cached = auth.identity_cache.get('Joe')
+    assert cached['user_id'] == user.user_id
+    assert 'password' not in cached
+    # Read from the database when asked for
+    assert auth.get_user_by_username('Joe').password == user.password
+
+
+def test_updated_user_is_looked_up_again(auth):
+    user = auth.get_user_by_username('Joe')
+    email = user.email
+    try:
+        user.email = 'joe.updated@example.com'
+        db.session.commit()
+        assert auth.identity_cache.get('Joe') is None
+        assert auth.get_user_by_username('Joe').email == 'joe.updated@example.com'
+    finally:
+        User.query.filter_by(username='Joe').update({'email': email})
+        db.session.commit()
+        auth.identity_cache.clear()
+
+
+def test_unknown_user_is_not_found(auth):
+    with pytest.raises(ValueError):
+        auth.get_user_by_username('nobody')
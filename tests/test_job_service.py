@@ -0,0 +1,39 @@
+import io
+from app.services.job_service import JOB_COMPLETED, JOB_QUEUED, JobStore
+from tests.conftest import wait_for_job
+
+DOCUMENT = b'<root><item><name>a</name></item><item><name>b</name></item></root>'
+
+
+def test_store_tracks_jobs_and_their_artifacts(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    job_id = store.create('u1', {'original_filename': 'a.xml'})
+    assert store.get(job_id)['status'] == JOB_QUEUED
+
+    store.update(job_id, status=JOB_COMPLETED, result={'total_rows': 2})
+    assert store.get(job_id)['result'] == {'total_rows': 2}
+    assert store.count_statuses([job_id, 'missing']) == {JOB_COMPLETED: 1}
+    assert list(store.get_many([job_id, 'missing'])) == [job_id]
+
+    data_path = str(tmp_path / 'a_converted.rows')
+    store.add_artifacts(job_id, [data_path])
+    assert store.owns_artifact('u1', data_path)
+    assert not store.owns_artifact('u2', data_path)
+
+
+def test_conversion_runs_as_a_job(client, auth_headers):
+    response = client.post(
+        '/api/converter/convert', headers=auth_headers,
+        data={'file': (io.BytesIO(DOCUMENT), 'items.xml')}
+    )
+    assert response.status_code == 202
+    job = wait_for_job(client, auth_headers, response.json['job']['job_id'])
+    assert job['status'] == 'completed'
+
+    result = client.get(f"/api/converter/jobs/{job['job_id']}/result", headers=auth_headers)
+    assert result.status_code == 200
+    assert result.json['result']['conversion_result']['total_rows'] == 2
+
+
+def test_unknown_job_is_not_found(client, auth_headers):
+    assert client.get('/api/converter/jobs/missing', headers=auth_headers).status_code == 404
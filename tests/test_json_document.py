@@ -0,0 +1,17 @@
+import io
+import json
+import pytest
+
+DOCUMENT = '[1.5, -2e10, 3, 1234.5678e-3, {"a": 1.25}, 6E+2, 7]'
+
+
+@pytest.mark.parametrize('read_size', range(1, 12))
+def test_numbers_split_by_the_read_buffer(converter, read_size):
+    # Every element of the array falls across a buffer boundary at some read size
+    values = list(converter._iter_json_document(io.StringIO(DOCUMENT), read_size))
+    assert values == json.loads(DOCUMENT)
+
+
+def test_malformed_number_still_fails(converter):
+    with pytest.raises(json.JSONDecodeError):
+        list(converter._iter_json_document(io.StringIO('[1.]'), 2))
@@ -0,0 +1,45 @@
+from app.services.metrics import ConversionMetrics, MetricsStore, size_bucket
+
+
+def test_size_buckets():
+    assert size_bucket(0) == '<1MB'
+    assert size_bucket(1024 ** 2) == '1-10MB'
+    assert size_bucket(2 * 1024 ** 3) == '>1GB'
+
+
+def test_histograms_are_rendered_cumulatively(tmp_path):
+    store = MetricsStore(str(tmp_path / 'metrics.db'))
+    labels = {'file_type': 'xml', 'size_bucket': '<1MB'}
+    store.record([('conversion_duration_seconds', labels, 0.3), ('conversion_duration_seconds', labels, 4)])
+    lines = store.render().splitlines()
+    assert 'conversion_duration_seconds_bucket{file_type="xml",size_bucket="<1MB",le="0.1"} 0' in lines
+    assert 'conversion_duration_seconds_bucket{file_type="xml",size_bucket="<1MB",le="0.5"} 1' in lines
+    assert 'conversion_duration_seconds_bucket{file_type="xml",size_bucket="<1MB",le="2.5"} 1' in lines
+    assert 'conversion_duration_seconds_bucket{file_type="xml",size_bucket="<1MB",le="5.0"} 2' in lines
+    assert 'conversion_duration_seconds_bucket{file_type="xml",size_bucket="<1MB",le="+Inf"} 2' in lines
+    assert 'conversion_duration_seconds_count{file_type="xml",size_bucket="<1MB"} 2' in lines
+    assert 'conversion_duration_seconds_sum{file_type="xml",size_bucket="<1MB"} 4.3' in lines
+
+
+def test_conversion_stages_are_recorded_on_finish(tmp_path):
+    store = MetricsStore(str(tmp_path / 'metrics.db'))
+    metrics = ConversionMetrics(store, 'json', 100)
+    progress = metrics.track()
+    progress('parsing', 0)
+    progress('parsing', 1000)
+    progress('writing csv', 1000)
+    metrics.add_bytes(2048)
+    metrics.finish('completed')
+
+    page = store.render()
+    assert 'conversion_stage_duration_seconds_count{file_type="json",size_bucket="<1MB",stage="parsing"} 1' in page
+    assert 'conversion_stage_bytes_count{file_type="json",size_bucket="<1MB",stage="writing csv"} 1' in page
+    assert 'conversions_total{file_type="json",size_bucket="<1MB",status="completed"} 1' in page
+
+
+def test_endpoint_is_served_to_allowed_networks_only(client):
+    response = client.get('/metrics', environ_base={'REMOTE_ADDR': '127.0.0.1'})
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    assert '# TYPE conversions_total counter' in response.get_data(as_text=True)
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.9'}).status_code == 403
@@ -0,0 +1,65 @@
+import os
+import pytest
+from app.services.record_writer import ConvertedData, RecordWriter, excel_sheet_layout
+
+
+def read(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+def test_columns_are_learned_as_records_arrive(tmp_path):
+    base_path = str(tmp_path / 'report')
+    with RecordWriter(base_path) as writer:
+        writer.write({'a': 1, 'b': 'x'})
+        writer.write({'b': 'y', 'c': None})
+        writer.write({'c': 3})
+        result = writer.close()
+    assert result['total_rows'] == 3
+    assert result['total_columns'] == 3
+
+    data = ConvertedData(result['data_path'])
+    assert data.columns == ['a', 'b', 'c']
+    assert list(data.rows()) == [[1, 'x', None], [None, 'y', None], [None, None, 3]]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.spill')]
+
+
+def test_csv_is_materialized_once(tmp_path):
+    with RecordWriter(str(tmp_path / 'report')) as writer:
+        writer.write({'a': 1, 'b': 'x,y'})
+        writer.write({'b': 'z'})
+        result = writer.close()
+    data = ConvertedData(result['data_path'])
+    csv_path = data.materialize('csv')
+    assert csv_path == result['csv_path']
+    assert read(csv_path) == 'a,b\n1,"x,y"\n,z\n'
+    modified = os.path.getmtime(csv_path)
+    assert data.materialize('csv') == csv_path
+    assert os.path.getmtime(csv_path) == modified
+
+
+def test_declared_columns_write_the_csv_in_the_same_pass(tmp_path):
+    with RecordWriter(str(tmp_path / 'report'), columns=['b', 'a'], write_csv=True) as writer:
+        writer.write({'a': 1, 'b': 2, 'c': 3})
+        writer.write({'a': 4})
+        result = writer.close()
+    assert read(result['csv_path']) == 'b,a\n2,1\n,4\n'
+    assert ConvertedData(result['data_path']).columns == ['b', 'a']
+
+
+def test_writing_the_csv_needs_declared_columns(tmp_path):
+    with pytest.raises(ValueError):
+        RecordWriter(str(tmp_path / 'report'), write_csv=True)
+
+
+def test_unknown_format_is_refused(tmp_path):
+    with RecordWriter(str(tmp_path / 'report')) as writer:
+        result = writer.close()
+    with pytest.raises(ValueError):
+        ConvertedData(result['data_path']).materialize('docx')
+
+
+def test_excel_sheets_split_at_the_row_limit():
+    sheets = excel_sheet_layout(1048576 * 2)
+    assert len(sheets) == 3
+    assert sum(sheet['rows'] for sheet in sheets) == 1048576 * 2
@@ -0,0 +1,87 @@
+import io
+import threading
+from werkzeug.datastructures import FileStorage
+from app.services.data_converter import DataConverterService
+from app.services.schema_registry import SchemaRegistry
+
+
+def test_fingerprint_ignores_column_order():
+    fingerprint = SchemaRegistry.fingerprint('xml', 'item', ['a', 'b'])
+    assert fingerprint == SchemaRegistry.fingerprint('xml', 'item', ['b', 'a'])
+    assert fingerprint != SchemaRegistry.fingerprint('xml', 'row', ['a', 'b'])
+    assert fingerprint != SchemaRegistry.fingerprint('json', 'item', ['a', 'b'])
+
+
+def test_conversions_extend_the_registered_plan(tmp_path):
+    registry = SchemaRegistry(str(tmp_path / 'schemas.db'))
+    assert registry.lookup('f1') is None
+    registry.record('f1', 'xml', 'item', ['a', 'b'])
+    registry.record('f1', 'xml', 'item', ['b', 'c'])
+    registry.record_types('f1', {'a': {'dtype': 'int8'}})
+
+    plan = registry.lookup('f1')
+    assert plan['record_path'] == 'item'
+    assert plan['columns'] == ['a', 'b', 'c']
+    assert plan['types'] == {'a': {'dtype': 'int8'}}
+    assert plan['conversions'] == 2
+    assert plan['hits'] == 1
+
+
+def test_concurrent_conversions_of_a_new_layout_all_register(tmp_path):
+    # e.g. the files of a batch, converted on several pool workers at once
+    registry = SchemaRegistry(str(tmp_path / 'schemas.db'))
+    errors = []
+
+    def record(index):
+        try:
+            SchemaRegistry(registry.db_path).record('f1', 'xml', 'item', ['a', f"c{index}"])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=record, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    plan = registry.get('f1')
+    assert plan['conversions'] == 8
+    assert sorted(plan['columns']) == ['a'] + sorted(f"c{index}" for index in range(8))
+
+
+def test_least_recently_used_unpinned_layouts_are_trimmed(tmp_path):
+    registry = SchemaRegistry(str(tmp_path / 'schemas.db'), max_entries=2)
+    registry.record('f1', 'xml', 'item', ['a'])
+    assert registry.pin('f1')
+    for fingerprint in ('f2', 'f3', 'f4'):
+        registry.record(fingerprint, 'xml', 'item', ['a'])
+    assert sorted(entry['fingerprint'] for entry in registry.list_schemas()) == ['f1', 'f3', 'f4']
+
+    assert registry.evict() == 2
+    assert [entry['fingerprint'] for entry in registry.list_schemas()] == ['f1']
+    assert registry.evict('f1') == 1
+    assert not registry.pin('f1')
+
+
+def test_known_layout_is_converted_with_its_plan(tmp_path):
+    converter = DataConverterService({
+        'UPLOAD_FOLDER': str(tmp_path),
+        'SCHEMA_DATABASE': str(tmp_path / 'schemas.db'),
+        'PARALLEL_CONVERSION_WORKERS': 1
+    })
+    results = []
+    for values in (('a', 'b'), ('c', 'd')):
+        document = b'<root><meta>x</meta>' + b''.join(
+            b'<item><name>%s</name></item>' % value.encode() for value in values
+        ) + b'</root>'
+        result = converter.convert_file(FileStorage(io.BytesIO(document), 'items.xml'), None, {'formats': ['csv']})
+        results.append(result['conversion_result'])
+
+    assert results[0]['schema'] == results[1]['schema']
+    plan = converter.schemas.get(results[0]['schema'])
+    assert plan['record_path'] == 'item'
+    assert plan['conversions'] == 2
+    assert plan['hits'] == 1
+    with open(results[1]['csv_path'], encoding='utf-8') as f:
+        assert f.read() == 'name\nc\nd\n'
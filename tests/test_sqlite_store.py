@@ -0,0 +1,41 @@
+import os
+import sqlite3
+import pytest
+from app.services.sqlite_store import SQLiteStore
+
+
+class CounterStore(SQLiteStore):
+    def _create_schema(self, conn):
+        conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+
+    def add(self, name, value):
+        with self._connect() as conn:
+            conn.execute('INSERT INTO counters (name, value) VALUES (?, ?)', (name, value))
+
+    def get(self, name):
+        with self._connect() as conn:
+            row = conn.execute('SELECT value FROM counters WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else None
+
+
+def test_schema_is_created_in_a_new_directory(tmp_path):
+    store = CounterStore(str(tmp_path / 'stores' / 'counters.db'))
+    store.add('a', 1)
+    assert os.path.exists(tmp_path / 'stores' / 'counters.db')
+    # Another instance, e.g. in a worker process, sees the same data
+    assert CounterStore(store.db_path).get('a') == 1
+
+
+def test_failed_operation_is_rolled_back(tmp_path):
+    store = CounterStore(str(tmp_path / 'counters.db'))
+    store.add('a', 1)
+    with pytest.raises(sqlite3.IntegrityError):
+        with store._connect() as conn:
+            conn.execute('UPDATE counters SET value = 2')
+            conn.execute('INSERT INTO counters (name, value) VALUES (?, ?)', ('a', 3))
+    assert store.get('a') == 1
+
+
+def test_schema_is_required(tmp_path):
+    with pytest.raises(NotImplementedError):
+        SQLiteStore(str(tmp_path / 'store.db'))
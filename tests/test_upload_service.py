@@ -0,0 +1,78 @@
+import io
+import os
+import hashlib
+import pytest
+from app.services.data_converter import DataConverterService
+from app.services.upload_service import PART_SUFFIX, UploadOffsetError, UploadService
+
+
+class FailingStream:
+    # Hands over some bytes, then fails the way a full disk or a reset socket would
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    def read(self, size):
+        data = self.data.read(3)
+        if not data:
+            raise OSError('connection reset')
+        return data
+
+
+@pytest.fixture
+def service(app, tmp_path):
+    converter = DataConverterService({
+        'UPLOAD_FOLDER': str(tmp_path),
+        'ARTIFACT_DATABASE': str(tmp_path / 'artifacts.db'),
+        'ARTIFACT_USER_QUOTA_BYTES': 20
+    })
+    with app.app_context():
+        yield UploadService(converter)
+
+
+def part_size(upload):
+    return os.path.getsize(upload['filepath'] + PART_SUFFIX)
+
+
+def test_chunks_are_hashed_as_they_arrive(service):
+    upload = service.create('u1', 'data.json', total_size=12)
+    service.write_chunk(upload['upload_id'], 'u1', 0, io.BytesIO(b'[{"a": '), 7)
+    service.write_chunk(upload['upload_id'], 'u1', 7, io.BytesIO(b'1}]\n\n'), 5)
+    file_info = service.finalize(upload['upload_id'], 'u1')
+    assert file_info['content_hash'] == hashlib.sha256(b'[{"a": 1}]\n\n').hexdigest()
+
+
+def test_chunk_at_wrong_offset_is_refused(service):
+    upload = service.create('u1', 'data.json')
+    with pytest.raises(UploadOffsetError) as error:
+        service.write_chunk(upload['upload_id'], 'u1', 4, io.BytesIO(b'[]'))
+    assert error.value.offset == 0
+
+
+def test_failed_chunk_is_cut_back_and_can_be_sent_again(service):
+    upload = service.create('u1', 'data.json')
+    service.write_chunk(upload['upload_id'], 'u1', 0, io.BytesIO(b'[{"a": '))
+    with pytest.raises(OSError):
+        service.write_chunk(upload['upload_id'], 'u1', 7, FailingStream(b'1}]'))
+    assert part_size(upload) == 7
+    assert service.get(upload['upload_id'], 'u1')['received_bytes'] == 7
+
+    service.write_chunk(upload['upload_id'], 'u1', 7, io.BytesIO(b'1}]'))
+    file_info = service.finalize(upload['upload_id'], 'u1')
+    assert file_info['content_hash'] == hashlib.sha256(b'[{"a": 1}]').hexdigest()
+
+
+def test_chunk_past_the_declared_size_is_refused(service):
+    upload = service.create('u1', 'data.json', total_size=4)
+    with pytest.raises(ValueError, match='upload size'):
+        service.write_chunk(upload['upload_id'], 'u1', 0, io.BytesIO(b'[1, 2]'))
+    assert part_size(upload) == 0
+
+
+def test_undeclared_size_is_held_to_the_quota(service):
+    upload = service.create('u1', 'data.json')
+    service.write_chunk(upload['upload_id'], 'u1', 0, io.BytesIO(b'[' + b'1, ' * 5))
+    with pytest.raises(ValueError, match='quota'):
+        service.write_chunk(upload['upload_id'], 'u1', 16, io.BytesIO(b'1, 1, 1]'))
+    assert part_size(upload) == 16
+    with pytest.raises(ValueError, match='quota'):
+        service.write_chunk(upload['upload_id'], 'u1', 16, io.BytesIO(b'1, 1, 1]'), 8)